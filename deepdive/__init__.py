@@ -6,8 +6,31 @@ Erweiterte SDN-Implementierungen mit Firewall-Funktionalität und Enterprise-Net
 Verfügbare Module:
 - l2_switch_with_firewall: L2 Learning Switch mit Firewall
 - l3_switch_with_firewall: Layer 3 Switch mit Firewall
+- switch_base: Gemeinsame Flow-Tabellen-, Elephant- und Quarantäne-Logik beider Switches
 - enterprise_network_topo: Enterprise-Netzwerk Topologie
 - enterprise_firewall_rules: Enterprise Firewall Rules
+- acl_compiler: Kompiliert deklarative ACL-Regeln in eine Lookup-Struktur
+- zone_policy: Lädt Regeldateien in eine nach Zonen indizierte Policy-Engine
+- acl_cache: LRU-Cache für ACL-Entscheidungen mit Generationszähler
+- flow_utils: Hilfsfunktionen zum Bau von OpenFlow-Nachrichten
+- flow_key: Kompakter Flow-Schlüssel aus einem Durchlauf durch die Header
+- proactive: Proaktive Installation von ACL und Routen beim ConnectionUp
+- routing_table: Routing-Tabelle mit Longest-Prefix-Match
+- arp_queue: Warteschlange für Pakete mit ausstehender ARP-Auflösung
+- host_table: Lerntabellen mit Alterung und begrenzter Größe
+- admission: Token-Buckets pro Port und Quelle gegen PacketIn-Fluten
+- arp_proxy: ARP-Replies aus vorgefertigten Byte-Vorlagen
+- offload: Policy-Entscheidung in Thread- oder Prozess-Workern, pro Flow geordnet
+- policy_reload: Regeldatei im Betrieb neu laden, nur betroffene Flows abgleichen
+- acl_verify: Offline-Prüfung auf verdeckte, redundante und widersprüchliche Regeln
+- topology: Topologie-Graph aus der LLDP-Erkennung mit kürzesten Wegen
+- host_registry: Gemeinsame Lerntabellen und Host-Standorte aller Switches
+- benchmark: PacketIn-Benchmark mit Ersatz-Verbindung
+- flow_registry: Register gesendeter Flow-Mods gegen doppelte Installationen
+- flow_table: Belegung der Flow-Tabelle, angepasste Timeouts und Verdrängung
+- elephant: Elephant-Erkennung und Aufzeichnung der Flow-Statistik
+- msg_batcher: Gebündeltes Senden von OpenFlow-Nachrichten pro Event-Burst
+- hot_log: Log-Zusammenfassungen und Log-Ausgabe im Hintergrund-Thread
 - firewall_help: Firewall ACL Hilfe und Beispiele
 """
 
@@ -19,7 +42,30 @@ __description__ = "Advanced SDN implementations with firewall functionality"
 __all__ = [
     'l2_switch_with_firewall',
     'l3_switch_with_firewall', 
+    'switch_base',
     'enterprise_network_topo',
     'enterprise_firewall_rules',
+    'acl_compiler',
+    'zone_policy',
+    'acl_cache',
+    'flow_utils',
+    'flow_key',
+    'proactive',
+    'routing_table',
+    'arp_queue',
+    'host_table',
+    'admission',
+    'arp_proxy',
+    'offload',
+    'policy_reload',
+    'acl_verify',
+    'topology',
+    'host_registry',
+    'benchmark',
+    'flow_registry',
+    'flow_table',
+    'elephant',
+    'msg_batcher',
+    'hot_log',
     'firewall_help'
 ] 
\ No newline at end of file
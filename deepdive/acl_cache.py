@@ -0,0 +1,141 @@
+"""
+Entscheidungs-Cache für die Firewall-ACL
+
+Die ACL-Entscheidung hängt nur von (Quell-IP, Ziel-IP, Protokoll, Zielport)
+ab - nicht vom Quellport. Bei einem Port-Scan oder vielen kurzen
+Verbindungen wird dieselbe Entscheidung daher immer wieder neu berechnet.
+CachedACL merkt sich die letzten Ergebnisse in einem begrenzten LRU-Cache.
+
+Invalidierung:
+    Jeder Eintrag speichert die Generation, in der er berechnet wurde.
+    Ändern sich die Regeln (set_acl() oder invalidate()), wird die Generation
+    erhöht; ältere Einträge gelten ab sofort als Fehltreffer und werden beim
+    nächsten Zugriff überschrieben bzw. per LRU verdrängt.
+
+Beispiel:
+    acl = CachedACL(compile_rules(ACL_RULES), max_entries=4096)
+    acl.is_blocked(src, dst, proto, dport)
+    acl.stats()  # {'hits': ..., 'misses': ..., ...}
+"""
+
+from collections import OrderedDict
+
+from .acl_compiler import DENY, ip_to_int
+
+
+class CachedACL(object):
+    """
+    LRU-Cache vor einer ACL (CompiledACL, ZonePolicy, ...)
+
+    Bietet dieselbe Schnittstelle wie die gekapselte ACL
+    (lookup, action_for, is_blocked).
+
+    Args:
+        acl: Gekapselte ACL
+        max_entries: Maximale Anzahl gecachter Entscheidungen
+    """
+
+    def __init__(self, acl, max_entries=4096):
+        self.acl = acl
+        self.max_entries = max_entries
+        self.generation = 0
+        self._entries = OrderedDict()  # (src, dst, proto, dport) → (Generation, Regel)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def rules(self):
+        return self.acl.rules
+
+    @property
+    def default_action(self):
+        return self.acl.default_action
+
+    def __len__(self):
+        return len(self.acl)
+
+    def set_acl(self, acl):
+        """
+        Tauscht die gekapselte ACL aus und invalidiert den Cache
+
+        Args:
+            acl: Neue ACL
+        """
+        self.acl = acl
+        self.invalidate()
+
+    def invalidate(self):
+        """
+        Erklärt alle bisherigen Einträge für ungültig (neue Generation)
+        """
+        self.generation += 1
+
+    def lookup(self, src, dst, proto, dport):
+        """
+        Sucht die erste passende Regel - aus dem Cache oder der ACL
+
+        Args:
+            src: Quell-IP-Adresse (IPAddr oder Integer)
+            dst: Ziel-IP-Adresse (IPAddr oder Integer)
+            proto: Protokoll-ID
+            dport: Zielport oder None
+
+        Returns:
+            Rule: Passende Regel oder None (→ Standard-Aktion)
+        """
+        key = (ip_to_int(src), ip_to_int(dst), proto, dport)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == self.generation:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        rule = self.acl.lookup(key[0], key[1], proto, dport)
+        self._entries[key] = (self.generation, rule)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return rule
+
+    def action_for(self, rule):
+        """
+        Liefert die Aktion eines Lookup-Ergebnisses (None → Standard-Aktion)
+        """
+        return self.acl.action_for(rule)
+
+    def is_blocked(self, src, dst, proto, dport):
+        """
+        Firewall-Entscheidung für ein Paket
+
+        Returns:
+            bool: True wenn das Paket blockiert werden soll
+        """
+        return self.action_for(self.lookup(src, dst, proto, dport)) == DENY
+
+    def widest_region(self, rule, src, dst, proto, dport):
+        """
+        Größte Region um das Paket mit derselben Entscheidung wie rule
+
+        Wird an die gekapselte ACL weitergereicht.
+        """
+        return self.acl.widest_region(rule, src, dst, proto, dport)
+
+    def stats(self):
+        """
+        Liefert die Cache-Zähler
+
+        Returns:
+            dict: hits, misses, evictions, size, generation, hit_rate
+        """
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._entries),
+            'generation': self.generation,
+            'hit_rate': float(self.hits) / total if total else 0.0,
+        }
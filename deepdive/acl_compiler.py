@@ -0,0 +1,763 @@
+"""
+ACL-Compiler für die Firewall-Controller
+
+Statt jede Firewall-Regel als if-Abfrage zu schreiben (und dabei für jedes
+Paket IPAddr(...) bzw. inNetwork("...") erneut zu parsen), wird die ACL als
+deklarative Regelliste beschrieben und einmalig in eine vorberechnete
+Entscheidungsstruktur übersetzt.
+
+Aufbau der kompilierten ACL:
+- Präfix-Tabellen für Quell- und Ziel-IP (ein Hash pro Präfixlänge)
+- Protokoll-Buckets (Protokoll-ID → passende Regeln)
+- Port-Buckets (Elementar-Intervalle der Port-Bereiche, binäre Suche)
+
+Jede Dimension liefert eine Bitmaske der Regeln, die in dieser Dimension
+passen. Die UND-Verknüpfung aller Masken ergibt die Regeln, die insgesamt
+passen; das niedrigste gesetzte Bit ist die erste passende Regel. Der
+Aufwand pro Lookup hängt damit nur von der Anzahl verschiedener
+Präfixlängen ab und bleibt auch bei tausenden Regeln nahezu konstant.
+
+Beispiel:
+    from deepdive.acl_compiler import Rule, compile_rules, ALLOW, DENY
+
+    acl = compile_rules([
+        Rule(dst="10.2.1.100", proto="tcp", dport=80, action=ALLOW),
+        Rule(src="10.3.1.0/24", action=DENY),
+    ])
+    acl.is_blocked(IPAddr("10.3.1.200"), IPAddr("10.2.1.100"), ipv4.TCP_PROTOCOL, 22)
+
+Regel-Reihenfolge:
+    Es gewinnt die Regel mit der höchsten Priorität. Bei gleicher Priorität
+    (Standard: 0) entscheidet die Reihenfolge in der Liste - wie bei der
+    if-Kette gilt also die erste passende Regel.
+"""
+
+from bisect import bisect_right
+from collections import namedtuple
+
+ALLOW = "allow"
+DENY = "deny"
+
+# Protokoll-Namen für die deklarative Schreibweise
+PROTOCOLS = {
+    "icmp": 1,
+    "igmp": 2,
+    "tcp": 6,
+    "udp": 17,
+}
+
+
+def ip_to_int(ip):
+    """
+    Wandelt eine IP-Adresse in einen 32-Bit-Integer um
+
+    Args:
+        ip: IPAddr, Integer oder String ("10.0.0.1")
+
+    Returns:
+        int: IP-Adresse als Integer
+    """
+    if isinstance(ip, int):
+        return ip
+    to_unsigned = getattr(ip, 'toUnsigned', None)
+    if to_unsigned is not None:
+        return to_unsigned()
+    a, b, c, d = [int(x) for x in str(ip).split('.')]
+    return (a << 24) | (b << 16) | (c << 8) | d
+
+
+def int_to_ip(value):
+    """
+    Wandelt einen 32-Bit-Integer in die Punkt-Notation um
+
+    Args:
+        value: IP-Adresse als Integer
+
+    Returns:
+        str: IP-Adresse, z.B. "10.0.0.1"
+    """
+    return "%d.%d.%d.%d" % ((value >> 24) & 0xff, (value >> 16) & 0xff,
+                            (value >> 8) & 0xff, value & 0xff)
+
+
+def parse_prefix(prefix):
+    """
+    Zerlegt ein Präfix in Netzadresse und Präfixlänge
+
+    Args:
+        prefix: "10.1.0.0/16", "10.2.1.100" (= /32) oder Tupel (Netz, Länge)
+
+    Returns:
+        tuple: (Netzadresse als Integer, Präfixlänge)
+    """
+    if isinstance(prefix, tuple):
+        net, length = prefix
+    else:
+        prefix = str(prefix)
+        if '/' in prefix:
+            net, length = prefix.split('/', 1)
+        else:
+            net, length = prefix, 32
+    length = int(length)
+    if not 0 <= length <= 32:
+        raise ValueError("Ungültige Präfixlänge: %r" % (prefix,))
+    return ip_to_int(net) & prefix_mask(length), length
+
+
+def prefix_mask(length):
+    """
+    Liefert die Netzmaske zu einer Präfixlänge als Integer
+    """
+    return (0xffffffff << (32 - length)) & 0xffffffff
+
+
+def format_prefix(net, length):
+    """
+    Formatiert Netzadresse und Präfixlänge als CIDR-String
+    """
+    return "%s/%d" % (int_to_ip(net), length)
+
+
+def prefixes_overlap(a, b):
+    """
+    Prüft ob sich zwei Präfixe (Netz, Länge) überschneiden
+
+    Zwei Präfixe überschneiden sich genau dann, wenn eines das andere enthält.
+    """
+    mask = prefix_mask(min(a[1], b[1]))
+    return a[0] & mask == b[0] & mask
+
+
+def prefix_contains(outer, inner):
+    """
+    Prüft ob das Präfix outer das Präfix inner vollständig enthält
+    """
+    return inner[1] >= outer[1] and inner[0] & prefix_mask(outer[1]) == outer[0]
+
+
+def prefix_difference(parent, excluded):
+    """
+    Zerlegt parent ohne die ausgenommenen Präfixe in disjunkte Präfixe
+
+    Beispiel: 10.0.0.0/8 ohne 10.1.0.0/16 ergibt 10.0.0.0/16, 10.2.0.0/15,
+    10.4.0.0/14, 10.8.0.0/13, 10.16.0.0/12, ... (höchstens 32 Präfixe pro
+    ausgenommenem Präfix).
+
+    Args:
+        parent: Präfix (Netz, Länge)
+        excluded: Liste auszunehmender Präfixe
+
+    Returns:
+        list: Präfixe, die zusammen genau parent ohne excluded abdecken
+    """
+    result = [parent]
+    for ex in excluded:
+        remaining = []
+        for prefix in result:
+            if not prefixes_overlap(prefix, ex):
+                remaining.append(prefix)
+            elif prefix_contains(ex, prefix):
+                continue
+            else:
+                # prefix enthält ex: bis zur Länge von ex halbieren und jeweils
+                # die Hälfte behalten, die ex nicht enthält
+                current = prefix
+                while current[1] < ex[1]:
+                    length = current[1] + 1
+                    left = (current[0], length)
+                    right = (current[0] | (1 << (32 - length)), length)
+                    if prefix_contains(left, ex):
+                        remaining.append(right)
+                        current = left
+                    else:
+                        remaining.append(left)
+                        current = right
+        result = remaining
+    return result
+
+
+# Ausschnitt des Header-Raums, wie er sich als OpenFlow-1.0-Match ausdrücken
+# lässt: src/dst als (Netz, Länge) oder None, proto und dport als Wert oder None
+Region = namedtuple('Region', ['src', 'dst', 'proto', 'dport'])
+
+
+def _parse_prefixes(value):
+    """
+    Normalisiert eine Präfix-Angabe (einzeln oder Liste) zu einem Tupel
+    von (Netz, Länge) - None steht für "beliebig"
+    """
+    if value is None:
+        return None
+    if isinstance(value, (list, set, frozenset)) or (
+            isinstance(value, tuple) and value and not isinstance(value[1], int)):
+        return tuple(parse_prefix(p) for p in value)
+    return (parse_prefix(value),)
+
+
+def _parse_proto(value):
+    """
+    Normalisiert eine Protokoll-Angabe ("tcp", 6, None)
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        name = value.lower()
+        if name in PROTOCOLS:
+            return PROTOCOLS[name]
+        return int(value)
+    return int(value)
+
+
+def _parse_ports(value):
+    """
+    Normalisiert eine Port-Angabe zu einer sortierten Liste disjunkter
+    Bereiche (lo, hi) - None steht für "beliebig"
+
+    Erlaubt sind: 80, "80", "1024-65535", (1024, 65535), [80, 443, (8000, 8080)]
+    """
+    if value is None:
+        return None
+    if isinstance(value, (list, set, frozenset)):
+        items = list(value)
+    else:
+        items = [value]
+
+    ranges = []
+    for item in items:
+        if isinstance(item, tuple):
+            lo, hi = int(item[0]), int(item[1])
+        elif isinstance(item, str) and '-' in item:
+            lo, hi = [int(x) for x in item.split('-', 1)]
+        else:
+            lo = hi = int(item)
+        if lo > hi or lo < 0 or hi > 0xffff:
+            raise ValueError("Ungültiger Port-Bereich: %r" % (item,))
+        ranges.append((lo, hi))
+
+    # Überlappende oder direkt angrenzende Bereiche zusammenfassen
+    ranges.sort()
+    merged = [ranges[0]]
+    for lo, hi in ranges[1:]:
+        last_lo, last_hi = merged[-1]
+        if lo <= last_hi + 1:
+            merged[-1] = (last_lo, max(last_hi, hi))
+        else:
+            merged.append((lo, hi))
+    return tuple(merged)
+
+
+def _prefix_masks(prefixes):
+    """
+    Berechnet (Netz, Maske)-Paare für den direkten Vergleich vor
+    """
+    if prefixes is None:
+        return None
+    return tuple((net, prefix_mask(length)) for net, length in prefixes)
+
+
+def _in_prefixes(ip, masks):
+    """
+    Prüft ob eine IP (Integer) in einem der Präfixe liegt
+
+    Args:
+        ip: IP-Adresse als Integer
+        masks: (Netz, Maske)-Paare aus _prefix_masks()
+    """
+    for net, mask in masks:
+        if ip & mask == net:
+            return True
+    return False
+
+
+class Rule(object):
+    """
+    Deklarative Firewall-Regel
+
+    Alle Match-Felder sind optional; ein fehlendes Feld passt auf alles.
+
+    Args:
+        src: Quell-Präfix(e), z.B. "10.3.0.0/16" oder ["10.1.0.0/16", "10.5.0.0/16"]
+        dst: Ziel-Präfix(e)
+        proto: Protokoll ("tcp", "udp", "icmp" oder Protokoll-ID)
+        dport: Zielport(s), z.B. 22, [80, 443] oder "1024-65535"
+        action: ALLOW oder DENY
+        priority: Höhere Priorität wird zuerst geprüft (Standard: 0)
+        name: Bezeichnung für Logs und Analyse
+        src_except: Quell-Präfix(e), die von der Regel ausgenommen sind
+        dst_except: Ziel-Präfix(e), die von der Regel ausgenommen sind
+    """
+
+    def __init__(self, src=None, dst=None, proto=None, dport=None,
+                 action=DENY, priority=0, name=None,
+                 src_except=None, dst_except=None):
+        if action not in (ALLOW, DENY):
+            raise ValueError("Unbekannte Aktion: %r" % (action,))
+        self.src = _parse_prefixes(src)
+        self.dst = _parse_prefixes(dst)
+        self.proto = _parse_proto(proto)
+        self.dport = _parse_ports(dport)
+        self.action = action
+        self.priority = priority
+        self.name = name
+        self.src_except = _parse_prefixes(src_except)
+        self.dst_except = _parse_prefixes(dst_except)
+        # Vorberechnete Masken für matches()
+        self._src_masks = _prefix_masks(self.src)
+        self._dst_masks = _prefix_masks(self.dst)
+        self._src_except_masks = _prefix_masks(self.src_except)
+        self._dst_except_masks = _prefix_masks(self.dst_except)
+
+    def matches(self, src, dst, proto, dport):
+        """
+        Prüft die Regel direkt gegen ein Paket (ohne kompilierten Index)
+
+        Args:
+            src: Quell-IP als Integer
+            dst: Ziel-IP als Integer
+            proto: Protokoll-ID
+            dport: Zielport oder None
+
+        Returns:
+            bool: True wenn die Regel passt
+        """
+        if self.proto is not None and proto != self.proto:
+            return False
+        if self.dport is not None:
+            if dport is None:
+                return False
+            for lo, hi in self.dport:
+                if lo <= dport <= hi:
+                    break
+            else:
+                return False
+        if self.src is not None and not _in_prefixes(src, self._src_masks):
+            return False
+        if self.dst is not None and not _in_prefixes(dst, self._dst_masks):
+            return False
+        if self.src_except is not None and _in_prefixes(src, self._src_except_masks):
+            return False
+        if self.dst_except is not None and _in_prefixes(dst, self._dst_except_masks):
+            return False
+        return True
+
+    def overlaps(self, region):
+        """
+        Prüft ob die Regel auf mindestens ein Paket der Region passen kann
+
+        Args:
+            region: Region (Header-Raum-Ausschnitt)
+
+        Returns:
+            bool: True bei (möglicher) Überschneidung
+        """
+        if self.proto is not None and region.proto is not None and region.proto != self.proto:
+            return False
+        if self.dport is not None and region.dport is not None:
+            if not any(lo <= region.dport <= hi for lo, hi in self.dport):
+                return False
+        for prefixes, excluded, wanted in ((self.src, self.src_except, region.src),
+                                           (self.dst, self.dst_except, region.dst)):
+            if wanted is None:
+                continue
+            if prefixes is not None and not any(prefixes_overlap(p, wanted) for p in prefixes):
+                return False
+            if excluded is not None and any(prefix_contains(p, wanted) for p in excluded):
+                return False
+        return True
+
+    def covers(self, region):
+        """
+        Prüft ob die Regel auf alle Pakete der Region passt
+
+        Args:
+            region: Region (Header-Raum-Ausschnitt)
+
+        Returns:
+            bool: True wenn die Region vollständig abgedeckt ist
+        """
+        if self.proto is not None and region.proto != self.proto:
+            return False
+        if self.dport is not None:
+            if region.dport is None:
+                return False
+            if not any(lo <= region.dport <= hi for lo, hi in self.dport):
+                return False
+        for prefixes, excluded, wanted in ((self.src, self.src_except, region.src),
+                                           (self.dst, self.dst_except, region.dst)):
+            if prefixes is not None:
+                if wanted is None or not any(prefix_contains(p, wanted) for p in prefixes):
+                    return False
+            if excluded is not None:
+                if wanted is None or any(prefixes_overlap(p, wanted) for p in excluded):
+                    return False
+        return True
+
+    def __repr__(self):
+        parts = []
+        if self.name:
+            parts.append(repr(self.name))
+        for field in ('src', 'dst', 'src_except', 'dst_except'):
+            value = getattr(self, field)
+            if value is not None:
+                parts.append("%s=%s" % (field, ",".join(format_prefix(n, l) for n, l in value)))
+        if self.proto is not None:
+            parts.append("proto=%s" % self.proto)
+        if self.dport is not None:
+            parts.append("dport=%s" % ",".join(
+                str(lo) if lo == hi else "%d-%d" % (lo, hi) for lo, hi in self.dport))
+        parts.append(self.action)
+        if self.priority:
+            parts.append("priority=%s" % self.priority)
+        return "Rule(%s)" % " ".join(parts)
+
+
+class _PrefixIndex(object):
+    """
+    Index über eine IP-Dimension (Quelle oder Ziel)
+
+    Pro vorkommender Präfixlänge gibt es einen Hash (Netz → Bitmaske).
+    Ein Lookup prüft jede Länge genau einmal und verknüpft die Treffer.
+    """
+
+    def __init__(self):
+        self.any = 0          # Regeln ohne Einschränkung in dieser Dimension
+        self.tables = []      # [(Shift, {Netz >> Shift: Bitmaske})]
+        self.except_tables = []
+
+    @staticmethod
+    def _build(entries):
+        by_length = {}
+        for bit, prefixes in entries:
+            for net, length in prefixes:
+                table = by_length.setdefault(length, {})
+                key = net >> (32 - length)
+                table[key] = table.get(key, 0) | bit
+        # Längste Präfixe zuerst (für die Lookup-Funktion irrelevant,
+        # erleichtert aber das Debugging)
+        return [(32 - length, by_length[length]) for length in sorted(by_length, reverse=True)]
+
+    def add_all(self, rules, attr, except_attr):
+        positive = []
+        negative = []
+        for index, rule in enumerate(rules):
+            bit = 1 << index
+            prefixes = getattr(rule, attr)
+            if prefixes is None:
+                self.any |= bit
+            else:
+                positive.append((bit, prefixes))
+            excluded = getattr(rule, except_attr)
+            if excluded is not None:
+                negative.append((bit, excluded))
+        self.tables = self._build(positive)
+        self.except_tables = self._build(negative)
+
+    def lookup(self, ip):
+        mask = self.any
+        for shift, table in self.tables:
+            hit = table.get(ip >> shift)
+            if hit:
+                mask |= hit
+        for shift, table in self.except_tables:
+            hit = table.get(ip >> shift)
+            if hit:
+                mask &= ~hit
+        return mask
+
+
+class _PortIndex(object):
+    """
+    Index über den Zielport
+
+    Alle Bereichsgrenzen werden zu Elementar-Intervallen zerlegt; jedes
+    Intervall kennt die Bitmaske der Regeln, die es abdecken. Der Lookup
+    ist eine binäre Suche über die Intervallgrenzen.
+    """
+
+    def __init__(self, rules):
+        self.any = 0          # Regeln ohne Port-Einschränkung
+        starts = {}
+        ends = {}
+        for index, rule in enumerate(rules):
+            bit = 1 << index
+            if rule.dport is None:
+                self.any |= bit
+                continue
+            for lo, hi in rule.dport:
+                starts[lo] = starts.get(lo, 0) | bit
+                ends[hi + 1] = ends.get(hi + 1, 0) | bit
+
+        # Sweep über alle Grenzen: laufende Maske auf- und abbauen
+        self.bounds = sorted(set(starts) | set(ends))
+        self.masks = []
+        current = 0
+        for bound in self.bounds:
+            current = (current & ~ends.get(bound, 0)) | starts.get(bound, 0)
+            self.masks.append(current)
+
+    def lookup(self, dport):
+        if dport is None:
+            return self.any
+        i = bisect_right(self.bounds, dport) - 1
+        if i < 0:
+            return self.any
+        return self.any | self.masks[i]
+
+
+class CompiledACL(object):
+    """
+    Vorkompilierte ACL mit Lookup in nahezu konstanter Zeit
+
+    Args:
+        rules: Liste von Rule-Objekten
+        default_action: Aktion, wenn keine Regel passt (Standard: ALLOW)
+    """
+
+    def __init__(self, rules, default_action=ALLOW):
+        if default_action not in (ALLOW, DENY):
+            raise ValueError("Unbekannte Aktion: %r" % (default_action,))
+        # Stabile Sortierung: höhere Priorität zuerst, sonst Listenreihenfolge
+        self.rules = sorted(rules, key=lambda rule: -rule.priority)
+        self.default_action = default_action
+
+        self._src = _PrefixIndex()
+        self._src.add_all(self.rules, 'src', 'src_except')
+        self._dst = _PrefixIndex()
+        self._dst.add_all(self.rules, 'dst', 'dst_except')
+
+        self._proto_any = 0
+        self._proto = {}
+        for index, rule in enumerate(self.rules):
+            bit = 1 << index
+            if rule.proto is None:
+                self._proto_any |= bit
+            else:
+                self._proto[rule.proto] = self._proto.get(rule.proto, 0) | bit
+
+        self._ports = _PortIndex(self.rules)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def lookup(self, src, dst, proto, dport):
+        """
+        Sucht die erste passende Regel
+
+        Args:
+            src: Quell-IP-Adresse (IPAddr oder Integer)
+            dst: Ziel-IP-Adresse (IPAddr oder Integer)
+            proto: Protokoll-ID
+            dport: Zielport oder None
+
+        Returns:
+            Rule: Passende Regel oder None (→ Standard-Aktion)
+        """
+        mask = self._proto_any | self._proto.get(proto, 0)
+        if mask:
+            mask &= self._ports.lookup(dport)
+        if mask:
+            mask &= self._src.lookup(ip_to_int(src))
+        if mask:
+            mask &= self._dst.lookup(ip_to_int(dst))
+        if not mask:
+            return None
+        return self.rules[(mask & -mask).bit_length() - 1]
+
+    def action_for(self, rule):
+        """
+        Liefert die Aktion eines Lookup-Ergebnisses (None → Standard-Aktion)
+        """
+        if rule is None:
+            return self.default_action
+        return rule.action
+
+    def is_blocked(self, src, dst, proto, dport):
+        """
+        Firewall-Entscheidung für ein Paket
+
+        Returns:
+            bool: True wenn das Paket blockiert werden soll
+        """
+        return self.action_for(self.lookup(src, dst, proto, dport)) == DENY
+
+    def widest_region(self, rule, src, dst, proto, dport):
+        """
+        Größte Region um das Paket mit derselben Entscheidung wie rule
+
+        Siehe compute_widest_region().
+        """
+        return compute_widest_region(self, rule, src, dst, proto, dport)
+
+
+def uniform_action(acl, region):
+    """
+    Prüft ob alle Pakete einer Region dieselbe ACL-Entscheidung bekommen
+
+    Es werden die Regeln in Prüfreihenfolge durchlaufen, bis eine Regel die
+    Region vollständig abdeckt. Haben alle bis dahin überlappenden Regeln
+    (bzw. die Standard-Aktion) dieselbe Aktion, ist die Region einheitlich.
+
+    Args:
+        acl: ACL mit den Attributen rules und default_action
+        region: Zu prüfende Region
+
+    Returns:
+        str: Einheitliche Aktion (ALLOW/DENY) oder None bei gemischter Region
+    """
+    action = None
+    for rule in acl.rules:
+        if not rule.overlaps(region):
+            continue
+        if action is not None and rule.action != action:
+            return None
+        action = rule.action
+        if rule.covers(region):
+            return action
+    if action is not None and acl.default_action != action:
+        return None
+    return acl.default_action
+
+
+def _narrow_prefix(current, prefix):
+    """
+    Schnittmenge eines Regions-Präfixes (None = beliebig) mit einem Präfix
+
+    Returns:
+        tuple: Engeres Präfix oder False, wenn beide disjunkt sind
+    """
+    if current is None or prefix_contains(current, prefix):
+        return prefix
+    if prefix_contains(prefix, current):
+        return current
+    return False
+
+
+def restrict_region(region, src=None, dst=None):
+    """
+    Schränkt eine Region auf Quell- und/oder Zielpräfix ein
+
+    Eine Teilmenge einer einheitlichen Region ist weiterhin einheitlich;
+    so lässt sich z.B. eine Region aus compute_widest_region() auf ein
+    Quell-Subnetz und einen Ziel-Host zuschneiden.
+
+    Args:
+        region: Einzuschränkende Region
+        src: Quellpräfix (Netz, Länge) oder None = unverändert
+        dst: Zielpräfix (Netz, Länge) oder None = unverändert
+
+    Returns:
+        Region: Eingeschränkte Region oder None, wenn die Schnittmenge leer ist
+    """
+    if src is not None:
+        narrowed = _narrow_prefix(region.src, src)
+        if narrowed is False:
+            return None
+        region = region._replace(src=narrowed)
+    if dst is not None:
+        narrowed = _narrow_prefix(region.dst, dst)
+        if narrowed is False:
+            return None
+        region = region._replace(dst=narrowed)
+    return region
+
+
+def _matching_prefix(prefixes, ip):
+    """
+    Liefert das Präfix einer Regel, in dem die IP liegt (None = beliebig)
+    """
+    if prefixes is None:
+        return None
+    for net, length in prefixes:
+        if ip & prefix_mask(length) == net:
+            return (net, length)
+    return (ip, 32)
+
+
+def compute_widest_region(acl, rule, src, dst, proto, dport):
+    """
+    Berechnet die größte Region um ein Paket, die dieselbe Entscheidung bekommt
+
+    Grundlage für Flows mit Wildcards: Felder, die die auslösende Regel nicht
+    prüft (z.B. der Quellport), werden weggelassen, und passt die Regel auf
+    ein ganzes Subnetz, wird dieses Subnetz übernommen. Überschneidet sich
+    die Region mit einer vorrangigen Regel mit anderer Aktion, wird sie
+    schrittweise auf die Host-Adressen eingeengt.
+
+    Args:
+        acl: ACL, die die Entscheidung getroffen hat
+        rule: Auslösende Regel (None = Standard-Aktion)
+        src: Quell-IP-Adresse
+        dst: Ziel-IP-Adresse
+        proto: Protokoll-ID
+        dport: Zielport oder None
+
+    Returns:
+        Region: Größte einheitliche Region oder None, wenn sich die
+                Entscheidung nicht ohne exakten Match ausdrücken lässt
+    """
+    src = ip_to_int(src)
+    dst = ip_to_int(dst)
+    action = acl.action_for(rule)
+    src_host = (src, 32)
+    dst_host = (dst, 32)
+
+    if rule is not None:
+        src_prefix = _matching_prefix(rule.src, src)
+        dst_prefix = _matching_prefix(rule.dst, dst)
+        region_dport = dport if rule.dport is not None else None
+        region_proto = rule.proto
+        if region_dport is not None:
+            # tp_dst lässt sich nur zusammen mit nw_proto matchen
+            region_proto = proto
+        address_pairs = [(src_prefix, dst_prefix), (src_host, dst_prefix),
+                         (src_prefix, dst_host), (src_host, dst_host)]
+        # Zuerst nur die Felder, die die Regel prüft, danach zusätzlich
+        # Protokoll und Zielport des Pakets (Quellport bleibt immer Wildcard)
+        candidates = [Region(s, d, region_proto, region_dport) for s, d in address_pairs]
+        candidates += [Region(s, d, proto, dport) for s, d in address_pairs]
+    else:
+        candidates = [Region(src_host, dst_host, proto, dport)]
+
+    seen = set()
+    for region in candidates:
+        if region in seen:
+            continue
+        seen.add(region)
+        if uniform_action(acl, region) == action:
+            return region
+    return None
+
+
+def compile_rules(rules, default_action=ALLOW):
+    """
+    Kompiliert eine Regelliste in eine CompiledACL
+
+    Args:
+        rules: Liste von Rule-Objekten
+        default_action: Aktion, wenn keine Regel passt
+
+    Returns:
+        CompiledACL: Vorkompilierte ACL
+    """
+    return CompiledACL(rules, default_action)
+
+
+RULE_FIELDS = ('src', 'dst', 'proto', 'dport', 'action', 'priority', 'name',
+               'src_except', 'dst_except')
+
+
+def rule_from_dict(data):
+    """
+    Erzeugt eine Regel aus einem Dictionary (z.B. aus einer JSON-Regeldatei)
+
+    Args:
+        data: Dictionary mit den Feldern aus RULE_FIELDS
+
+    Returns:
+        Rule: Neue Regel
+    """
+    unknown = set(data) - set(RULE_FIELDS)
+    if unknown:
+        raise ValueError("Unbekannte Felder in Regel %r: %s"
+                         % (data.get('name'), ", ".join(sorted(unknown))))
+    return Rule(**data)
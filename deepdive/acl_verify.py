@@ -0,0 +1,427 @@
+"""
+Offline-Prüfung einer ACL auf verdeckte, redundante und widersprüchliche Regeln
+
+Eine Regelliste mit erster passender Regel wächst schnell zu Regeln, die
+nie greifen können (z.B. eine spezielle Regel hinter einer allgemeineren)
+oder die nichts bewirken. analyze() findet diese Regeln auf der
+kompilierten Darstellung (Rule-Objekte in Prüfreihenfolge, wie in
+CompiledACL und ZonePolicy):
+
+    verdeckt (shadowed)     Die Regel greift nie; mindestens eine frühere
+                            Regel mit anderer Aktion nimmt ihr Pakete weg.
+    redundant               Die Regel greift nie und alle früheren Regeln
+                            entscheiden gleich - oder sie greift, aber ohne sie
+                            würden spätere Regeln bzw. die Standard-Aktion
+                            überall gleich entscheiden.
+    Konflikt (correlation)  Zwei Regeln mit verschiedener Aktion überschneiden
+                            sich teilweise (keine enthält die andere); in der
+                            Schnittmenge gewinnt die frühere. Eine allgemeine
+                            Regel hinter einer Ausnahme (Regel j ⊇ Regel i) ist
+                            dagegen gewollt und wird nicht gemeldet.
+
+Header-Raum:
+    Jede Regel ist ein Produkt aus drei Intervallmengen: Quell-IP, Ziel-IP
+    (Präfixe ohne Ausnahmen) und Protokoll/Port. Protokoll und Zielport
+    bilden eine Dimension (Protokoll * 65536 + Port); Pakete ohne Zielport
+    (alles außer TCP und UDP) liegen auf Port 0 ihres Protokolls. Eine
+    Regel mit Zielport für ICMP ist damit leer - wie im Controller.
+
+Zerlegung:
+    Statt Pakete aufzuzählen, wird der Header-Raum Dimension für Dimension
+    in Atome zerlegt: Ein Sweep über die Intervallgrenzen der beteiligten
+    Regeln liefert die verschiedenen Bitmasken (Regeln, die dort passen),
+    jede Maske wird in der nächsten Dimension weiter zerlegt. Gleiche
+    Masken werden nur einmal verfolgt. Jedes Atom ist eine Menge von
+    Regeln, die gemeinsam auf mindestens ein Paket passen; die niedrigste
+    Regel entscheidet, die zweitniedrigste (oder die Standard-Aktion) würde
+    ohne sie entscheiden. Der Aufwand hängt von der Zahl der Atome ab,
+    nicht von der Größe des Header-Raums.
+
+    Enthält eine Maske zwei Regeln, die in allen weiteren Dimensionen
+    alles abdecken (z.B. ohne Quell-IP), liegen beide in jedem Atom
+    darunter: Spätere Regeln können dort weder entscheiden noch
+    Rückfall sein. Sie werden vor dem Zerlegen entfernt, sobald frühere
+    Atome sie für jede dort mögliche entscheidende Regel schon
+    eingetragen haben. Die Befunde bleiben gleich, die Zahl und Größe
+    der Atome in der letzten Dimension sinkt stark.
+
+Aufwand (--benchmark, Zufallsregeln, ein Kern):
+      500 Regeln  0,2 s         3000 Regeln  1,8 s
+     1000 Regeln  0,5 s         5000 Regeln  4,5 s
+     2000 Regeln  1,2 s        10000 Regeln 15,2 s
+    Bis etwa 3000 Regeln wächst die Laufzeit fast linear, darüber etwa
+    mit n^1,8. Ohne das Entfernen waren es 1,8 s für 1000 und 25 s für
+    3000 Regeln. Regelwerke, in denen kaum eine Regel eine Dimension
+    offen lässt, profitieren weniger.
+
+Verwendung:
+    python -m deepdive.acl_verify                       # enterprise_policy.json
+    python -m deepdive.acl_verify meine_regeln.json
+    python -m deepdive.acl_verify --benchmark 2000      # Zufallsregeln
+"""
+
+import random
+import sys
+import time
+from collections import namedtuple
+
+from .acl_compiler import DENY, PROTOCOLS, Rule, prefix_difference
+from .zone_policy import ENTERPRISE_POLICY_FILE, load_policy
+
+SHADOWED = 'shadowed'
+REDUNDANT = 'redundant'
+CONFLICT = 'conflict'
+
+# Meldung der Analyse:
+#   kind: SHADOWED, REDUNDANT oder CONFLICT
+#   index, rule: Betroffene Regel (Position in Prüfreihenfolge)
+#   others: Positionen der beteiligten Regeln (None = Standard-Aktion)
+Finding = namedtuple('Finding', ['kind', 'index', 'rule', 'others'])
+
+_PORT_PROTOCOLS = (PROTOCOLS['tcp'], PROTOCOLS['udp'])
+
+
+def _prefix_intervals(prefixes, excluded):
+    """
+    Intervallmenge einer Regel-Dimension (Präfixe ohne Ausnahmen)
+    """
+    parents = [(0, 0)] if prefixes is None else list(prefixes)
+    intervals = []
+    for parent in parents:
+        parts = prefix_difference(parent, excluded) if excluded else [parent]
+        intervals.extend((net, net + (1 << (32 - length)) - 1) for net, length in parts)
+    return _normalize(intervals)
+
+
+def _proto_port_intervals(rule):
+    """
+    Intervallmenge der Protokoll/Port-Dimension einer Regel
+    """
+    protos = range(256) if rule.proto is None else [rule.proto]
+    intervals = []
+    for proto in protos:
+        base = proto << 16
+        if proto not in _PORT_PROTOCOLS:
+            if rule.dport is None:
+                intervals.append((base, base))
+        elif rule.dport is None:
+            intervals.append((base, base + 0xffff))
+        else:
+            intervals.extend((base + lo, base + hi) for lo, hi in rule.dport)
+    return _normalize(intervals)
+
+
+def _normalize(intervals):
+    """
+    Sortiert Intervalle und fasst überlappende bzw. angrenzende zusammen
+    """
+    merged = []
+    for lo, hi in sorted(intervals):
+        if merged and lo <= merged[-1][1] + 1:
+            if hi > merged[-1][1]:
+                merged[-1] = (merged[-1][0], hi)
+        else:
+            merged.append((lo, hi))
+    return merged
+
+
+def _contains(outer, inner):
+    """
+    Prüft ob die Intervallmenge outer die Intervallmenge inner enthält
+    """
+    i = 0
+    for lo, hi in inner:
+        while i < len(outer) and outer[i][1] < lo:
+            i += 1
+        if i == len(outer) or outer[i][0] > lo or outer[i][1] < hi:
+            return False
+    return True
+
+
+class RuleSpace(object):
+    """
+    Header-Raum einer Regel als Produkt von drei Intervallmengen
+
+    Args:
+        rule: acl_compiler.Rule
+    """
+
+    __slots__ = ('dims',)
+
+    def __init__(self, rule):
+        self.dims = (_proto_port_intervals(rule),
+                     _prefix_intervals(rule.dst, rule.dst_except),
+                     _prefix_intervals(rule.src, rule.src_except))
+
+    @property
+    def empty(self):
+        return not all(self.dims)
+
+    def contains(self, other):
+        """
+        Prüft ob dieser Raum den (nicht leeren) Raum other vollständig enthält
+        """
+        return all(_contains(mine, theirs) for mine, theirs in zip(self.dims, other.dims))
+
+
+def _split(mask, dimension):
+    """
+    Zerlegt eine Regelmenge entlang einer Dimension
+
+    Args:
+        mask: Bitmaske der Regeln
+        dimension: Liste der Intervallmengen pro Regel
+
+    Returns:
+        set: Verschiedene Teilmasken der Regeln, die gemeinsam auf einen
+             Abschnitt der Dimension passen
+    """
+    events = {}
+    remaining = mask
+    while remaining:
+        low = remaining & -remaining
+        remaining ^= low
+        for lo, hi in dimension[low.bit_length() - 1]:
+            # Intervalle einer Regel sind disjunkt: Bit an beiden Grenzen umschalten
+            events[lo] = events.get(lo, 0) ^ low
+            events[hi + 1] = events.get(hi + 1, 0) ^ low
+    parts = set()
+    current = 0
+    for bound in sorted(events):
+        current ^= events[bound]
+        if current:
+            parts.add(current)
+    return parts
+
+
+def atoms(spaces, prune=None):
+    """
+    Zerlegt den Header-Raum in Atome (Regelmengen mit gemeinsamem Paket)
+
+    Die Atome der letzten Dimension werden geliefert, sobald ihre Maske
+    zerlegt ist; ein Atom kann dabei mehrfach vorkommen. So sieht prune
+    bereits das Ergebnis der zuvor gelieferten Atome.
+
+    Args:
+        spaces: RuleSpace pro Regel in Prüfreihenfolge
+        prune: Optionale Funktion (Maske, Dimension) → Maske, die vor dem
+               Zerlegen Regeln entfernt, die kein Ergebnis mehr ändern
+
+    Yields:
+        int: Bitmaske der Regeln je Atom (Bit i = Regel i)
+    """
+    start = 0
+    for index, space in enumerate(spaces):
+        if not space.empty:
+            start |= 1 << index
+    level = {start} if start else set()
+    for dimension in range(3):
+        intervals = [space.dims[dimension] for space in spaces]
+        following = set()
+        for mask in level:
+            if prune is not None:
+                mask = prune(mask, dimension)
+            parts = _split(mask, intervals)
+            if dimension == 2:
+                for part in parts:
+                    yield part
+            else:
+                following.update(parts)
+        level = following
+
+
+def _universe(dimension):
+    """
+    Intervallmenge einer Dimension, die jede Regel ohne Einschränkung hat
+    """
+    if dimension == 0:
+        return _proto_port_intervals(Rule())
+    return [(0, 0xffffffff)]
+
+
+def _bits(mask):
+    while mask:
+        low = mask & -mask
+        mask ^= low
+        yield low.bit_length() - 1
+
+
+def analyze(acl):
+    """
+    Sucht verdeckte, redundante und widersprüchliche Regeln
+
+    Args:
+        acl: ACL mit rules (Prüfreihenfolge) und default_action, z.B.
+             CompiledACL, ZonePolicy oder CachedACL
+
+    Returns:
+        list: Finding pro Befund, nach Regelposition sortiert
+    """
+    rules = acl.rules
+    spaces = [RuleSpace(rule) for rule in rules]
+    deny = 0
+    for index, rule in enumerate(rules):
+        if rule.action == DENY:
+            deny |= 1 << index
+    everything = (1 << len(rules)) - 1
+    fires = 0
+    needed = 0
+    covered = {}      # Entscheidende Regel → Maske der späteren Regeln in ihren Atomen
+    fallbacks = {}    # Regel → Entscheidung ohne sie (Regel oder None = Standard)
+
+    # Regeln, die in allen Dimensionen ab d den ganzen Wertebereich abdecken
+    full = [_universe(dimension) for dimension in range(3)]
+    universal = [0, 0, 0]
+    for index, space in enumerate(spaces):
+        for dimension in range(3):
+            if all(space.dims[d] == full[d] for d in range(dimension, 3)):
+                universal[dimension] |= 1 << index
+
+    def prune(mask, dimension):
+        # Liegen zwei Regeln u1 < u2 in allen weiteren Dimensionen ganz im
+        # Atom, entscheidet eine Regel <= u1 mit Rückfall <= u2. Spätere
+        # Regeln ändern dann nur noch covered - und das nicht mehr, wenn
+        # sie dort für jede mögliche entscheidende Regel schon stehen.
+        common = mask & universal[dimension]
+        first = common & -common
+        second = (common ^ first) & -(common ^ first)
+        if not second:
+            return mask
+        known = mask & ~((second << 1) - 1)
+        for index in _bits(mask & ((first << 1) - 1)):
+            known &= covered.get(index, 0)
+            if not known:
+                return mask
+        return mask ^ known
+
+    # Pro Atom nur Masken-Operationen, keine Schleife über die Regeln im Atom
+    for mask in atoms(spaces, prune):
+        low = mask & -mask
+        first = low.bit_length() - 1
+        rest = mask ^ low
+        fires |= low
+        if rest:
+            second = rest & -rest
+            fallback_denies = bool(second & deny)
+            second = second.bit_length() - 1
+        else:
+            fallback_denies = acl.default_action == DENY
+            second = None
+        if fallback_denies != bool(low & deny):
+            needed |= low
+        fallbacks.setdefault(first, set()).add(second)
+        covered[first] = covered.get(first, 0) | rest
+
+    winners = {}      # Nie greifende Regel → frühere Regeln, die dort entscheiden
+    overruled = {}    # Spätere Regel → frühere Regeln mit anderer Aktion
+    for first, later in covered.items():
+        for index in _bits(later & ~fires):
+            winners.setdefault(index, []).append(first)
+        opposite = later & (everything ^ deny if (1 << first) & deny else deny)
+        for index in _bits(opposite):
+            overruled.setdefault(index, []).append(first)
+
+    findings = []
+    for index, rule in enumerate(rules):
+        if not fires >> index & 1:
+            kind = SHADOWED if index in overruled else REDUNDANT
+            findings.append(Finding(kind, index, rule, sorted(winners.get(index, ()))))
+        elif not needed >> index & 1:
+            findings.append(Finding(REDUNDANT, index, rule,
+                                    sorted(fallbacks[index], key=lambda other: (
+                                        other is None, other))))
+        else:
+            # Überschneidung mit früheren Regeln anderer Aktion, außer wenn
+            # diese ganz enthalten sind (Ausnahme vor allgemeiner Regel)
+            partial = [other for other in overruled.get(index, ())
+                       if not spaces[index].contains(spaces[other])]
+            if partial:
+                findings.append(Finding(CONFLICT, index, rule, sorted(partial)))
+    findings.sort(key=lambda finding: (finding.index, finding.kind))
+    return findings
+
+
+def summary(findings):
+    """
+    Zählt die Befunde pro Art
+
+    Returns:
+        dict: shadowed, redundant, conflict
+    """
+    counts = {SHADOWED: 0, REDUNDANT: 0, CONFLICT: 0}
+    for finding in findings:
+        counts[finding.kind] += 1
+    return counts
+
+
+def _describe(rules, index):
+    if index is None:
+        return "Standard-Aktion"
+    rule = rules[index]
+    return "#%d %s" % (index + 1, rule.name or rule)
+
+
+def format_finding(rules, finding):
+    """
+    Formatiert einen Befund als Textzeile
+    """
+    others = ", ".join(_describe(rules, other) for other in finding.others)
+    if finding.kind == SHADOWED:
+        text = "verdeckt durch %s" % others
+    elif finding.kind == CONFLICT:
+        text = "überschneidet sich mit anderer Aktion mit %s (frühere gewinnt)" % others
+    elif not finding.others:
+        text = "passt auf kein Paket"
+    else:
+        text = "redundant, gleiche Entscheidung durch %s" % others
+    return "%-9s %s: %s" % (finding.kind, _describe(rules, finding.index), text)
+
+
+def random_rules(count, seed=1):
+    """
+    Zufällige Regeln für den Benchmark (Präfixe in 10.0.0.0/8, wenige Ports)
+    """
+    rng = random.Random(seed)
+
+    def prefix():
+        length = rng.choice([8, 16, 16, 24, 24, 24, 32])
+        net = (10 << 24) | (rng.getrandbits(24) & ~((1 << (32 - length)) - 1) & 0xffffff)
+        return "%d.%d.%d.%d/%d" % (net >> 24, (net >> 16) & 0xff, (net >> 8) & 0xff,
+                                   net & 0xff, length)
+
+    rules = []
+    for _ in range(count):
+        proto = rng.choice([None, "tcp", "tcp", "udp", "icmp"])
+        dport = None
+        if proto in ("tcp", "udp") and rng.random() < 0.7:
+            dport = rng.choice([22, 53, 80, 443, 3306, "1024-65535", [80, 443]])
+        rules.append(Rule(src=prefix() if rng.random() < 0.8 else None,
+                          dst=prefix() if rng.random() < 0.9 else None,
+                          proto=proto, dport=dport,
+                          action=rng.choice(["allow", "deny"])))
+    return rules
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == '--benchmark':
+        from .acl_compiler import compile_rules
+        for count in [int(arg) for arg in argv[1:]] or [500, 1000, 2000]:
+            acl = compile_rules(random_rules(count))
+            start = time.perf_counter()
+            findings = analyze(acl)
+            elapsed = time.perf_counter() - start
+            print("%5d Regeln: %7.2f s, %s" % (count, elapsed, summary(findings)))
+        return
+    path = argv[0] if argv else ENTERPRISE_POLICY_FILE
+    acl = load_policy(path)
+    start = time.perf_counter()
+    findings = analyze(acl)
+    elapsed = time.perf_counter() - start
+    for finding in findings:
+        print(format_finding(acl.rules, finding))
+    print("%d Regeln in %.3f s geprüft: %s" % (len(acl.rules), elapsed, summary(findings)))
+
+
+if __name__ == "__main__":
+    main()
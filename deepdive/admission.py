@@ -0,0 +1,226 @@
+"""
+Zulassung von PacketIns per Token-Bucket pro Port und pro Quelle
+
+Ein einzelner Host kann den Controller mit PacketIns fluten, z.B. per
+MAC-Flood (jedes Paket mit neuer Quell-MAC landet beim L2-Switch) oder
+per ARP-Sweep (der L3-Switch beantwortet bzw. löst jede Adresse auf). Alle
+anderen Hosts warten dann hinter der Flut in derselben Event-Schleife.
+
+AdmissionControl prüft jeden PacketIn vor der eigentlichen Verarbeitung:
+    - Quelle (MAC bzw. IP): eigener Token-Bucket (source_rate, source_burst).
+      Ein einzelner lauter Host wird so erkannt, bevor das Budget seines
+      Ports aufgebraucht ist.
+    - (dpid, in_port): Token-Bucket für alle Quellen hinter dem Port
+      (port_rate, port_burst) - fängt Fluten mit ständig neuen Quellen ab.
+
+Ist ein Bucket leer, kommt Quelle bzw. Port für quarantine_time Sekunden in
+Quarantäne. Der Controller installiert dafür einen Drop-Flow mit passendem
+Hard-Timeout (OpenFlow 1.0 kennt keine Meter), weitere PacketIns in dieser
+Zeit werden ohne Verarbeitung verworfen. Die Quell-Buckets sind begrenzt
+(LRU), damit ein MAC-Flood die Tabelle nicht beliebig wachsen lässt.
+
+Ports zu anderen Switches tragen den Verkehr vieler Hosts; eine Sperre
+dort würde alle Hosts dahinter abschneiden. Der Controller nimmt solche
+Ports mit exempt_port() aus der Port-Prüfung aus (mit Topologie die
+Links, sonst Ports mit Verkehr von Hosts, die an einem anderen Switch
+angeschlossen sind); für sie gelten nur noch die Quell-Buckets.
+
+Beispiel:
+    admission = AdmissionControl()
+    verdict = admission.check(dpid, in_port, source)
+    if verdict == QUARANTINE_SOURCE:
+        install_drop_flow(source, admission.quarantine_time)
+"""
+
+import time
+from collections import OrderedDict
+
+# Standardbudgets (PacketIns pro Sekunde, Burst = doppelte Rate)
+PORT_RATE = 200.0
+SOURCE_RATE = 50.0
+QUARANTINE_TIME = 10.0
+MAX_SOURCES = 4096
+# Priorität der Quarantäne-Flows (über ACL und Routen, siehe proactive.py)
+QUARANTINE_PRIORITY = 65000
+
+# Ergebnisse von check()
+ADMIT = 'admit'
+DROP = 'drop'                          # Bereits in Quarantäne
+QUARANTINE_PORT = 'quarantine_port'    # Port gerade in Quarantäne genommen
+QUARANTINE_SOURCE = 'quarantine_source'  # Quelle gerade in Quarantäne genommen
+
+
+class TokenBucket(object):
+    """
+    Token-Bucket: rate Tokens pro Sekunde, höchstens burst Tokens
+    """
+
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+
+    def consume(self, now, amount=1):
+        """
+        Entnimmt amount Tokens
+
+        Returns:
+            bool: True, wenn genug Tokens vorhanden waren
+        """
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+            self.updated = now
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return True
+        return False
+
+
+class AdmissionControl(object):
+    """
+    Token-Buckets und Quarantäne für PacketIns aller Switches
+
+    Args:
+        port_rate: PacketIns/s pro (dpid, in_port)
+        port_burst: Burst pro (dpid, in_port) (Standard: 2 * port_rate)
+        source_rate: PacketIns/s pro Quelle
+        source_burst: Burst pro Quelle (Standard: 2 * source_rate)
+        quarantine_time: Sekunden, die ein Port bzw. eine Quelle gesperrt bleibt
+        max_sources: Maximale Anzahl Quell-Buckets (LRU)
+        clock: Zeitquelle (für Tests und den Benchmark austauschbar)
+    """
+
+    def __init__(self, port_rate=PORT_RATE, port_burst=None, source_rate=SOURCE_RATE,
+                 source_burst=None, quarantine_time=QUARANTINE_TIME,
+                 max_sources=MAX_SOURCES, clock=time.time):
+        self.port_rate = port_rate
+        self.port_burst = port_burst if port_burst is not None else 2 * port_rate
+        self.source_rate = source_rate
+        self.source_burst = source_burst if source_burst is not None else 2 * source_rate
+        self.quarantine_time = quarantine_time
+        self.max_sources = max_sources
+        self.clock = clock
+        self._ports = {}                 # (dpid, Port) → TokenBucket
+        self._sources = OrderedDict()    # Quelle → TokenBucket, älteste zuerst
+        self._quarantine = {}            # ('port', dpid, Port) / ('source', Quelle) → Ende
+        self._exempt_ports = set()       # (dpid, Port) ohne Port-Bucket
+        self.admitted = 0
+        self.dropped = 0
+        self.quarantined_ports = 0
+        self.quarantined_sources = 0
+
+    def _quarantined(self, key, now):
+        until = self._quarantine.get(key)
+        if until is None:
+            return False
+        if now < until:
+            return True
+        del self._quarantine[key]
+        return False
+
+    def _start_quarantine(self, key, now):
+        if len(self._quarantine) >= self.max_sources:
+            self._quarantine = dict((k, until) for k, until in self._quarantine.items()
+                                    if until > now)
+        self._quarantine[key] = now + self.quarantine_time
+        self.dropped += 1
+
+    def check(self, dpid, port, source, now=None):
+        """
+        Prüft, ob ein PacketIn verarbeitet werden darf
+
+        Args:
+            dpid: Switch des PacketIns
+            port: Eingangsport
+            source: Quelle (MAC-Adresse oder IP als Integer)
+            now: Zeitpunkt (Standard: clock())
+
+        Returns:
+            str: ADMIT, DROP, QUARANTINE_PORT oder QUARANTINE_SOURCE
+        """
+        now = self.clock() if now is None else now
+        port_key = ('port', dpid, port)
+        source_key = ('source', source)
+        if self._quarantine and (self._quarantined(port_key, now) or
+                                 self._quarantined(source_key, now)):
+            self.dropped += 1
+            return DROP
+
+        bucket = self._sources.get(source)
+        if bucket is None:
+            bucket = self._sources[source] = TokenBucket(self.source_rate,
+                                                         self.source_burst, now)
+            if len(self._sources) > self.max_sources:
+                self._sources.popitem(last=False)
+        else:
+            self._sources.move_to_end(source)
+        if not bucket.consume(now):
+            self._start_quarantine(source_key, now)
+            self.quarantined_sources += 1
+            return QUARANTINE_SOURCE
+
+        if (dpid, port) in self._exempt_ports:
+            self.admitted += 1
+            return ADMIT
+        bucket = self._ports.get((dpid, port))
+        if bucket is None:
+            bucket = self._ports[(dpid, port)] = TokenBucket(self.port_rate,
+                                                             self.port_burst, now)
+        if not bucket.consume(now):
+            self._start_quarantine(port_key, now)
+            self.quarantined_ports += 1
+            return QUARANTINE_PORT
+
+        self.admitted += 1
+        return ADMIT
+
+    def exempt_port(self, dpid, port):
+        """
+        Nimmt einen Port aus der Port-Prüfung aus und hebt seine Sperre auf
+
+        Gedacht für den Aufruf direkt nach check() mit QUARANTINE_PORT.
+
+        Args:
+            dpid: Switch
+            port: Port, z.B. ein Uplink zu einem anderen Switch
+        """
+        self._exempt_ports.add((dpid, port))
+        self._ports.pop((dpid, port), None)
+        if self._quarantine.pop(('port', dpid, port), None) is not None:
+            # Gerade von check() ausgelöste Sperre: der PacketIn gilt als zugelassen
+            self.quarantined_ports -= 1
+            self.dropped -= 1
+            self.admitted += 1
+
+    def remove_switch(self, dpid):
+        """
+        Vergisst Port-Buckets, Ausnahmen und Port-Quarantänen eines Switches (ConnectionDown)
+        """
+        for key in [key for key in self._ports if key[0] == dpid]:
+            del self._ports[key]
+        self._exempt_ports = set(key for key in self._exempt_ports if key[0] != dpid)
+        for key in [key for key in self._quarantine if key[0] == 'port' and key[1] == dpid]:
+            del self._quarantine[key]
+
+    def stats(self):
+        """
+        Liefert die Zähler
+
+        Returns:
+            dict: admitted, dropped, quarantined_ports, quarantined_sources,
+                  quarantine (aktive Sperren), sources (Quell-Buckets),
+                  exempt_ports (Ports ohne Port-Bucket)
+        """
+        return {
+            'admitted': self.admitted,
+            'dropped': self.dropped,
+            'quarantined_ports': self.quarantined_ports,
+            'quarantined_sources': self.quarantined_sources,
+            'quarantine': len(self._quarantine),
+            'sources': len(self._sources),
+            'exempt_ports': len(self._exempt_ports),
+        }
@@ -0,0 +1,128 @@
+"""
+ARP-Replies aus vorgefertigten Byte-Vorlagen
+
+Der L3-Switch beantwortet ARP-Requests für Gateways und für alle Hosts,
+deren Standort er kennt, selbst (ARP-Proxy). Bisher wurde dafür pro Request
+ein arp()- und ein ethernet()-Objekt gebaut und mit pack() serialisiert.
+
+ArpReplyTemplates hält pro (Ziel-IP, Ziel-MAC) den fertigen 42-Byte-Frame.
+Pro Reply werden nur noch die Felder des Requesters eingesetzt:
+
+    Offset  Feld
+     0- 5   Ethernet-Ziel (Requester-MAC)      ← eingesetzt
+     6-11   Ethernet-Quelle (Ziel-MAC)
+    12-13   EtherType ARP
+    14-21   Hardware-/Protokoll-Typ, Längen, Opcode REPLY
+    22-27   Sender-MAC (Ziel-MAC)
+    28-31   Sender-IP (Ziel-IP)
+    32-37   Target-MAC (Requester-MAC)         ← eingesetzt
+    38-41   Target-IP (Requester-IP)           ← eingesetzt
+
+Die Vorlagen sind begrenzt (LRU); eine neue MAC für eine IP ergibt einfach
+eine neue Vorlage.
+
+Beispiel:
+    templates = ArpReplyTemplates()
+    msg.data = templates.reply(target_ip, target_mac, requester_ip, requester_mac)
+"""
+
+import struct
+from collections import OrderedDict
+
+from .acl_compiler import ip_to_int
+
+# Maximale Anzahl gehaltener Vorlagen
+TEMPLATE_CACHE_SIZE = 1024
+
+_ETH_TYPE_ARP = 0x0806
+_ARP_REPLY = 2
+# Ethernet-Header (Ziel leer) und ARP-Header (Target leer): 42 Bytes
+_FRAME = struct.Struct("!6s6sHHHBBH6s4s6s4s")
+
+
+def mac_to_bytes(mac):
+    """
+    Rohe 6 Bytes einer MAC-Adresse (EthAddr oder bytes)
+    """
+    raw = getattr(mac, 'toRaw', None)
+    return raw() if raw is not None else bytes(mac)
+
+
+class ArpReplyTemplates(object):
+    """
+    Fertige ARP-Reply-Frames pro (Ziel-IP, Ziel-MAC)
+
+    Args:
+        max_entries: Maximale Anzahl Vorlagen
+    """
+
+    def __init__(self, max_entries=TEMPLATE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._templates = OrderedDict()  # (IP, MAC-Bytes) → bytes
+        self.built = 0      # Neu gebaute Vorlagen
+        self.replies = 0    # Aus Vorlagen erzeugte Replies
+
+    def __len__(self):
+        return len(self._templates)
+
+    def template(self, target_ip, target_mac):
+        """
+        Liefert die Vorlage für eine Ziel-Adresse (legt sie bei Bedarf an)
+
+        Args:
+            target_ip: Gesuchte IP (IPAddr oder Integer)
+            target_mac: MAC-Adresse, die geantwortet wird
+
+        Returns:
+            bytes: Frame mit leeren Requester-Feldern
+        """
+        mac = mac_to_bytes(target_mac)
+        key = (ip_to_int(target_ip), mac)
+        frame = self._templates.get(key)
+        if frame is not None:
+            self._templates.move_to_end(key)
+            return frame
+        frame = _FRAME.pack(b'\0' * 6, mac, _ETH_TYPE_ARP, 1, 0x0800, 6, 4, _ARP_REPLY,
+                            mac, struct.pack("!I", key[0]), b'\0' * 6, b'\0' * 4)
+        self._templates[key] = frame
+        if len(self._templates) > self.max_entries:
+            self._templates.popitem(last=False)
+        self.built += 1
+        return frame
+
+    def reply(self, target_ip, target_mac, requester_ip, requester_mac):
+        """
+        Baut einen ARP-Reply aus der Vorlage
+
+        Args:
+            target_ip: Gesuchte IP (IPAddr oder Integer)
+            target_mac: MAC-Adresse, die geantwortet wird
+            requester_ip: IP des Requesters
+            requester_mac: MAC des Requesters
+
+        Returns:
+            bytes: Fertiger Ethernet-Frame für ofp_packet_out.data
+        """
+        frame = bytearray(self.template(target_ip, target_mac))
+        mac = mac_to_bytes(requester_mac)
+        frame[0:6] = mac
+        frame[32:38] = mac
+        frame[38:42] = struct.pack("!I", ip_to_int(requester_ip))
+        self.replies += 1
+        return bytes(frame)
+
+    def clear(self):
+        self._templates.clear()
+
+    def stats(self):
+        """
+        Liefert die Zähler
+
+        Returns:
+            dict: templates, built, replies
+        """
+        return {
+            'templates': len(self._templates),
+            'built': self.built,
+            'replies': self.replies,
+        }
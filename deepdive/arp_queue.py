@@ -0,0 +1,166 @@
+"""
+Warteschlange für Pakete mit ausstehender ARP-Auflösung
+
+Kennt der L3-Switch die MAC-Adresse eines Ziels noch nicht, schickt er einen
+ARP-Request. Bisher ging das auslösende Paket dabei verloren, und jede
+Wiederholung des Hosts erzeugte einen weiteren ARP-Flood. Die Warteschlange
+hält die Pakete pro Ziel-IP zurück, bis der ARP-Reply eintrifft:
+
+- Pro Ziel-IP gibt es genau einen ausstehenden ARP-Request; weitere Pakete
+  für dieselbe IP werden nur angehängt.
+- Pro IP werden höchstens max_per_ip Pakete gehalten, insgesamt höchstens
+  max_total. Darüber hinaus werden neue Pakete verworfen.
+- Nach timeout Sekunden ohne Reply verfällt der Eintrag mit allen Paketen;
+  das nächste Paket für die IP löst dann einen neuen ARP-Request aus.
+
+Beispiel:
+    queue = PendingArpQueue()
+    if queue.add(dst_ip, (packet, in_port, event)):
+        send_arp_request(dst_ip)
+    ...
+    for packet, in_port, event in queue.pop(reply_ip):
+        forward(packet)
+"""
+
+import time
+from collections import OrderedDict
+
+from .acl_compiler import ip_to_int
+
+# Standardgrenzen der Warteschlange
+MAX_PER_IP = 8
+MAX_TOTAL = 256
+ARP_TIMEOUT = 2.0
+
+
+class _Pending(object):
+    """
+    Ausstehende Auflösung einer Ziel-IP
+    """
+
+    __slots__ = ('created', 'items')
+
+    def __init__(self, created):
+        self.created = created
+        self.items = []
+
+
+class PendingArpQueue(object):
+    """
+    Pakete pro Ziel-IP bis zum ARP-Reply zurückhalten
+
+    Args:
+        max_per_ip: Maximale Anzahl Pakete pro Ziel-IP
+        max_total: Maximale Anzahl Pakete insgesamt
+        timeout: Sekunden bis ein unbeantworteter Request verfällt
+        clock: Zeitquelle (für Tests austauschbar)
+    """
+
+    def __init__(self, max_per_ip=MAX_PER_IP, max_total=MAX_TOTAL,
+                 timeout=ARP_TIMEOUT, clock=time.time):
+        self.max_per_ip = max_per_ip
+        self.max_total = max_total
+        self.timeout = timeout
+        self.clock = clock
+        self._pending = OrderedDict()  # IP (Integer) → _Pending, älteste zuerst
+        self.queued = 0                # Aktuell gehaltene Pakete
+        self.requests = 0              # Gesendete ARP-Requests
+        self.coalesced = 0             # Pakete ohne eigenen ARP-Request
+        self.released = 0              # Nach einem Reply weitergeleitete Pakete
+        self.dropped = 0               # Wegen Grenzen verworfene Pakete
+        self.expired = 0               # Wegen Timeout verworfene Pakete
+
+    def __len__(self):
+        return len(self._pending)
+
+    def __contains__(self, ip):
+        return ip_to_int(ip) in self._pending
+
+    def add(self, ip, item, now=None):
+        """
+        Hängt ein Paket an die Warteschlange einer Ziel-IP an
+
+        Args:
+            ip: Ziel-IP (IPAddr oder Integer)
+            item: Beliebiges Objekt (z.B. (Paket, Eingangsport, Event))
+            now: Aktueller Zeitpunkt (Standard: clock())
+
+        Returns:
+            bool: True wenn für die IP ein neuer ARP-Request gesendet werden muss
+        """
+        now = self.clock() if now is None else now
+        self.expire(now)
+        key = ip_to_int(ip)
+        pending = self._pending.get(key)
+        is_new = pending is None
+        if is_new:
+            pending = self._pending[key] = _Pending(now)
+            self.requests += 1
+        else:
+            self.coalesced += 1
+
+        if len(pending.items) >= self.max_per_ip or self.queued >= self.max_total:
+            self.dropped += 1
+        else:
+            pending.items.append(item)
+            self.queued += 1
+        return is_new
+
+    def pop(self, ip, now=None):
+        """
+        Entnimmt alle Pakete einer Ziel-IP (beim ARP-Reply)
+
+        Args:
+            ip: Aufgelöste IP (IPAddr oder Integer)
+            now: Aktueller Zeitpunkt (Standard: clock())
+
+        Returns:
+            list: Gehaltene Pakete in Ankunftsreihenfolge (leer wenn keine)
+        """
+        now = self.clock() if now is None else now
+        self.expire(now)
+        pending = self._pending.pop(ip_to_int(ip), None)
+        if pending is None:
+            return []
+        self.queued -= len(pending.items)
+        self.released += len(pending.items)
+        return pending.items
+
+    def expire(self, now=None):
+        """
+        Verwirft Einträge, deren ARP-Request unbeantwortet blieb
+
+        Args:
+            now: Aktueller Zeitpunkt (Standard: clock())
+
+        Returns:
+            int: Anzahl verworfener Pakete
+        """
+        now = self.clock() if now is None else now
+        dropped = 0
+        while self._pending:
+            key, pending = next(iter(self._pending.items()))
+            if now - pending.created < self.timeout:
+                break
+            del self._pending[key]
+            dropped += len(pending.items)
+        self.queued -= dropped
+        self.expired += dropped
+        return dropped
+
+    def stats(self):
+        """
+        Liefert die Zähler der Warteschlange
+
+        Returns:
+            dict: pending, queued, requests, coalesced, released, dropped, expired
+        """
+        return {
+            'pending': len(self._pending),
+            'queued': self.queued,
+            'requests': self.requests,
+            'coalesced': self.coalesced,
+            'released': self.released,
+            'dropped': self.dropped,
+            'expired': self.expired,
+        }
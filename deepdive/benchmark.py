@@ -0,0 +1,804 @@
+"""
+Benchmark für die PacketIn-Verarbeitung der Controller
+
+Spielt synthetische PacketIn-Events in LearningSwitchWithFirewall,
+Layer3SwitchWithFirewall und SimpleFirewall ein - ohne Mininet und ohne
+echten Switch. Statt der OpenFlow-Verbindung bekommen die Controller eine
+BenchConnection, die gesendete Nachrichten wie die echte Verbindung
+serialisiert, zählt und auf Wunsch aufzeichnet.
+
+Jedes Paket wird als PacketIn zugestellt, so als ob der Switch noch keine
+passenden Flows hätte. Gemessen wird damit die reine Handler-Zeit des
+Controllers pro Event.
+
+Workloads (Adressplan aus enterprise_network_topo.EnterpriseNetworkTopo):
+    arp_storm       ARP-Requests vieler (auch unbekannter) Hosts
+    port_scan       TCP-SYN-Scan eines externen Hosts auf einen DMZ-Server
+    enterprise_mix  Gemischter Verkehr (HTTP, HTTPS, SSH, DNS, ICMP, ...)
+                    zwischen allen Zonen
+    elephant_mice   Wenige große Flows tragen den Großteil der Pakete,
+                    dazu viele kurze Flows
+    syn_flood       TCP-SYNs vieler Clients mit wechselnden Quellports
+                    auf den DMZ-Webserver
+    mac_flood       90 % Pakete mit ständig neuer Quell-MAC von einem Port,
+                    dazu normaler Verkehr der übrigen Hosts
+    arp_sweep       90 % ARP-Requests eines Hosts für alle Adressen der
+                    Subnetze, dazu normaler Verkehr der übrigen Hosts
+
+Ausgabe pro Controller und Workload: Pakete/s, p50/p99 der Handler-Latenz,
+gesendete Nachrichten und Socket-Writes pro Event. Mit --batch senden die
+Controller über einen MessageBatcher, der nach jeweils --burst Events
+geschrieben wird. Mit --buffered liefert der simulierte Switch eine gültige
+buffer_id, sodass die Controller die Pakete nicht mit zurückschicken. Mit --fast_path klassifizieren L2- und
+L3-Switch die Pakete aus den Rohdaten (flow_key.flow_key_from_bytes);
+--classify misst nur die Klassifizierung (POX-Parser gegen Rohdaten).
+--elephants spielt eine Flow-Statistik in den ElephantDetector ein: aus
+einem Workload erzeugt (flow_stats_trace()) oder mit --stats_trace aus einer
+von den Controllern aufgezeichneten Datei. Mit --admission prüfen L2- und
+L3-Switch jeden PacketIn gegen die Token-Buckets aus admission.py; die Zeit
+läuft dabei simuliert mit --offered_rate Events pro Sekunde, die Spalte
+"andere" zeigt den Anteil zugelassener PacketIns aller Ports außer dem
+lautesten.
+Mit --offload trifft der L3-Switch die Policy-Entscheidung in einem
+PolicyOffload (offload.py) mit der angegebenen Anzahl Threads bzw. mit
+--processes Prozessen; mehrere Werte (--offload 0,1,2,4) messen die
+Skalierung. Die Ergebnisse werden nach jedem Burst abgeholt, Pakete/s
+ist dann der Durchsatz über die Wanduhr bis zum letzten Ergebnis.
+
+Verwendung (POX muss im PYTHONPATH liegen, Aufruf aus dem Repository-Verzeichnis):
+    PYTHONPATH=~/pox python -m deepdive.benchmark
+    PYTHONPATH=~/pox python -m deepdive.benchmark --targets l3 --workloads port_scan --packets 50000
+    PYTHONPATH=~/pox python -m deepdive.benchmark --classify --workloads syn_flood
+    PYTHONPATH=~/pox python -m deepdive.benchmark --elephants --workloads elephant_mice
+    PYTHONPATH=~/pox python -m deepdive.benchmark --admission --workloads mac_flood,arp_sweep
+    PYTHONPATH=~/pox python -m deepdive.benchmark --targets l3 --offload 0,1,2,4 --processes
+"""
+
+import argparse
+import logging
+import random
+import time
+from collections import Counter
+
+import pox.core
+if getattr(pox.core, 'core', None) is None:
+    pox.core.initialize()
+
+import pox.openflow.libopenflow_01 as of
+from pox.lib.packet import ethernet, ipv4, tcp, udp, icmp, arp
+from pox.lib.addresses import EthAddr, IPAddr
+
+from .acl_cache import CachedACL
+from .admission import AdmissionControl
+from .offload import PolicyOffload
+from .elephant import TraceStat, ELEPHANT_RATE, read_trace, replay
+from .flow_key import flow_key_from_bytes, flow_key_from_packet
+from .flow_utils import match_from_flow_key
+from .msg_batcher import MessageBatcher
+from .zone_policy import load_policy
+
+# Hosts der Enterprise-Topologie: (Name, IP, Gateway-IP).
+# MAC-Adressen und Ports werden wie bei "mn --mac" fortlaufend vergeben.
+ENTERPRISE_HOSTS = [
+    ('h1', '10.1.1.10', '10.1.1.254'),
+    ('h2', '10.1.1.11', '10.1.1.254'),
+    ('h3', '10.1.1.12', '10.1.1.254'),
+    ('h8', '10.2.1.100', '10.2.1.254'),
+    ('h9', '10.2.1.101', '10.2.1.254'),
+    ('h15', '10.3.1.200', '10.3.1.254'),
+    ('h16', '10.3.1.201', '10.3.1.254'),
+    ('h19', '10.4.1.220', '10.4.1.254'),
+    ('h20', '10.4.1.221', '10.4.1.254'),
+    ('h25', '10.5.1.250', '10.5.1.254'),
+    ('h26', '10.5.1.251', '10.5.1.254'),
+]
+
+# Gateway-MACs wie in l3_switch_with_firewall.gateway_ips
+GATEWAY_MACS = {
+    '10.1.1.254': '00:aa:00:00:01:01',
+    '10.2.1.254': '00:aa:00:00:02:01',
+    '10.3.1.254': '00:aa:00:00:03:01',
+    '10.4.1.254': '00:aa:00:00:04:01',
+    '10.5.1.254': '00:aa:00:00:05:01',
+}
+
+# Dienste für den gemischten Verkehr: (Protokoll, Zielport, Gewicht)
+SERVICE_MIX = [
+    (ipv4.TCP_PROTOCOL, 80, 30),
+    (ipv4.TCP_PROTOCOL, 443, 30),
+    (ipv4.UDP_PROTOCOL, 53, 15),
+    (ipv4.TCP_PROTOCOL, 22, 8),
+    (ipv4.ICMP_PROTOCOL, None, 7),
+    (ipv4.TCP_PROTOCOL, 25, 4),
+    (ipv4.TCP_PROTOCOL, 3306, 3),
+    (ipv4.UDP_PROTOCOL, 123, 3),
+]
+
+
+class Host(object):
+    """
+    Host im Benchmark-Netz
+    """
+
+    __slots__ = ('name', 'ip', 'mac', 'port', 'gateway_ip', 'gateway_mac')
+
+    def __init__(self, name, ip, mac, port, gateway_ip):
+        self.name = name
+        self.ip = IPAddr(ip)
+        self.mac = EthAddr(mac)
+        self.port = port
+        self.gateway_ip = IPAddr(gateway_ip)
+        self.gateway_mac = EthAddr(GATEWAY_MACS[gateway_ip])
+
+
+def enterprise_hosts():
+    """
+    Liefert die Hosts der Enterprise-Topologie
+    """
+    return [Host(name, ip, "00:00:00:00:00:%02x" % (index + 1), index + 1, gateway)
+            for index, (name, ip, gateway) in enumerate(ENTERPRISE_HOSTS)]
+
+
+class BenchConnection(object):
+    """
+    Ersatz für die OpenFlow-Verbindung: zählt gesendete Nachrichten
+
+    Nachrichten werden wie bei der echten Verbindung serialisiert (pack()),
+    damit deren Kosten in die Messung eingehen.
+
+    Args:
+        dpid: Datapath-ID des simulierten Switches
+        record: Gesendete Nachrichten aufbewahren (für Tests)
+    """
+
+    def __init__(self, dpid=1, record=False):
+        self.dpid = dpid
+        self.record = record
+        self.sent = []
+        self.messages = 0
+        self.bytes = 0
+        self.writes = 0
+        self.by_type = Counter()
+        self.listeners = []
+
+    def addListeners(self, listener, *args, **kw):
+        self.listeners.append(listener)
+
+    def send(self, msg):
+        self.writes += 1
+        if isinstance(msg, bytes):
+            # Von einem MessageBatcher gebündelte Nachrichten
+            self.bytes += len(msg)
+            self.by_type['Batch'] += 1
+            if self.record:
+                self.sent.append(msg)
+            return
+        self.bytes += len(msg.pack())
+        self.messages += 1
+        self.by_type[type(msg).__name__] += 1
+        if self.record:
+            self.sent.append(msg)
+
+
+class BenchEvent(object):
+    """
+    Nachbau eines POX-PacketIn-Events
+
+    Wie bei POX wird das Paket erst beim Zugriff auf parsed geparst.
+    """
+
+    __slots__ = ('connection', 'dpid', 'port', 'data', 'ofp', '_parsed')
+
+    def __init__(self, connection, data, port, buffer_id=None):
+        self.connection = connection
+        self.dpid = connection.dpid
+        self.port = port
+        self.data = data
+        self.ofp = of.ofp_packet_in(data=data, in_port=port, total_len=len(data))
+        if buffer_id is not None:
+            self.ofp.buffer_id = buffer_id
+        self._parsed = None
+
+    @property
+    def parsed(self):
+        if self._parsed is None:
+            self._parsed = ethernet(raw=self.data)
+        return self._parsed
+
+
+# --- Paketbau ---
+
+def _ethernet(src_mac, dst_mac, eth_type, payload):
+    frame = ethernet()
+    frame.src = src_mac
+    frame.dst = dst_mac
+    frame.type = eth_type
+    frame.payload = payload
+    return frame.pack()
+
+
+def arp_request(src_mac, src_ip, target_ip):
+    """
+    Baut einen ARP-Request (Broadcast) als Rohdaten
+    """
+    packet = arp()
+    packet.opcode = arp.REQUEST
+    packet.hwsrc = src_mac
+    packet.hwdst = EthAddr("00:00:00:00:00:00")
+    packet.protosrc = src_ip
+    packet.protodst = target_ip
+    return _ethernet(src_mac, EthAddr("ff:ff:ff:ff:ff:ff"), ethernet.ARP_TYPE, packet)
+
+
+def ip_packet(src, dst, proto, sport=None, dport=None, syn=False):
+    """
+    Baut ein IPv4-Paket von Host src zu Host dst als Rohdaten
+
+    Liegen beide Hosts in verschiedenen Subnetzen, geht der Frame wie beim
+    echten Host an die Gateway-MAC.
+    """
+    if proto == ipv4.TCP_PROTOCOL:
+        l4 = tcp()
+        l4.srcport = sport
+        l4.dstport = dport
+        if syn:
+            l4.flags = 0x02  # SYN
+    elif proto == ipv4.UDP_PROTOCOL:
+        l4 = udp()
+        l4.srcport = sport
+        l4.dstport = dport
+    else:
+        l4 = icmp()
+        l4.type = 8  # Echo Request
+        l4.payload = b'\x00' * 4
+    packet = ipv4()
+    packet.srcip = src.ip
+    packet.dstip = dst.ip
+    packet.protocol = proto
+    packet.payload = l4
+    dst_mac = dst.mac if src.gateway_ip == dst.gateway_ip else src.gateway_mac
+    return _ethernet(src.mac, dst_mac, ethernet.IP_TYPE, packet)
+
+
+def _announce(hosts):
+    """
+    ARP-Requests aller Hosts an ihr Gateway (Hosts und MACs lernen)
+    """
+    return [(arp_request(host.mac, host.ip, host.gateway_ip), host.port) for host in hosts]
+
+
+# --- Workloads ---
+# Jeder Workload liefert (Aufwärmen, Messung) als Listen von (Rohdaten, Port).
+
+def arp_storm(count, rng):
+    """
+    ARP-Requests vieler Hosts, auch nie gesehener Adressen in allen Subnetzen
+    """
+    hosts = enterprise_hosts()
+    events = []
+    for _ in range(count):
+        gateway = rng.choice(sorted(GATEWAY_MACS))
+        prefix = gateway.rsplit('.', 1)[0]
+        src_ip = IPAddr("%s.%d" % (prefix, rng.randint(1, 250)))
+        src_mac = EthAddr("02:00:00:%02x:%02x:%02x" % (rng.randint(0, 255),
+                                                     rng.randint(0, 255), rng.randint(0, 255)))
+        target = rng.choice([IPAddr(gateway)] + [host.ip for host in hosts])
+        events.append((arp_request(src_mac, src_ip, target), rng.randint(1, len(hosts))))
+    return [], events
+
+
+def port_scan(count, rng):
+    """
+    TCP-SYN-Scan von h15 (extern) auf h8 (DMZ-Webserver)
+    """
+    hosts = enterprise_hosts()
+    by_name = dict((host.name, host) for host in hosts)
+    scanner, target = by_name['h15'], by_name['h8']
+    events = [(ip_packet(scanner, target, ipv4.TCP_PROTOCOL, 40000 + (i % 20000),
+                         1 + (i % 65535), syn=True), scanner.port)
+              for i in range(count)]
+    return _announce(hosts), events
+
+
+def enterprise_mix(count, rng):
+    """
+    Gemischter Verkehr zwischen zufälligen Hosts aller Zonen
+    """
+    hosts = enterprise_hosts()
+    services = [(proto, port) for proto, port, weight in SERVICE_MIX for _ in range(weight)]
+    events = []
+    for _ in range(count):
+        src, dst = rng.sample(hosts, 2)
+        proto, dport = rng.choice(services)
+        events.append((ip_packet(src, dst, proto, rng.randint(1024, 65535), dport,
+                                 syn=True), src.port))
+    return _announce(hosts), events
+
+
+def elephant_mice(count, rng, elephants=10, elephant_share=0.8):
+    """
+    Wenige große Flows (80 % der Pakete) und viele kurze Flows
+    """
+    hosts = enterprise_hosts()
+    flows = []
+    for _ in range(elephants):
+        src, dst = rng.sample(hosts, 2)
+        flows.append((src, dst, rng.randint(1024, 65535), rng.choice([80, 443, 3306])))
+    events = []
+    for _ in range(count):
+        if rng.random() < elephant_share:
+            src, dst, sport, dport = rng.choice(flows)
+        else:
+            src, dst = rng.sample(hosts, 2)
+            sport, dport = rng.randint(1024, 65535), rng.choice([80, 443, 53, 22])
+        events.append((ip_packet(src, dst, ipv4.TCP_PROTOCOL, sport, dport), src.port))
+    return _announce(hosts), events
+
+
+def syn_flood(count, rng):
+    """
+    TCP-SYNs aller internen Clients auf h8:80 mit wechselnden Quellports
+    """
+    hosts = enterprise_hosts()
+    by_name = dict((host.name, host) for host in hosts)
+    clients = [by_name[name] for name in ('h1', 'h2', 'h3')]
+    target = by_name['h8']
+    events = []
+    for _ in range(count):
+        client = rng.choice(clients)
+        events.append((ip_packet(client, target, ipv4.TCP_PROTOCOL, rng.randint(1024, 65535),
+                                 80, syn=True), client.port))
+    return _announce(hosts), events
+
+
+def _with_background(count, rng, flood, share):
+    """
+    Mischt Flut-Pakete (Anteil share) mit normalem Verkehr der übrigen Hosts
+    """
+    warmup, background = enterprise_mix(count, rng)
+    events = [flood() if rng.random() < share else background[index]
+              for index in range(count)]
+    return warmup, events
+
+
+def mac_flood(count, rng, share=0.9):
+    """
+    MAC-Flood von h3: jedes Paket mit neuer Quell-MAC (und Quell-IP)
+    """
+    attacker = dict((host.name, host) for host in enterprise_hosts())['h3']
+    targets = [host for host in enterprise_hosts() if host.name != 'h3']
+
+    def flood():
+        spoofed = Host('flood', "10.1.1.%d" % rng.randint(1, 250),
+                       "02:%02x:%02x:%02x:%02x:%02x" % tuple(rng.randint(0, 255)
+                                                          for _ in range(5)),
+                       attacker.port, str(attacker.gateway_ip))
+        return (ip_packet(spoofed, rng.choice(targets), ipv4.UDP_PROTOCOL,
+                          rng.randint(1024, 65535), rng.randint(1, 65535)), attacker.port)
+    return _with_background(count, rng, flood, share)
+
+
+def arp_sweep(count, rng, share=0.9):
+    """
+    ARP-Sweep von h15 über alle Adressen der Enterprise-Subnetze
+    """
+    sweeper = dict((host.name, host) for host in enterprise_hosts())['h15']
+    prefixes = [gateway.rsplit('.', 1)[0] for gateway in sorted(GATEWAY_MACS)]
+    sweep = ["%s.%d" % (prefix, index) for prefix in prefixes for index in range(1, 255)]
+    position = [0]
+
+    def flood():
+        target = IPAddr(sweep[position[0] % len(sweep)])
+        position[0] += 1
+        return arp_request(sweeper.mac, sweeper.ip, target), sweeper.port
+    return _with_background(count, rng, flood, share)
+
+
+WORKLOADS = {
+    'arp_storm': arp_storm,
+    'port_scan': port_scan,
+    'enterprise_mix': enterprise_mix,
+    'elephant_mice': elephant_mice,
+    'syn_flood': syn_flood,
+    'mac_flood': mac_flood,
+    'arp_sweep': arp_sweep,
+}
+
+
+# --- Controller ---
+
+def _make_l2(connection, acl, fast_path=False, admission=None):
+    from .l2_switch_with_firewall import LearningSwitchWithFirewall
+    return LearningSwitchWithFirewall(connection, acl, aging_interval=0, stats_interval=0,
+                                      fast_path=fast_path, admission=admission)
+
+
+def _make_l3(connection, acl, fast_path=False, admission=None):
+    from .l3_switch_with_firewall import Layer3SwitchWithFirewall
+    return Layer3SwitchWithFirewall(connection, acl, aging_interval=0, stats_interval=0,
+                                    fast_path=fast_path, admission=admission)
+
+
+def _make_fw(connection, acl, fast_path=False, admission=None):
+    from pox_firewall_acl import SimpleFirewall
+    return SimpleFirewall(connection, acl)
+
+
+TARGETS = {
+    'l2': _make_l2,
+    'l3': _make_l3,
+    'fw': _make_fw,
+}
+
+
+# Events pro Burst im Batch-Modus (so viele PacketIns liest POX etwa pro Socket-Read)
+BURST = 32
+
+# Simulierte PacketIns pro Sekunde für die Token-Buckets (--admission)
+OFFERED_RATE = 500.0
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run(target, workload, count=10000, seed=1, acl_factory=None, fast_path=False,
+        batch=False, burst=BURST, buffered=False, admission=False,
+        offered_rate=OFFERED_RATE, offload=0, processes=False):
+    """
+    Spielt einen Workload in einen Controller ein und misst die Handler-Zeit
+
+    Args:
+        target: Controller-Name (siehe TARGETS)
+        workload: Workload-Name (siehe WORKLOADS)
+        count: Anzahl gemessener Events
+        seed: Startwert für den Zufallsgenerator
+        acl_factory: Funktion ohne Argumente, die eine frische ACL liefert
+                     (None = Standard-ACL des Controllers)
+        fast_path: Schnelle Klassifizierung aus den Rohdaten (nur l2 und l3)
+        batch: Nachrichten über einen MessageBatcher senden (nur l2 und l3)
+        burst: Events pro Burst, nach denen der Batcher schreibt
+        buffered: Der simulierte Switch puffert die Pakete (gültige buffer_id)
+        admission: PacketIns über admission.AdmissionControl zulassen (nur l2 und l3)
+        offered_rate: Simulierte Events pro Sekunde für die Token-Buckets
+        offload: Anzahl Worker für die Policy-Entscheidung (nur l3, 0 = keine)
+        processes: Prozesse statt Threads als Worker
+
+    Returns:
+        dict: events, pps, p50_us, p99_us, msgs_per_event, writes_per_event,
+              bytes_per_event, by_type, admission (Zähler oder None),
+              offload (Zähler oder None)
+    """
+    warmup, events = WORKLOADS[workload](count, random.Random(seed))
+    connection = BenchConnection()
+    clock = [0.0]
+    control = AdmissionControl(clock=lambda: clock[0]) if admission else None
+    controller = TARGETS[target](connection, acl_factory() if acl_factory else None, fast_path,
+                                 control)
+    handler = controller._handle_PacketIn
+    pool = None
+    if offload and hasattr(controller, 'offload'):
+        # Ohne Event-Loop holt der Benchmark die Ergebnisse selbst ab (kein notify)
+        pool = controller.offload = PolicyOffload(controller.acl, controller.routing_table,
+                                                  offload, processes)
+    batcher = None
+    if batch and hasattr(controller, 'sender'):
+        # Ohne Event-Loop schreibt der Benchmark selbst am Ende jedes Bursts
+        batcher = controller.sender = MessageBatcher(connection, auto_flush=False)
+
+    for data, port in warmup:
+        handler(BenchEvent(connection, data, port))
+    if pool is not None:
+        pool.drain(block=True)
+    if batcher is not None:
+        batcher.flush()
+        batcher.messages = 0
+    connection.messages = 0
+    connection.bytes = 0
+    connection.writes = 0
+    connection.by_type.clear()
+
+    # Events vorab bauen, damit nur der Handler gemessen wird
+    prepared = [BenchEvent(connection, data, port, index if buffered else None)
+                for index, (data, port) in enumerate(events)]
+    timer = time.perf_counter
+    latencies = []
+    per_port = {}   # Port → [Events, zugelassen]
+    started = timer()
+    for index, event in enumerate(prepared, 1):
+        clock[0] = index / offered_rate
+        admitted = control.admitted if control is not None else 0
+        start = timer()
+        handler(event)
+        if pool is not None and index % burst == 0:
+            pool.drain()
+        if batcher is not None and index % burst == 0:
+            batcher.flush()
+        latencies.append(timer() - start)
+        if control is not None:
+            counts = per_port.setdefault(event.port, [0, 0])
+            counts[0] += 1
+            counts[1] += control.admitted - admitted
+    if pool is not None:
+        pool.drain(block=True)
+    if batcher is not None:
+        batcher.flush()
+    messages = batcher.messages if batcher is not None else connection.messages
+
+    # Mit Workern zählt die Wanduhr bis zum letzten Ergebnis, nicht die Handler-Zeit
+    total = timer() - started if pool is not None else sum(latencies)
+    if pool is not None:
+        pool.shutdown()
+    latencies.sort()
+    return {
+        'target': target,
+        'workload': workload,
+        'events': len(prepared),
+        'pps': len(prepared) / total if total else 0.0,
+        'p50_us': _percentile(latencies, 0.50) * 1e6,
+        'p99_us': _percentile(latencies, 0.99) * 1e6,
+        'msgs_per_event': float(messages) / len(prepared) if prepared else 0.0,
+        'writes_per_event': float(connection.writes) / len(prepared) if prepared else 0.0,
+        'bytes_per_event': float(connection.bytes) / len(prepared) if prepared else 0.0,
+        'by_type': dict(connection.by_type),
+        'admission': _admission_result(control, per_port) if control is not None else None,
+        'offload': pool.stats() if pool is not None else None,
+    }
+
+
+def _admission_result(control, per_port):
+    """
+    Zähler der Zulassung und Anteil zugelassener PacketIns ohne den lautesten Port
+    """
+    result = control.stats()
+    loudest = max(per_port, key=lambda port: per_port[port][0]) if per_port else None
+    others = [counts for port, counts in per_port.items() if port != loudest]
+    total = sum(counts[0] for counts in others)
+    result['others_admitted'] = (float(sum(counts[1] for counts in others)) / total
+                                 if total else 1.0)
+    return result
+
+
+def classify(workload, count=10000, seed=1):
+    """
+    Misst nur die Klassifizierung: POX-Parser + FlowKey gegen Rohdaten-Pfad
+
+    Beide Varianten müssen für jedes Paket denselben FlowKey liefern; Pakete,
+    für die der Rohdaten-Pfad None liefert, zählen als Fallback.
+
+    Args:
+        workload: Workload-Name (siehe WORKLOADS)
+        count: Anzahl Pakete
+        seed: Startwert für den Zufallsgenerator
+
+    Returns:
+        dict: workload, packets, parser_us, fast_us, speedup, fallbacks
+    """
+    _, events = WORKLOADS[workload](count, random.Random(seed))
+    timer = time.perf_counter
+
+    start = timer()
+    parsed = [flow_key_from_packet(ethernet(raw=data), port) for data, port in events]
+    parser = timer() - start
+
+    start = timer()
+    fast = [flow_key_from_bytes(data, port) for data, port in events]
+    raw = timer() - start
+
+    fallbacks = 0
+    for slow_key, fast_key in zip(parsed, fast):
+        if fast_key is None:
+            fallbacks += 1
+        else:
+            assert fast_key == slow_key, (fast_key, slow_key)
+
+    packets = len(events)
+    return {
+        'workload': workload,
+        'packets': packets,
+        'parser_us': parser / packets * 1e6 if packets else 0.0,
+        'fast_us': raw / packets * 1e6 if packets else 0.0,
+        'speedup': parser / raw if raw else 0.0,
+        'fallbacks': fallbacks,
+    }
+
+
+def flow_stats_trace(workload, count=10000, seed=1, polls=10, interval=0.5, packet_bytes=1500):
+    """
+    Erzeugt aus einem Workload eine synthetische Flow-Statistik
+
+    Jedes IP-Paket des Workloads zählt als packet_bytes großes Paket seines
+    exakten Flows. Die Pakete werden gleichmäßig auf polls Abfragen im
+    Abstand von interval Sekunden verteilt; jede Abfrage enthält wie beim
+    Switch alle bis dahin installierten Flows.
+
+    Args:
+        workload: Workload-Name (siehe WORKLOADS)
+        count: Anzahl Pakete
+        seed: Startwert für den Zufallsgenerator
+        polls: Anzahl Abfragen
+        interval: Sekunden zwischen zwei Abfragen
+        packet_bytes: Angenommene Paketgröße
+
+    Returns:
+        list: (Zeitpunkt, dpid, Liste von elephant.TraceStat) wie elephant.read_trace()
+    """
+    _, events = WORKLOADS[workload](count, random.Random(seed))
+    ports = dict((host.ip.toUnsigned(), host.port) for host in enterprise_hosts())
+    flows = {}     # serialisierter Match → [Match, Actions, Pakete, Start]
+    order = []
+    per_poll = max(1, len(events) // polls)
+    records = []
+    for poll in range(polls):
+        start = poll * interval
+        for data, port in events[poll * per_poll:(poll + 1) * per_poll]:
+            key = flow_key_from_packet(ethernet(raw=data), port)
+            if not key.is_ip:
+                continue
+            match = match_from_flow_key(key)
+            flow = flows.get(match.pack())
+            if flow is None:
+                actions = [of.ofp_action_output(port=ports.get(key.ip_dst, of.OFPP_FLOOD))]
+                flow = flows[match.pack()] = [match, actions, 0, start]
+                order.append(flow)
+            flow[2] += 1
+        now = start + interval
+        stats = []
+        for match, actions, packets, started in order:
+            duration = now - started
+            stats.append(TraceStat(match, of.OFP_DEFAULT_PRIORITY, packets,
+                                   packets * packet_bytes, int(duration),
+                                   int((duration - int(duration)) * 1e9), 30, 300, actions))
+        records.append((now, 1, stats))
+    return records
+
+
+def elephants(records, threshold=ELEPHANT_RATE, top_k=0):
+    """
+    Misst die Elephant-Erkennung auf einer Flow-Statistik
+
+    Args:
+        records: (Zeitpunkt, dpid, Flow-Statistik) wie von flow_stats_trace()
+        threshold: Elephant-Schwelle in Bytes/s
+        top_k: Zusätzliche Top-k-Elephants
+
+    Returns:
+        dict: polls, flows, elephants, elephant_share, mouse_groups,
+              entries_saved (jeweils letzte Abfrage), update_us (Mittelwert)
+    """
+    results = replay(records, threshold, top_k)
+    if not results:
+        return {'polls': 0, 'flows': 0, 'elephants': 0, 'elephant_share': 0.0,
+                'mouse_groups': 0, 'entries_saved': 0, 'update_us': 0.0}
+    last = results[-1]
+    return {
+        'polls': len(results),
+        'flows': last['flows'],
+        'elephants': last['elephants'],
+        'elephant_share': last['elephant_share'],
+        'mouse_groups': last['mouse_groups'],
+        'entries_saved': last['entries_saved'],
+        'update_us': sum(result['update_us'] for result in results) / len(results),
+    }
+
+
+def format_result(result):
+    """
+    Formatiert ein Ergebnis von run() als Tabellenzeile
+    """
+    types = ", ".join("%s=%d" % item for item in sorted(result['by_type'].items()))
+    admission = result.get('admission')
+    if admission is not None:
+        types += ", zugelassen=%d, verworfen=%d, Sperren Port/Quelle=%d/%d, andere=%.1f%%" % (
+            admission['admitted'], admission['dropped'], admission['quarantined_ports'],
+            admission['quarantined_sources'], admission['others_admitted'] * 100)
+    offload = result.get('offload')
+    if offload is not None:
+        types += ", %s=%d, gehalten=%d, Fehler=%d" % (
+            "Prozesse" if offload['processes'] else "Threads", offload['workers'],
+            offload['held'], offload['failed'])
+    return "%-4s %-15s %8d %10.0f %9.1f %9.1f %8.2f %8.2f %8.1f  %s" % (
+        result['target'], result['workload'], result['events'], result['pps'],
+        result['p50_us'], result['p99_us'], result['msgs_per_event'],
+        result['writes_per_event'], result['bytes_per_event'], types)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PacketIn-Benchmark für die Firewall-Controller")
+    parser.add_argument('--targets', default=",".join(sorted(TARGETS)),
+                        help="Controller, kommagetrennt (%s)" % ", ".join(sorted(TARGETS)))
+    parser.add_argument('--workloads', default=",".join(sorted(WORKLOADS)),
+                        help="Workloads, kommagetrennt (%s)" % ", ".join(sorted(WORKLOADS)))
+    parser.add_argument('--packets', type=int, default=10000, help="Events pro Messung")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--policy', default=None,
+                        help="Regeldatei für alle Controller (Standard: Enterprise-Richtlinie, "
+                             "'default' = Standard-ACL des jeweiligen Controllers)")
+    parser.add_argument('--acl_cache_size', type=int, default=4096,
+                        help="Größe des ACL-Entscheidungs-Caches (0 = kein Cache)")
+    parser.add_argument('--log_level', default='WARNING', help="Log-Level der Controller")
+    parser.add_argument('--fast_path', action='store_true',
+                        help="L2/L3: Pakete aus den Rohdaten klassifizieren")
+    parser.add_argument('--batch', action='store_true',
+                        help="L2/L3: Nachrichten bündeln (MessageBatcher)")
+    parser.add_argument('--burst', type=int, default=BURST,
+                        help="Events pro Burst, nach denen gebündelt geschrieben wird")
+    parser.add_argument('--buffered', action='store_true',
+                        help="Switch puffert Pakete: Controller antworten mit buffer_id statt Daten")
+    parser.add_argument('--admission', action='store_true',
+                        help="L2/L3: PacketIns per Token-Bucket pro Port und Quelle zulassen")
+    parser.add_argument('--offered_rate', type=float, default=OFFERED_RATE,
+                        help="Simulierte PacketIns pro Sekunde für --admission")
+    parser.add_argument('--offload', default='0',
+                        help="L3: Worker für die Policy-Entscheidung, kommagetrennt für "
+                             "mehrere Messungen (0 = in der Event-Schleife)")
+    parser.add_argument('--processes', action='store_true',
+                        help="Prozesse statt Threads als Worker für --offload")
+    parser.add_argument('--classify', action='store_true',
+                        help="Nur die Klassifizierung messen (POX-Parser gegen Rohdaten)")
+    parser.add_argument('--elephants', action='store_true',
+                        help="Elephant-Erkennung auf einer Flow-Statistik messen")
+    parser.add_argument('--elephant_rate', type=float, default=ELEPHANT_RATE,
+                        help="Bytes/s, ab denen ein Flow ein Elephant ist")
+    parser.add_argument('--elephant_top_k', type=int, default=0,
+                        help="Zusätzlich die k Flows mit der höchsten Rate")
+    parser.add_argument('--stats_trace', default=None,
+                        help="Aufgezeichnete Flow-Statistik (--stats_trace der Controller) "
+                             "statt der Workloads")
+    args = parser.parse_args(argv)
+
+    if args.elephants:
+        if args.stats_trace:
+            sources = [(args.stats_trace, lambda: read_trace(args.stats_trace))]
+        else:
+            sources = [(workload, lambda workload=workload: flow_stats_trace(
+                workload, args.packets, args.seed)) for workload in args.workloads.split(',')]
+        print("%-15s %6s %7s %9s %8s %8s %8s %9s" % (
+            "Quelle", "Polls", "Flows", "Elephants", "Anteil", "Gruppen", "gespart", "µs/Flow"))
+        for name, records in sources:
+            result = elephants(records(), args.elephant_rate, args.elephant_top_k)
+            print("%-15s %6d %7d %9d %7.1f%% %8d %8d %9.2f" % (
+                name, result['polls'], result['flows'], result['elephants'],
+                result['elephant_share'] * 100, result['mouse_groups'],
+                result['entries_saved'], result['update_us']))
+        return
+
+    if args.classify:
+        print("%-15s %8s %10s %10s %8s %9s" % (
+            "workload", "pakete", "Parser µs", "Roh µs", "Faktor", "Fallback"))
+        for workload in args.workloads.split(','):
+            result = classify(workload, args.packets, args.seed)
+            print("%-15s %8d %10.2f %10.2f %7.1fx %9d" % (
+                result['workload'], result['packets'], result['parser_us'],
+                result['fast_us'], result['speedup'], result['fallbacks']))
+        return
+
+    logging.basicConfig(level=getattr(logging, args.log_level.upper()))
+    logging.getLogger().setLevel(getattr(logging, args.log_level.upper()))
+
+    acl_factory = None
+    if args.policy != 'default':
+        policy = load_policy(args.policy) if args.policy else load_policy()
+
+        def acl_factory():
+            if args.acl_cache_size > 0:
+                return CachedACL(policy, args.acl_cache_size)
+            return policy
+
+    print("%-4s %-15s %8s %10s %9s %9s %8s %8s %8s  %s" % (
+        "ctrl", "workload", "events", "pkt/s", "p50 µs", "p99 µs", "msg/ev", "write/ev",
+        "Byte/ev", "Nachrichten"))
+    for target in args.targets.split(','):
+        for workload in args.workloads.split(','):
+            for workers in [int(value) for value in args.offload.split(',')]:
+                print(format_result(run(target, workload, args.packets, args.seed, acl_factory,
+                                        args.fast_path, args.batch, args.burst,
+                                        args.buffered, args.admission, args.offered_rate,
+                                        workers, args.processes)))
+
+
+if __name__ == "__main__":
+    main()
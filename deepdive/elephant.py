@@ -0,0 +1,456 @@
+"""
+Erkennung von Elephant-Flows aus der periodischen Flow-Statistik
+
+Alle Flows bekommen bisher dieselben Timeouts und einen eigenen exakten
+Eintrag. Wenige große Flows (Elephants) tragen aber den Großteil der Bytes,
+während viele kurze Flows (Mice) die Flow-Tabelle füllen.
+
+ElephantDetector wertet die Antworten auf den periodischen
+ofp_flow_stats_request aus (siehe flow_table.STATS_INTERVAL):
+    - update() berechnet pro Flow inkrementell Byte- und Paketraten aus der
+      Differenz zur letzten Abfrage (geglättet, siehe RATE_SMOOTHING). Ein
+      neu installierter Flow mit kleineren Zählern beginnt von vorn.
+    - Elephant ist, wer mindestens threshold Bytes/s erreicht oder zu den
+      top_k Flows mit der höchsten Rate gehört. Die Controller installieren
+      neue Elephants erneut mit längeren Timeouts.
+    - mouse_groups() fasst Mice zusammen, die sich nur im Quellport (und
+      ToS) unterscheiden und dieselben Actions haben - etwa viele kurze
+      Verbindungen eines Clients zum selben Dienst. Die ACL prüft den
+      Quellport nicht, ein Eintrag mit Wildcard für tp_src ersetzt daher
+      die exakten Einträge der Gruppe, ohne die Firewall-Entscheidung zu
+      ändern.
+    - Drop-Flows (ohne Actions), Quarantäne-Flows (QUARANTINE_PRIORITY,
+      siehe admission.py) und permanente Einträge fassen die Controller
+      nie an (FlowRate.reinstallable): Neu installiert würde eine Sperre
+      mit den langen Elephant-Timeouts verlängert.
+
+Aufzeichnung und Offline-Auswertung:
+    Mit --stats_trace=<Datei> schreiben die Controller jede Flow-Statistik
+    als JSON-Zeile (StatsTraceWriter). Eine aufgezeichnete Datei lässt sich
+    ohne POX und ohne Mininet auswerten:
+        python -m deepdive.elephant trace.jsonl [Schwelle Bytes/s] [top_k]
+
+Beispiel:
+    detector = ElephantDetector(threshold=ELEPHANT_RATE)
+    promoted, demoted = detector.update(event.stats)
+    for group in detector.mouse_groups():
+        ...  # Wildcard-Flow installieren, exakte Einträge löschen
+"""
+
+import binascii
+import heapq
+import json
+import sys
+import time
+from collections import namedtuple
+
+from .admission import QUARANTINE_PRIORITY
+
+# Bytes/s, ab denen ein Flow als Elephant gilt (1 Mbit/s)
+ELEPHANT_RATE = 125000
+
+# Zusätzlich die k Flows mit der höchsten Rate als Elephants (0 = aus)
+ELEPHANT_TOP_K = 0
+
+# Timeouts für Elephants (Sekunden)
+ELEPHANT_IDLE_TIMEOUT = 120
+ELEPHANT_HARD_TIMEOUT = 1800
+
+# Gewicht der neuesten Messung bei der Glättung der Raten
+RATE_SMOOTHING = 0.5
+
+# Mindestanzahl Mice, die zu einem Wildcard-Eintrag zusammengefasst werden
+MICE_GROUP_SIZE = 4
+
+# Match-Felder (wie ofp_match) und die Felder, die bei Mice wegfallen
+MATCH_FIELDS = ('in_port', 'dl_src', 'dl_dst', 'dl_vlan', 'dl_vlan_pcp', 'dl_type',
+                'nw_tos', 'nw_proto', 'nw_src', 'nw_dst', 'tp_src', 'tp_dst')
+MOUSE_WILDCARDS = ('tp_src', 'nw_tos')
+
+_MOUSE_KEY_FIELDS = tuple(name for name in MATCH_FIELDS if name not in MOUSE_WILDCARDS)
+_PORT_PROTOCOLS = (6, 17)  # TCP, UDP (bei ICMP steht der Typ in tp_src)
+
+
+class FlowRate(object):
+    """
+    Zähler und Raten eines Flows aus Sicht des Detektors
+    """
+
+    __slots__ = ('match', 'priority', 'actions', 'idle_timeout', 'hard_timeout',
+                 'packets', 'bytes', 'byte_rate', 'packet_rate', 'updated', 'elephant')
+
+    def __init__(self, match, priority, actions, idle_timeout, hard_timeout, now):
+        self.match = match
+        self.priority = priority
+        self.actions = actions
+        self.idle_timeout = idle_timeout
+        self.hard_timeout = hard_timeout
+        self.packets = 0
+        self.bytes = 0
+        self.byte_rate = 0.0
+        self.packet_rate = 0.0
+        self.updated = now
+        self.elephant = False
+
+    @property
+    def permanent(self):
+        return not self.idle_timeout and not self.hard_timeout
+
+    @property
+    def reinstallable(self):
+        """Darf neu installiert oder zusammengefasst werden (kein Drop-,
+        Quarantäne- oder permanenter Flow)"""
+        return bool(self.actions) and self.priority != QUARANTINE_PRIORITY and not self.permanent
+
+    def __repr__(self):
+        return "FlowRate(%s, %.0f B/s%s)" % (self.match, self.byte_rate,
+                                              ", Elephant" if self.elephant else "")
+
+
+def _duration(stat):
+    return stat.duration_sec + getattr(stat, 'duration_nsec', 0) / 1e9
+
+
+class ElephantDetector(object):
+    """
+    Inkrementelle Raten pro Flow und Einteilung in Elephants und Mice
+
+    Args:
+        threshold: Bytes/s, ab denen ein Flow ein Elephant ist (0 = aus)
+        top_k: Zusätzlich die k Flows mit der höchsten Rate (0 = aus)
+        smoothing: Gewicht der neuesten Messung (1 = keine Glättung)
+        clock: Zeitquelle (für Tests austauschbar)
+    """
+
+    def __init__(self, threshold=ELEPHANT_RATE, top_k=ELEPHANT_TOP_K,
+                 smoothing=RATE_SMOOTHING, clock=time.time):
+        self.threshold = threshold
+        self.top_k = top_k
+        self.smoothing = smoothing
+        self.clock = clock
+        self._rates = {}   # (Match, Priorität) → FlowRate
+        self.updates = 0
+        self.promotions = 0
+        self.demotions = 0
+
+    def __len__(self):
+        return len(self._rates)
+
+    def __iter__(self):
+        return iter(list(self._rates.values()))
+
+    @property
+    def elephants(self):
+        """Aktuelle Elephants"""
+        return [rate for rate in self._rates.values() if rate.elephant]
+
+    def update(self, flow_stats, now=None):
+        """
+        Übernimmt eine Flow-Statistik und teilt die Flows neu ein
+
+        Flows, die in der Statistik fehlen, sind abgelaufen und werden
+        vergessen.
+
+        Args:
+            flow_stats: Liste von ofp_flow_stats (oder TraceStat)
+            now: Zeitpunkt der Antwort
+
+        Returns:
+            tuple: (neue Elephants, nicht mehr Elephants) als FlowRate-Listen
+        """
+        now = self.clock() if now is None else now
+        alpha = self.smoothing
+        rates = {}
+        for stat in flow_stats:
+            key = (stat.match.pack(), stat.priority)
+            rate = self._rates.get(key)
+            if rate is None or stat.byte_count < rate.bytes:
+                # Neuer (oder neu installierter) Flow: Rate über die Laufzeit
+                elephant = rate is not None and rate.elephant
+                rate = FlowRate(stat.match, stat.priority, stat.actions,
+                                stat.idle_timeout, stat.hard_timeout, now)
+                rate.elephant = elephant
+                duration = _duration(stat)
+                if duration > 0:
+                    rate.byte_rate = stat.byte_count / duration
+                    rate.packet_rate = stat.packet_count / duration
+            else:
+                elapsed = now - rate.updated
+                if elapsed > 0:
+                    byte_rate = (stat.byte_count - rate.bytes) / elapsed
+                    packet_rate = (stat.packet_count - rate.packets) / elapsed
+                    rate.byte_rate += alpha * (byte_rate - rate.byte_rate)
+                    rate.packet_rate += alpha * (packet_rate - rate.packet_rate)
+                rate.actions = stat.actions
+                rate.idle_timeout = stat.idle_timeout
+                rate.hard_timeout = stat.hard_timeout
+            rate.bytes = stat.byte_count
+            rate.packets = stat.packet_count
+            rate.updated = now
+            rates[key] = rate
+        self._rates = rates
+        self.updates += 1
+        return self._classify()
+
+    def _classify(self):
+        elephants = set()
+        if self.threshold:
+            elephants.update(id(rate) for rate in self._rates.values()
+                             if rate.byte_rate >= self.threshold)
+        if self.top_k:
+            top = heapq.nlargest(self.top_k, self._rates.values(),
+                                 key=lambda rate: rate.byte_rate)
+            elephants.update(id(rate) for rate in top if rate.byte_rate > 0)
+
+        promoted = []
+        demoted = []
+        for rate in self._rates.values():
+            elephant = id(rate) in elephants
+            if elephant and not rate.elephant:
+                promoted.append(rate)
+            elif rate.elephant and not elephant:
+                demoted.append(rate)
+            rate.elephant = elephant
+        self.promotions += len(promoted)
+        self.demotions += len(demoted)
+        return promoted, demoted
+
+    def mouse_groups(self, min_size=MICE_GROUP_SIZE):
+        """
+        Gruppiert Mice, die sich nur in MOUSE_WILDCARDS unterscheiden
+
+        Berücksichtigt werden nur exakte TCP/UDP-Flows (tp_src gesetzt) mit
+        denselben Actions und derselben Priorität, die reinstallable sind.
+
+        Args:
+            min_size: Mindestanzahl Flows pro Gruppe
+
+        Returns:
+            list: Listen von FlowRate; der erste Eintrag dient als Vorlage
+                  für den Wildcard-Match
+        """
+        groups = {}
+        for rate in self._rates.values():
+            match = rate.match
+            if (rate.elephant or not rate.reinstallable or match.tp_src is None
+                    or match.nw_proto not in _PORT_PROTOCOLS):
+                continue
+            key = (tuple(getattr(match, name) for name in _MOUSE_KEY_FIELDS), rate.priority,
+                   b''.join(action.pack() for action in rate.actions))
+            groups.setdefault(key, []).append(rate)
+        return [group for group in groups.values() if len(group) >= min_size]
+
+    def forget(self, rate):
+        """
+        Vergisst einen Flow, den der Controller selbst entfernt hat
+        """
+        self._rates.pop((rate.match.pack(), rate.priority), None)
+
+    def clear(self):
+        """
+        Vergisst alle Flows (z.B. nach ConnectionDown)
+        """
+        self._rates.clear()
+
+    def stats(self):
+        """
+        Liefert die Zähler des Detektors
+
+        Returns:
+            dict: flows, elephants, elephant_share, updates, promotions, demotions
+        """
+        total = sum(rate.byte_rate for rate in self._rates.values())
+        elephant = sum(rate.byte_rate for rate in self._rates.values() if rate.elephant)
+        return {
+            'flows': len(self._rates),
+            'elephants': len(self.elephants),
+            'elephant_share': elephant / total if total > 0 else 0.0,
+            'updates': self.updates,
+            'promotions': self.promotions,
+            'demotions': self.demotions,
+        }
+
+
+# --- Aufzeichnung ---
+
+class TraceMatch(object):
+    """
+    Match aus einer Aufzeichnung: Felder wie ofp_match, pack() liefert die
+    aufgezeichneten Bytes
+    """
+
+    __slots__ = ('raw', 'fields')
+
+    def __init__(self, raw, fields):
+        self.raw = raw
+        self.fields = fields
+
+    def __getattr__(self, name):
+        if name in MATCH_FIELDS:
+            return self.fields.get(name)
+        raise AttributeError(name)
+
+    def pack(self):
+        return self.raw
+
+    def __repr__(self):
+        return "TraceMatch(%s)" % ", ".join("%s=%s" % (name, self.fields[name])
+                                            for name in MATCH_FIELDS if name in self.fields)
+
+
+class TraceAction(object):
+    """
+    Aufgezeichnete (serialisierte) Actions eines Flows
+    """
+
+    __slots__ = ('raw',)
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    def pack(self):
+        return self.raw
+
+
+TraceStat = namedtuple('TraceStat', ['match', 'priority', 'packet_count', 'byte_count',
+                                     'duration_sec', 'duration_nsec', 'idle_timeout',
+                                     'hard_timeout', 'actions'])
+
+
+def _hex(data):
+    return binascii.hexlify(data).decode('ascii')
+
+
+def _field_value(value):
+    return value if value is None or isinstance(value, int) else str(value)
+
+
+class StatsTraceWriter(object):
+    """
+    Schreibt Flow-Statistiken als JSON-Zeilen (eine Zeile pro Antwort)
+
+    Args:
+        path: Zieldatei (wird angehängt)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'a')
+        self.records = 0
+
+    def write(self, dpid, flow_stats, now=None):
+        flows = []
+        for stat in flow_stats:
+            fields = {}
+            for name in MATCH_FIELDS:
+                value = _field_value(getattr(stat.match, name))
+                if value is not None:
+                    fields[name] = value
+            flows.append({
+                'match': _hex(stat.match.pack()),
+                'fields': fields,
+                'priority': stat.priority,
+                'packets': stat.packet_count,
+                'bytes': stat.byte_count,
+                'duration': _duration(stat),
+                'idle_timeout': stat.idle_timeout,
+                'hard_timeout': stat.hard_timeout,
+                'actions': _hex(b''.join(action.pack() for action in stat.actions)),
+            })
+        record = {'time': time.time() if now is None else now, 'dpid': dpid, 'flows': flows}
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+        self.records += 1
+
+    def close(self):
+        self._file.close()
+
+
+def read_trace(path):
+    """
+    Liest eine mit StatsTraceWriter aufgezeichnete Datei
+
+    Returns:
+        Generator von (Zeitpunkt, dpid, Liste von TraceStat)
+    """
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            stats = []
+            for flow in record['flows']:
+                duration = flow['duration']
+                stats.append(TraceStat(
+                    TraceMatch(binascii.unhexlify(flow['match']), flow['fields']),
+                    flow['priority'], flow['packets'], flow['bytes'],
+                    int(duration), int((duration - int(duration)) * 1e9),
+                    flow['idle_timeout'], flow['hard_timeout'],
+                    # Drop-Flows wurden ohne Actions aufgezeichnet
+                    [TraceAction(binascii.unhexlify(flow['actions']))] if flow['actions'] else []))
+            yield record['time'], record['dpid'], stats
+
+
+def replay(records, threshold=ELEPHANT_RATE, top_k=ELEPHANT_TOP_K,
+           min_group=MICE_GROUP_SIZE):
+    """
+    Spielt Flow-Statistiken offline in je einen Detektor pro Switch ein
+
+    Args:
+        records: Iterierbar von (Zeitpunkt, dpid, Flow-Statistik)
+        threshold: Elephant-Schwelle in Bytes/s
+        top_k: Zusätzliche Top-k-Elephants
+        min_group: Mindestgröße einer Mice-Gruppe
+
+    Returns:
+        list: Ein dict pro Abfrage (time, dpid, flows, elephants, promoted,
+              elephant_share, mouse_groups, entries_saved, update_us)
+    """
+    detectors = {}
+    results = []
+    timer = time.perf_counter
+    for now, dpid, flow_stats in records:
+        detector = detectors.get(dpid)
+        if detector is None:
+            detector = detectors[dpid] = ElephantDetector(threshold, top_k)
+        start = timer()
+        promoted, _ = detector.update(flow_stats, now)
+        groups = detector.mouse_groups(min_group)
+        elapsed = timer() - start
+        stats = detector.stats()
+        results.append({
+            'time': now,
+            'dpid': dpid,
+            'flows': stats['flows'],
+            'elephants': stats['elephants'],
+            'promoted': len(promoted),
+            'elephant_share': stats['elephant_share'],
+            'mouse_groups': len(groups),
+            'entries_saved': sum(len(group) - 1 for group in groups),
+            'update_us': elapsed / stats['flows'] * 1e6 if stats['flows'] else 0.0,
+        })
+    return results
+
+
+def format_replay(result):
+    """
+    Formatiert ein Ergebnis von replay() als Tabellenzeile
+    """
+    return "%12.1f %6s %7d %9d %5d %7.1f %% %7d %8d %9.2f" % (
+        result['time'], result['dpid'], result['flows'], result['elephants'],
+        result['promoted'], result['elephant_share'] * 100, result['mouse_groups'],
+        result['entries_saved'], result['update_us'])
+
+
+REPLAY_HEADER = "%12s %6s %7s %9s %5s %9s %7s %8s %9s" % (
+    "Zeit", "dpid", "Flows", "Elephants", "neu", "Anteil", "Gruppen", "gespart", "µs/Flow")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("Verwendung: python -m deepdive.elephant trace.jsonl [Schwelle Bytes/s] [top_k]")
+    threshold = float(sys.argv[2]) if len(sys.argv) > 2 else ELEPHANT_RATE
+    top_k = int(sys.argv[3]) if len(sys.argv) > 3 else ELEPHANT_TOP_K
+    print(REPLAY_HEADER)
+    for result in replay(read_trace(sys.argv[1]), threshold, top_k):
+        print(format_replay(result))
@@ -15,6 +15,13 @@ Verwendung:
 1. Kopiere diese Regeln in die _is_blocked_by_acl() Methode des L3 Switches
 2. Passe die Regeln an deine spezifischen Anforderungen an
 3. Teste die Regeln mit der Enterprise-Topologie
+
+Dieselbe Richtlinie liegt datengetrieben in enterprise_policy.json und kann
+direkt beim Start geladen werden (Zonen-Index, siehe zone_policy.py):
+    ~/pox/pox.py deepdive.l3_switch_with_firewall --policy=deepdive/enterprise_policy.json
+
+Die Funktion enterprise_firewall_rules() bleibt als lesbare Referenz erhalten;
+Änderungen an der Richtlinie müssen in beiden Dateien nachgezogen werden.
 """
 
 from pox.lib.addresses import IPAddr
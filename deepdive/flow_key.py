@@ -0,0 +1,218 @@
+"""
+Kompakter Flow-Schlüssel aus einem einzigen Durchlauf durch die Header
+
+Bisher hat jeder Verarbeitungsschritt (Firewall-Check, Portextraktion,
+Drop-Flow, Routing, Flow-Mod) erneut packet.find('ipv4'), find('tcp') bzw.
+find('udp') aufgerufen - pro Paket wurde die Header-Kette 4-6 mal
+durchlaufen. flow_key_from_packet() liest alle benötigten Felder in einem
+Durchlauf in einen unveränderlichen FlowKey. ACL, Routing und der Bau der
+Flow-Mods arbeiten danach nur noch mit diesem Schlüssel.
+
+Felder:
+    in_port              Eingangsport
+    eth_src, eth_dst     MAC-Adressen (EthAddr)
+    eth_type             Ethertype (nach einem evtl. VLAN-Tag)
+    vlan, vlan_pcp       VLAN-ID und -Priorität (OFP_VLAN_NONE / 0 ohne Tag)
+    ip_src, ip_dst       IPv4-Adressen als Integer (bei ARP: protosrc/protodst)
+    ip_tos               Type of Service
+    proto                IP-Protokoll (bei ARP: Opcode, wie beim OpenFlow-Match)
+    sport, dport         TCP/UDP-Ports (sonst None)
+    icmp_type, icmp_code ICMP-Typ und -Code (sonst None)
+
+Wie bei ofp_match.from_packet() bleiben die Ports bei Fragmenten ohne
+L4-Header leer.
+
+Schneller Pfad (optional):
+    flow_key_from_bytes() liest denselben Schlüssel direkt aus event.data
+    (struct.unpack_from an festen Offsets), ohne dass POX einen
+    Objektbaum aus ethernet/ipv4/tcp aufbaut. Für ARP, IP-Optionen,
+    Fragmente und abgeschnittene Header liefert die Funktion None; dann
+    wird wie bisher event.parsed verwendet (flow_key_from_event()).
+
+Beispiel:
+    key = flow_key_from_packet(event.parsed, event.port)
+    if key.is_ip:
+        acl.is_blocked(key.ip_src, key.ip_dst, key.proto, key.dport)
+"""
+
+import struct
+from collections import namedtuple
+
+from pox.lib.addresses import EthAddr, IPAddr
+from pox.lib.packet import ethernet, vlan, ipv4, arp, tcp, udp, icmp
+from pox.openflow.libopenflow_01 import OFP_VLAN_NONE
+
+
+_FIELDS = ['in_port', 'eth_src', 'eth_dst', 'eth_type', 'vlan', 'vlan_pcp',
+           'ip_src', 'ip_dst', 'ip_tos', 'proto', 'sport', 'dport',
+           'icmp_type', 'icmp_code']
+
+
+class FlowKey(namedtuple('FlowKey', _FIELDS)):
+    """
+    Unveränderlicher Flow-Schlüssel eines Pakets (siehe Modulbeschreibung)
+    """
+
+    __slots__ = ()
+
+    @property
+    def is_ip(self):
+        return self.eth_type == ethernet.IP_TYPE
+
+    @property
+    def is_arp(self):
+        return self.eth_type == ethernet.ARP_TYPE
+
+    @property
+    def src_ip(self):
+        """Quell-IP als IPAddr (für Logs und Benutzer-Code)"""
+        return IPAddr(self.ip_src)
+
+    @property
+    def dst_ip(self):
+        """Ziel-IP als IPAddr (für Logs und Benutzer-Code)"""
+        return IPAddr(self.ip_dst)
+
+
+def flow_key_from_packet(packet, in_port=None):
+    """
+    Liest alle Flow-Felder eines Pakets in einem Durchlauf
+
+    Args:
+        packet: Geparstes Ethernet-Paket (event.parsed)
+        in_port: Eingangsport
+
+    Returns:
+        FlowKey: Schlüssel des Pakets
+    """
+    eth_type = packet.type
+    vlan_id = OFP_VLAN_NONE
+    vlan_pcp = 0
+    ip_src = ip_dst = proto = sport = dport = icmp_type = icmp_code = None
+    ip_tos = 0
+
+    layer = packet.next
+    if isinstance(layer, vlan):
+        vlan_id = layer.id
+        vlan_pcp = layer.pcp
+        eth_type = layer.eth_type
+        layer = layer.next
+
+    if isinstance(layer, ipv4):
+        ip_src = layer.srcip.toUnsigned()
+        ip_dst = layer.dstip.toUnsigned()
+        ip_tos = layer.tos
+        proto = layer.protocol
+        layer = layer.next
+        if isinstance(layer, (tcp, udp)):
+            sport = layer.srcport
+            dport = layer.dstport
+        elif isinstance(layer, icmp):
+            icmp_type = layer.type
+            icmp_code = layer.code
+    elif isinstance(layer, arp):
+        ip_src = layer.protosrc.toUnsigned()
+        ip_dst = layer.protodst.toUnsigned()
+        proto = layer.opcode
+
+    return FlowKey(in_port, packet.src, packet.dst, eth_type, vlan_id, vlan_pcp,
+                   ip_src, ip_dst, ip_tos, proto, sport, dport, icmp_type, icmp_code)
+
+
+_ETH_HEADER = struct.Struct('!6s6sH')
+_VLAN_TAG = struct.Struct('!HH')
+_IP_HEADER = struct.Struct('!BBHHHBBHII')
+_L4_PORTS = struct.Struct('!HH')
+
+_VLAN_TYPE = ethernet.VLAN_TYPE
+_IP_TYPE = ethernet.IP_TYPE
+_ARP_TYPE = ethernet.ARP_TYPE
+_TCP = ipv4.TCP_PROTOCOL
+_UDP = ipv4.UDP_PROTOCOL
+_ICMP = ipv4.ICMP_PROTOCOL
+
+
+def flow_key_from_bytes(data, in_port=None):
+    """
+    Liest den FlowKey direkt aus den Rohdaten eines PacketIn
+
+    Erwartet Ethernet (optional mit einem VLAN-Tag) und IPv4 ohne Optionen;
+    TCP/UDP-Ports bzw. ICMP-Typ/-Code stehen dann an festen Offsets.
+    Nicht-IP-Pakete außer ARP werden nur bis zum Ethertype gelesen.
+
+    Args:
+        data: Rohdaten des Pakets (event.data)
+        in_port: Eingangsport
+
+    Returns:
+        FlowKey: Schlüssel des Pakets oder None, wenn das Paket den
+                 vollständigen Parser braucht (ARP, IP-Optionen, Fragmente,
+                 abgeschnittene Header)
+    """
+    size = len(data)
+    if size < 14:
+        return None
+    dst, src, eth_type = _ETH_HEADER.unpack_from(data)
+    offset = 14
+    vlan_id = OFP_VLAN_NONE
+    vlan_pcp = 0
+    if eth_type == _VLAN_TYPE:
+        if size < 18:
+            return None
+        tci, eth_type = _VLAN_TAG.unpack_from(data, 14)
+        vlan_id = tci & 0x0fff
+        vlan_pcp = tci >> 13
+        offset = 18
+
+    if eth_type != _IP_TYPE:
+        if eth_type == _ARP_TYPE:
+            return None
+        return FlowKey(in_port, EthAddr(src), EthAddr(dst), eth_type, vlan_id, vlan_pcp,
+                       None, None, 0, None, None, None, None, None)
+
+    if size < offset + 20:
+        return None
+    (ver_ihl, tos, _, _, frag, _, proto, _,
+     ip_src, ip_dst) = _IP_HEADER.unpack_from(data, offset)
+    if ver_ihl != 0x45 or frag & 0x3fff:
+        # IP-Optionen, kein IPv4 oder Fragment → vollständiger Parser
+        return None
+
+    offset += 20
+    sport = dport = icmp_type = icmp_code = None
+    if proto == _TCP or proto == _UDP:
+        if size < offset + 4:
+            return None
+        sport, dport = _L4_PORTS.unpack_from(data, offset)
+    elif proto == _ICMP:
+        if size < offset + 2:
+            return None
+        icmp_type = data[offset]
+        icmp_code = data[offset + 1]
+
+    return FlowKey(in_port, EthAddr(src), EthAddr(dst), eth_type, vlan_id, vlan_pcp,
+                   ip_src, ip_dst, tos, proto, sport, dport, icmp_type, icmp_code)
+
+
+def flow_key_from_event(event, fast_path=False):
+    """
+    FlowKey für ein PacketIn-Event
+
+    Mit fast_path wird zuerst flow_key_from_bytes() versucht; nur wenn das
+    nicht reicht, wird event.parsed (vollständiger POX-Parser) verwendet.
+
+    Args:
+        event: OpenFlow PacketIn-Event
+        fast_path: Rohdaten ohne POX-Parser auswerten
+
+    Returns:
+        FlowKey: Schlüssel des Pakets oder None, wenn es nicht geparst werden konnte
+    """
+    if fast_path:
+        key = flow_key_from_bytes(event.data, event.port)
+        if key is not None:
+            return key
+    packet = event.parsed
+    if not packet.parsed:
+        return None
+    return flow_key_from_packet(packet, event.port)
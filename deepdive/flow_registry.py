@@ -0,0 +1,124 @@
+"""
+Register installierter Flows gegen doppelte Flow-Mods
+
+Bis der erste Flow-Eintrag im Switch angekommen ist, schickt der Switch
+weitere Pakete desselben Flows als PacketIn an den Controller - und der
+Controller installiert für jedes davon erneut denselben exakten Flow.
+FlowRegistry merkt sich kurz, welche Flow-Mods gesendet wurden. Ein
+identischer Flow-Mod (gleicher Match, gleiche Priorität, gleiche Actions)
+innerhalb des Zeitfensters ist ein Duplikat; der Controller schickt dann
+nur das Paket per PacketOut weiter.
+
+Nach Ablauf des Fensters gilt ein Eintrag als unbekannt: Kommt dann noch
+ein PacketIn, fehlt der Flow offenbar im Switch und wird neu installiert.
+Meldet der Switch das Entfernen eines Flows (FlowRemoved, dafür setzt der
+Controller OFPFF_SEND_FLOW_REM), wird der Eintrag sofort gelöscht.
+
+Schlüssel ist (serialisierter Match, Priorität), denn FlowRemoved enthält
+keine Actions. Unterscheiden sich die Actions, ist der neue Flow-Mod eine
+Änderung und wird gesendet.
+
+Beispiel:
+    registry = FlowRegistry(window=1.0)
+    if registry.is_duplicate(msg):
+        ...  # PacketOut statt Flow-Mod
+    registry.removed(event.ofp.match, event.ofp.priority)  # bei FlowRemoved
+"""
+
+import time
+from collections import OrderedDict
+
+# Sekunden, in denen ein identischer Flow-Mod als Duplikat gilt
+DEDUP_WINDOW = 1.0
+
+# Maximale Anzahl gemerkter Flow-Mods
+REGISTRY_SIZE = 4096
+
+
+class FlowRegistry(object):
+    """
+    Kurzzeit-Register gesendeter Flow-Mods
+
+    Args:
+        window: Sekunden, in denen ein identischer Flow-Mod als Duplikat gilt
+        max_entries: Maximale Anzahl Einträge (älteste werden verdrängt)
+        clock: Zeitquelle (für Tests austauschbar)
+    """
+
+    def __init__(self, window=DEDUP_WINDOW, max_entries=REGISTRY_SIZE, clock=time.time):
+        self.window = window
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = OrderedDict()  # (Match, Priorität) → (Actions, Zeitpunkt)
+        self.installed = 0
+        self.duplicates = 0
+        self.removals = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _key(match, priority):
+        return match.pack(), priority
+
+    def is_duplicate(self, msg, now=None):
+        """
+        Prüft einen Flow-Mod und merkt ihn sich, falls er neu ist
+
+        Args:
+            msg: ofp_flow_mod (match, priority, actions)
+            now: Zeitpunkt (Standard: clock())
+
+        Returns:
+            bool: True, wenn derselbe Flow-Mod im Zeitfenster schon gesendet wurde
+        """
+        now = self.clock() if now is None else now
+        key = self._key(msg.match, msg.priority)
+        actions = b''.join(action.pack() for action in msg.actions)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == actions and now - entry[1] < self.window:
+            self.duplicates += 1
+            return True
+
+        self._entries[key] = (actions, now)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self.installed += 1
+        return False
+
+    def removed(self, match, priority):
+        """
+        Vergisst einen Flow, den der Switch entfernt hat (FlowRemoved)
+
+        Args:
+            match: Match des entfernten Flows
+            priority: Priorität des entfernten Flows
+
+        Returns:
+            bool: True, wenn der Flow bekannt war
+        """
+        if self._entries.pop(self._key(match, priority), None) is None:
+            return False
+        self.removals += 1
+        return True
+
+    def clear(self):
+        """
+        Vergisst alle Einträge (z.B. nach ConnectionDown)
+        """
+        self._entries.clear()
+
+    def stats(self):
+        """
+        Liefert die Zähler des Registers
+
+        Returns:
+            dict: size, installed, duplicates, removals
+        """
+        return {
+            'size': len(self._entries),
+            'installed': self.installed,
+            'duplicates': self.duplicates,
+            'removals': self.removals,
+        }
@@ -0,0 +1,275 @@
+"""
+Belegung der Flow-Tabelle eines Switches
+
+Die Controller installieren Flows mit festen Timeouts (idle 30 s, hard
+300 s), ohne zu wissen, wie voll die Flow-Tabelle des Switches ist. Bei
+vielen kurzen Flows läuft eine Hardware-Tabelle über und weitere Flow-Mods
+schlagen fehl (OFPFMFC_ALL_TABLES_FULL).
+
+FlowTableAccountant führt Buch über die Einträge eines Switches:
+    - added()    bei jedem gesendeten Flow-Mod
+    - removed()  bei FlowRemoved (Flows werden mit OFPFF_SEND_FLOW_REM installiert)
+    - sync()     mit der Antwort auf einen periodischen ofp_flow_stats_request;
+                 dabei werden Paket-/Byte-Zähler übernommen, unbekannte
+                 Einträge ergänzt und verschwundene entfernt
+
+Daraus ergeben sich:
+    - occupancy: Belegung zwischen 0 und 1 (als Metrik in stats())
+    - timeouts(): kürzere Timeouts, je voller die Tabelle ist
+    - eviction_candidates(): die am wenigsten wertvollen Einträge (wenigste
+      Bytes, bei Gleichstand die ältesten), die der Controller vor dem
+      Überlaufen selbst per OFPFC_DELETE_STRICT entfernt. Permanente Einträge
+      (ohne Timeouts, z.B. aus dem proaktiven Modus) werden nie verdrängt,
+      ebenso wenig Quarantäne-Flows (QUARANTINE_PRIORITY, siehe admission.py):
+      Sie haben 0 Bytes und stünden sonst gerade während einer Flut, die
+      die Tabelle füllt, ganz vorne.
+
+Beispiel:
+    table = FlowTableAccountant(capacity=2048)
+    msg.idle_timeout, msg.hard_timeout = table.timeouts(30, 300)
+    table.added(msg.match, msg.priority, msg.idle_timeout, msg.hard_timeout)
+    for entry in table.eviction_candidates():
+        ...  # OFPFC_DELETE_STRICT senden, dann table.evicted(entry)
+"""
+
+import heapq
+import time
+from collections import OrderedDict
+
+from .admission import QUARANTINE_PRIORITY
+
+# Angenommene Größe der Flow-Tabelle (Einträge)
+FLOW_TABLE_SIZE = 2048
+
+# Ab dieser Belegung werden die Timeouts verkürzt
+LOW_WATERMARK = 0.5
+
+# Ab dieser Belegung verdrängt der Controller selbst Einträge
+HIGH_WATERMARK = 0.9
+
+# Anteil der Kapazität, der bei Erreichen von HIGH_WATERMARK verdrängt wird
+EVICTION_SHARE = 0.05
+
+# Untergrenzen für verkürzte Timeouts (Sekunden)
+MIN_IDLE_TIMEOUT = 2
+MIN_HARD_TIMEOUT = 10
+
+# Sekunden zwischen zwei Flow-Statistik-Abfragen
+STATS_INTERVAL = 10
+
+
+class FlowEntry(object):
+    """
+    Ein Eintrag der Flow-Tabelle aus Sicht des Controllers
+    """
+
+    __slots__ = ('match', 'priority', 'idle_timeout', 'hard_timeout', 'created',
+                 'packets', 'bytes', 'seen')
+
+    def __init__(self, match, priority, idle_timeout, hard_timeout, created):
+        self.match = match
+        self.priority = priority
+        self.idle_timeout = idle_timeout
+        self.hard_timeout = hard_timeout
+        self.created = created
+        self.packets = 0
+        self.bytes = 0
+        self.seen = created   # Zeitpunkt der letzten Bestätigung durch den Switch
+
+    @property
+    def permanent(self):
+        return not self.idle_timeout and not self.hard_timeout
+
+    def __repr__(self):
+        return "FlowEntry(%s, priority=%s, bytes=%d)" % (self.match, self.priority, self.bytes)
+
+
+class FlowTableAccountant(object):
+    """
+    Buchführung über die Flow-Tabelle eines Switches
+
+    Args:
+        capacity: Angenommene Größe der Flow-Tabelle
+        low_watermark: Belegung, ab der Timeouts verkürzt werden
+        high_watermark: Belegung, ab der Einträge verdrängt werden
+        clock: Zeitquelle (für Tests austauschbar)
+    """
+
+    def __init__(self, capacity=FLOW_TABLE_SIZE, low_watermark=LOW_WATERMARK,
+                 high_watermark=HIGH_WATERMARK, clock=time.time):
+        self.capacity = capacity
+        self.low_watermark = low_watermark
+        self.high_watermark = high_watermark
+        self.clock = clock
+        self._entries = OrderedDict()  # (Match, Priorität) → FlowEntry
+        self._poll_started = None
+        self.adds = 0
+        self.removals = 0
+        self.evictions = 0
+        self.polls = 0
+        self.stale = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(list(self._entries.values()))
+
+    @staticmethod
+    def _key(match, priority):
+        return match.pack(), priority
+
+    @property
+    def occupancy(self):
+        """Belegung der Tabelle zwischen 0 und 1"""
+        return float(len(self._entries)) / self.capacity if self.capacity else 0.0
+
+    def added(self, match, priority, idle_timeout=0, hard_timeout=0, now=None):
+        """
+        Verbucht einen gesendeten Flow-Mod (OFPFC_ADD)
+
+        Ein Flow-Mod mit gleichem Match und gleicher Priorität ersetzt den
+        bisherigen Eintrag im Switch.
+
+        Returns:
+            FlowEntry: Verbuchter Eintrag
+        """
+        now = self.clock() if now is None else now
+        key = self._key(match, priority)
+        entry = FlowEntry(match, priority, idle_timeout, hard_timeout, now)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self.adds += 1
+        return entry
+
+    def removed(self, match, priority):
+        """
+        Verbucht einen entfernten Flow (FlowRemoved oder eigene Verdrängung)
+
+        Returns:
+            bool: True, wenn der Eintrag bekannt war
+        """
+        if self._entries.pop(self._key(match, priority), None) is None:
+            return False
+        self.removals += 1
+        return True
+
+    def poll_started(self, now=None):
+        """
+        Merkt sich den Zeitpunkt eines gesendeten ofp_flow_stats_request
+        """
+        self._poll_started = self.clock() if now is None else now
+
+    def sync(self, flow_stats, now=None):
+        """
+        Gleicht die Buchführung mit einer Flow-Statistik des Switches ab
+
+        Einträge, die vor der Abfrage verbucht wurden und in der Antwort
+        fehlen, sind ohne FlowRemoved verschwunden und werden entfernt.
+
+        Args:
+            flow_stats: Liste von ofp_flow_stats (match, priority, packet_count,
+                        byte_count, duration_sec, idle_timeout, hard_timeout)
+            now: Zeitpunkt der Antwort
+
+        Returns:
+            int: Anzahl entfernter veralteter Einträge
+        """
+        now = self.clock() if now is None else now
+        started = self._poll_started if self._poll_started is not None else now
+        seen = set()
+        for stat in flow_stats:
+            key = self._key(stat.match, stat.priority)
+            entry = self._entries.get(key)
+            if entry is None:
+                # Nicht von diesem Controller-Lauf installiert
+                entry = FlowEntry(stat.match, stat.priority, stat.idle_timeout,
+                                  stat.hard_timeout, now - stat.duration_sec)
+                self._entries[key] = entry
+            entry.packets = stat.packet_count
+            entry.bytes = stat.byte_count
+            entry.seen = now
+            seen.add(key)
+
+        stale = [key for key, entry in self._entries.items()
+                 if key not in seen and entry.created <= started]
+        for key in stale:
+            del self._entries[key]
+        self.stale += len(stale)
+        self.polls += 1
+        self._poll_started = None
+        return len(stale)
+
+    def timeouts(self, idle_timeout, hard_timeout):
+        """
+        Passt die Timeouts eines neuen Flows an die Belegung an
+
+        Unterhalb von low_watermark bleiben die Timeouts unverändert, darüber
+        sinken sie linear bis zu MIN_IDLE_TIMEOUT / MIN_HARD_TIMEOUT bei voller
+        Tabelle. 0 (kein Timeout) bleibt 0.
+
+        Returns:
+            tuple: (idle_timeout, hard_timeout)
+        """
+        occupancy = self.occupancy
+        if occupancy <= self.low_watermark:
+            return idle_timeout, hard_timeout
+        factor = max(0.0, (1.0 - occupancy) / (1.0 - self.low_watermark))
+        if idle_timeout:
+            idle_timeout = max(MIN_IDLE_TIMEOUT, int(idle_timeout * factor))
+        if hard_timeout:
+            hard_timeout = max(MIN_HARD_TIMEOUT, int(hard_timeout * factor))
+        return idle_timeout, hard_timeout
+
+    def eviction_candidates(self, count=None):
+        """
+        Liefert die Einträge, die vor dem Überlaufen verdrängt werden sollten
+
+        Unterhalb von high_watermark ist die Liste leer. Sonst werden
+        count Einträge (Standard: EVICTION_SHARE der Kapazität) mit den
+        wenigsten Bytes gewählt, bei Gleichstand die ältesten. Permanente
+        Einträge und Quarantäne-Flows werden nie gewählt.
+
+        Returns:
+            list: FlowEntry-Objekte; der Aufrufer löscht sie im Switch und
+                  ruft evicted() auf
+        """
+        if self.occupancy < self.high_watermark:
+            return []
+        if count is None:
+            count = max(1, int(self.capacity * EVICTION_SHARE))
+        candidates = (entry for entry in self._entries.values()
+                      if not entry.permanent and entry.priority != QUARANTINE_PRIORITY)
+        return heapq.nsmallest(count, candidates, key=lambda entry: (entry.bytes, entry.created))
+
+    def evicted(self, entry):
+        """
+        Verbucht einen vom Controller verdrängten Eintrag
+        """
+        if self._entries.pop(self._key(entry.match, entry.priority), None) is not None:
+            self.evictions += 1
+
+    def clear(self):
+        """
+        Vergisst alle Einträge (z.B. nach ConnectionDown)
+        """
+        self._entries.clear()
+        self._poll_started = None
+
+    def stats(self):
+        """
+        Liefert Belegung und Zähler
+
+        Returns:
+            dict: size, capacity, occupancy, adds, removals, evictions, stale, polls
+        """
+        return {
+            'size': len(self._entries),
+            'capacity': self.capacity,
+            'occupancy': self.occupancy,
+            'adds': self.adds,
+            'removals': self.removals,
+            'evictions': self.evictions,
+            'stale': self.stale,
+            'polls': self.polls,
+        }
@@ -0,0 +1,325 @@
+"""
+Hilfsfunktionen zum Bau von OpenFlow-Nachrichten
+
+Gemeinsam genutzt vom L2- und L3-Switch mit Firewall.
+"""
+
+import copy
+
+import pox.openflow.libopenflow_01 as of
+from pox.lib.addresses import IPAddr
+from pox.lib.packet import ethernet
+
+from .acl_compiler import PROTOCOLS, Region, format_prefix, ip_to_int, prefix_mask
+from .admission import QUARANTINE_PRIORITY
+from .elephant import MOUSE_WILDCARDS
+
+
+def match_from_region(region):
+    """
+    Übersetzt eine ACL-Region in einen OpenFlow-Match mit Wildcards
+
+    Felder, die in der Region nicht gesetzt sind (None), bleiben Wildcards.
+    Präfixe werden als nw_src/nw_dst mit Netzmaske übernommen (/0 = Wildcard).
+
+    Args:
+        region: acl_compiler.Region
+
+    Returns:
+        ofp_match: Match für IPv4-Pakete der Region
+    """
+    match = of.ofp_match(dl_type=ethernet.IP_TYPE)
+    if region.src is not None and region.src[1] > 0:
+        match.nw_src = format_prefix(*region.src)
+    if region.dst is not None and region.dst[1] > 0:
+        match.nw_dst = format_prefix(*region.dst)
+    if region.proto is not None:
+        match.nw_proto = region.proto
+    if region.dport is not None:
+        match.tp_dst = region.dport
+    return match
+
+
+def _match_prefix(address):
+    """
+    (Netz, Länge) aus ofp_match.get_nw_src()/get_nw_dst() - None = Wildcard
+    """
+    ip, length = address
+    if ip is None or length <= 0:
+        return None
+    return (ip_to_int(ip) & prefix_mask(length), length)
+
+
+def region_from_match(match):
+    """
+    Übersetzt einen OpenFlow-Match in die ACL-Region, die er abdeckt
+
+    Gegenstück zu match_from_region(): Felder, nach denen die ACL nicht
+    unterscheidet (Ports, MAC-Adressen, Quellport), werden ignoriert. Einen
+    Zielport gibt es nur bei TCP und UDP (bei ICMP steht in tp_dst der Code).
+
+    Args:
+        match: ofp_match eines Flows
+
+    Returns:
+        Region: Abgedeckte Region oder None, wenn der Match kein IPv4 ist
+    """
+    if match.dl_type != ethernet.IP_TYPE:
+        return None
+    dport = None
+    if match.nw_proto in (PROTOCOLS['tcp'], PROTOCOLS['udp']):
+        dport = match.tp_dst
+    return Region(_match_prefix(match.get_nw_src()), _match_prefix(match.get_nw_dst()),
+                  match.nw_proto, dport)
+
+
+def match_from_flow_key(key):
+    """
+    Exakter OpenFlow-Match für einen FlowKey
+
+    Entspricht ofp_match.from_packet(packet, in_port), liest die Felder aber
+    aus dem bereits extrahierten Schlüssel statt erneut aus dem Paket.
+    Bei ICMP stehen wie in OpenFlow 1.0 Typ und Code in tp_src/tp_dst.
+
+    Args:
+        key: flow_key.FlowKey
+
+    Returns:
+        ofp_match: Match mit allen Feldern des Pakets
+    """
+    match = of.ofp_match(in_port=key.in_port, dl_src=key.eth_src, dl_dst=key.eth_dst,
+                         dl_type=key.eth_type, dl_vlan=key.vlan, dl_vlan_pcp=key.vlan_pcp)
+    if key.ip_src is not None:
+        match.nw_src = IPAddr(key.ip_src)
+        match.nw_dst = IPAddr(key.ip_dst)
+        match.nw_proto = key.proto
+        if key.is_ip:
+            match.nw_tos = key.ip_tos
+            if key.icmp_type is not None:
+                match.tp_src = key.icmp_type
+                match.tp_dst = key.icmp_code
+            elif key.sport is not None:
+                match.tp_src = key.sport
+                match.tp_dst = key.dport
+    return match
+
+
+def transit_match(match):
+    """
+    Match für die weiteren Switches eines Pfades
+
+    Eingangsport und MAC-Adressen gelten nur am ersten Switch (danach ist
+    das Paket ggf. schon umgeschrieben) und werden zu Wildcards.
+
+    Args:
+        match: Match des ersten Switches
+
+    Returns:
+        ofp_match: Kopie ohne in_port, dl_src und dl_dst
+    """
+    match = copy.copy(match)
+    match.in_port = None
+    match.dl_src = None
+    match.dl_dst = None
+    return match
+
+
+def packet_out_from_flow_mod(msg, in_port):
+    """
+    PacketOut mit Daten und Actions eines Flow-Mods
+
+    Wird statt eines doppelten Flow-Mods gesendet (siehe flow_registry.py).
+
+    Args:
+        msg: ofp_flow_mod mit data (PacketIn)
+        in_port: Eingangsport des Pakets
+
+    Returns:
+        ofp_packet_out: Leitet nur das Paket weiter
+    """
+    out = of.ofp_packet_out(in_port=in_port)
+    if has_buffer(msg.buffer_id):
+        out.buffer_id = msg.buffer_id
+    else:
+        out.data = msg.data
+    out.actions.extend(msg.actions)
+    return out
+
+
+def has_buffer(buffer_id):
+    """
+    Prüft, ob der Switch das Paket gepuffert hat
+
+    Args:
+        buffer_id: buffer_id aus einem PacketIn (None/NO_BUFFER = nicht gepuffert)
+
+    Returns:
+        bool: True, wenn das Paket per buffer_id referenziert werden kann
+    """
+    return buffer_id is not None and buffer_id != of.NO_BUFFER and buffer_id != -1
+
+
+class BufferStats(object):
+    """
+    Hängt das auslösende Paket an Flow-Mods und PacketOuts an
+
+    Hat der Switch das Paket gepuffert, genügt die buffer_id; das Paket
+    muss dann nicht noch einmal über den Kontrollkanal zurück. Nur ohne
+    gültige buffer_id werden die Daten mitgeschickt. Die Zähler zeigen, wie
+    viele Bytes auf dem Kontrollkanal so eingespart wurden.
+    """
+
+    __slots__ = ('buffered', 'unbuffered', 'bytes_saved', 'bytes_sent')
+
+    def __init__(self):
+        self.buffered = 0
+        self.unbuffered = 0
+        self.bytes_saved = 0
+        self.bytes_sent = 0
+
+    def attach(self, msg, packet_in):
+        """
+        Hängt ein Paket per buffer_id oder als Daten an eine Nachricht an
+
+        Args:
+            msg: ofp_flow_mod oder ofp_packet_out
+            packet_in: Auslösender PacketIn (event.ofp)
+
+        Returns:
+            bool: True, wenn die buffer_id verwendet wurde
+        """
+        size = len(packet_in.data)
+        if has_buffer(packet_in.buffer_id):
+            msg.buffer_id = packet_in.buffer_id
+            if isinstance(msg, of.ofp_packet_out):
+                msg.in_port = packet_in.in_port
+            self.buffered += 1
+            self.bytes_saved += size
+            return True
+        msg.data = packet_in
+        self.unbuffered += 1
+        self.bytes_sent += size
+        return False
+
+    def stats(self):
+        """
+        Liefert die Zähler
+
+        Returns:
+            dict: buffered, unbuffered, bytes_saved, bytes_sent
+        """
+        return {
+            'buffered': self.buffered,
+            'unbuffered': self.unbuffered,
+            'bytes_saved': self.bytes_saved,
+            'bytes_sent': self.bytes_sent,
+        }
+
+
+def delete_flow(match, priority):
+    """
+    Erzeugt einen Flow-Mod, der genau einen Eintrag löscht (OFPFC_DELETE_STRICT)
+
+    Args:
+        match: Match des Eintrags
+        priority: Priorität des Eintrags
+
+    Returns:
+        ofp_flow_mod: Lösch-Nachricht
+    """
+    return of.ofp_flow_mod(command=of.OFPFC_DELETE_STRICT, match=match, priority=priority)
+
+
+def drop_flow(match, idle_timeout=30, hard_timeout=300):
+    """
+    Erzeugt einen Drop-Flow (Flow-Mod ohne Actions)
+
+    Args:
+        match: OpenFlow-Match
+        idle_timeout: Flow-Regel wird nach Inaktivität gelöscht
+        hard_timeout: Maximale Lebenszeit der Flow-Regel
+
+    Returns:
+        ofp_flow_mod: Flow-Mod ohne Actions = Drop
+    """
+    msg = of.ofp_flow_mod()
+    msg.match = match
+    msg.idle_timeout = idle_timeout
+    msg.hard_timeout = hard_timeout
+    return msg
+
+
+def quarantine_flows(hard_timeout, in_port=None, eth_src=None, ip_src=None,
+                     priority=QUARANTINE_PRIORITY):
+    """
+    Drop-Flows, die einen Port oder eine Quelle vorübergehend sperren
+
+    Eine IP-Quelle wird für IP und ARP gesperrt (zwei Einträge), ein Port
+    bzw. eine MAC-Adresse mit einem Eintrag auf allen Ports.
+
+    Args:
+        hard_timeout: Sekunden bis der Switch die Sperre selbst aufhebt
+        in_port: Gesperrter Eingangsport
+        eth_src: Gesperrte Quell-MAC
+        ip_src: Gesperrte Quell-IP (Integer)
+        priority: Priorität der Einträge
+
+    Returns:
+        list: ofp_flow_mods mit OFPFF_SEND_FLOW_REM
+    """
+    if ip_src is not None:
+        matches = [of.ofp_match(dl_type=eth_type, nw_src=IPAddr(ip_src))
+                   for eth_type in (ethernet.IP_TYPE, ethernet.ARP_TYPE)]
+    else:
+        matches = [of.ofp_match(in_port=in_port, dl_src=eth_src)]
+    flows = []
+    for match in matches:
+        msg = drop_flow(match, idle_timeout=0, hard_timeout=hard_timeout)
+        msg.priority = priority
+        msg.flags |= of.OFPFF_SEND_FLOW_REM
+        flows.append(msg)
+    return flows
+
+
+def reinstall_flow(flow, idle_timeout, hard_timeout):
+    """
+    Installiert einen bestehenden Flow mit anderen Timeouts neu
+
+    Ein OFPFC_ADD mit gleichem Match und gleicher Priorität ersetzt den
+    Eintrag im Switch (die Zähler beginnen dabei von vorn).
+
+    Args:
+        flow: Flow mit match, priority und actions (z.B. elephant.FlowRate)
+        idle_timeout: Neuer Idle-Timeout
+        hard_timeout: Neuer Hard-Timeout
+
+    Returns:
+        ofp_flow_mod: Flow-Mod mit OFPFF_SEND_FLOW_REM
+    """
+    return of.ofp_flow_mod(match=flow.match, priority=flow.priority,
+                           actions=list(flow.actions), idle_timeout=idle_timeout,
+                           hard_timeout=hard_timeout, flags=of.OFPFF_SEND_FLOW_REM)
+
+
+def aggregate_flow(group, idle_timeout=30, hard_timeout=300):
+    """
+    Fasst eine Gruppe exakter Flows zu einem Flow mit Wildcards zusammen
+
+    Die Felder aus elephant.MOUSE_WILDCARDS (Quellport, ToS) werden zu
+    Wildcards, Priorität und Actions übernimmt der Flow vom ersten Eintrag.
+
+    Args:
+        group: Liste von Flows aus ElephantDetector.mouse_groups()
+        idle_timeout: Idle-Timeout des Wildcard-Flows
+        hard_timeout: Hard-Timeout des Wildcard-Flows
+
+    Returns:
+        ofp_flow_mod: Flow-Mod für den Wildcard-Eintrag
+    """
+    template = group[0]
+    match = copy.copy(template.match)
+    for name in MOUSE_WILDCARDS:
+        setattr(match, name, None)
+    return of.ofp_flow_mod(match=match, priority=template.priority,
+                           actions=list(template.actions), idle_timeout=idle_timeout,
+                           hard_timeout=hard_timeout)
@@ -0,0 +1,176 @@
+"""
+Gemeinsame Host-Tabellen für alle Switches eines Controllers
+
+Bisher legt launch() pro ConnectionUp einen eigenen Controller mit eigenen
+Lerntabellen an. In der Enterprise-Topologie (r1 und s1..s5) lernt damit
+jeder der sechs Switches für sich, und ein Host, den s2 per ARP kennt, ist
+für r1 weiterhin unbekannt - r1 flutet einen eigenen ARP-Request und wartet
+auf einen Reply, den s2 abfängt.
+
+HostRegistry hält die Tabellen einmal pro Controller:
+    - ip_to_mac / mac_to_ip: gemeinsamer ARP-Cache (IP als Integer)
+    - locations: IP → HostLocation(dpid, port, mac), wo der Host angeschlossen ist
+    - port_map(dpid): MAC → Port pro Switch (Ports gelten nur lokal)
+
+Als Standort zählt die erste Beobachtung: Der Edge-Switch sieht das erste
+Paket eines Hosts, bevor es über Links zu weiteren Switches gelangt. Ein
+anderer Switch übernimmt den Standort erst, wenn der bisherige veraltet ist
+(max_age) - auf demselben Switch wird ein Portwechsel sofort übernommen.
+Ist eine Topologie gesetzt (siehe topology.py), werden Beobachtungen an
+Ports zwischen Switches nie zum Standort.
+
+Controller, die auf eine Adresse warten (z.B. zurückgehaltene Pakete bis zur
+ARP-Auflösung), melden sich mit add_listener() an und werden bei jedem
+gelernten Host benachrichtigt, auch wenn ein anderer Switch ihn gelernt hat.
+
+Beispiel:
+    registry = HostRegistry()
+    mac_to_port = registry.port_map(connection.dpid)
+    registry.learn_host(ip, mac, connection.dpid, in_port)
+    location = registry.locate(ip)
+"""
+
+import time
+
+from .host_table import HostTable, HOST_TABLE_SIZE, HOST_MAX_AGE
+
+
+class HostLocation(object):
+    """
+    Anschlusspunkt eines Hosts
+    """
+
+    __slots__ = ('dpid', 'port', 'mac')
+
+    def __init__(self, dpid, port, mac):
+        self.dpid = dpid
+        self.port = port
+        self.mac = mac
+
+    def __eq__(self, other):
+        return (isinstance(other, HostLocation) and
+                (self.dpid, self.port, self.mac) == (other.dpid, other.port, other.mac))
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return "HostLocation(dpid=%s, port=%s, mac=%s)" % (self.dpid, self.port, self.mac)
+
+
+class HostRegistry(object):
+    """
+    Lerntabellen, die sich alle Switches eines Controllers teilen
+
+    Args:
+        max_entries: Maximale Anzahl Einträge pro Tabelle
+        max_age: Sekunden bis ein nicht bestätigter Eintrag verfällt
+        clock: Zeitquelle (für Tests austauschbar)
+    """
+
+    def __init__(self, max_entries=HOST_TABLE_SIZE, max_age=HOST_MAX_AGE, clock=time.time):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.clock = clock
+        self.ip_to_mac = HostTable(max_entries, max_age, clock, name="ip_to_mac")
+        self.mac_to_ip = HostTable(max_entries, max_age, clock, name="mac_to_ip")
+        self.locations = HostTable(max_entries, max_age, clock, name="locations")
+        self._port_maps = {}   # dpid → HostTable (MAC → Port)
+        self._listeners = {}   # dpid → Callback(ip)
+        self.topology = None   # Optional: topology.Topology (erkennt Link-Ports)
+
+    def port_map(self, dpid):
+        """
+        Liefert die MAC → Port-Tabelle eines Switches (legt sie bei Bedarf an)
+        """
+        table = self._port_maps.get(dpid)
+        if table is None:
+            table = HostTable(self.max_entries, self.max_age, self.clock,
+                              name="mac_to_port[%s]" % (dpid,))
+            self._port_maps[dpid] = table
+        return table
+
+    def learn_host(self, ip, mac, dpid, port, now=None):
+        """
+        Lernt IP, MAC und Standort eines Hosts
+
+        Args:
+            ip: IP-Adresse (Integer)
+            mac: MAC-Adresse
+            dpid: Switch, an dem der Host gesehen wurde
+            port: Eingangsport an diesem Switch
+
+        Returns:
+            bool: True, wenn die IP neu ist oder eine andere MAC hat
+        """
+        now = self.clock() if now is None else now
+        changed = self.ip_to_mac.learn(ip, mac, now)
+        self.mac_to_ip.learn(mac, ip, now)
+
+        current = self.locations.get(ip, now=now)
+        if self.topology is not None and self.topology.is_link_port(dpid, port):
+            # Über einen Link weitergereicht: kein Anschlusspunkt
+            if current is not None and current.mac == mac:
+                self.locations.learn(ip, current, now)
+        elif current is None or current.dpid == dpid or current.mac != mac:
+            self.locations.learn(ip, HostLocation(dpid, port, mac), now)
+        else:
+            # Bestätigung über einen anderen Switch: Standort bleibt, wird aber aufgefrischt
+            self.locations.learn(ip, current, now)
+
+        for callback in list(self._listeners.values()):
+            callback(ip)
+        return changed
+
+    def locate(self, ip):
+        """
+        Liefert den Anschlusspunkt eines Hosts
+
+        Returns:
+            HostLocation: Standort oder None, wenn unbekannt bzw. veraltet
+        """
+        return self.locations.get(ip)
+
+    def add_listener(self, dpid, callback):
+        """
+        Meldet einen Switch für Benachrichtigungen über neu gelernte Hosts an
+
+        Args:
+            dpid: Switch (ein Callback pro Switch)
+            callback: Wird bei jedem learn_host() mit der IP (Integer) aufgerufen
+        """
+        self._listeners[dpid] = callback
+
+    def remove_switch(self, dpid):
+        """
+        Vergisst Port-Tabelle, Listener und Host-Standorte eines Switches
+        (z.B. nach ConnectionDown)
+        """
+        self._port_maps.pop(dpid, None)
+        self._listeners.pop(dpid, None)
+        for ip, location in self.locations.items():
+            if location.dpid == dpid:
+                self.locations.pop(ip)
+
+    def tables(self, dpid=None):
+        """
+        Liefert die gemeinsamen Tabellen und ggf. die Port-Tabelle eines Switches
+        """
+        tables = [self.ip_to_mac, self.mac_to_ip, self.locations]
+        if dpid is not None:
+            tables.insert(0, self.port_map(dpid))
+        return tables
+
+    def stats(self):
+        """
+        Liefert Größen der Tabellen
+
+        Returns:
+            dict: hosts, locations, switches, listeners
+        """
+        return {
+            'hosts': len(self.ip_to_mac),
+            'locations': len(self.locations),
+            'switches': len(self._port_maps),
+            'listeners': len(self._listeners),
+        }
@@ -0,0 +1,192 @@
+"""
+Lerntabellen mit Alterung und begrenzter Größe
+
+Die Switches lernen MAC → Port, IP → MAC und MAC → IP. Als einfache
+Dictionaries wachsen diese Tabellen unbegrenzt und vergessen nie etwas:
+Nach einem Umzug (VM-Migration, neue DHCP-Adresse, Spoofing) wird Verkehr
+an einen veralteten Port geschickt. HostTable verhält sich wie ein
+Dictionary, aber:
+
+- Jeder Eintrag merkt sich, wann er zuletzt gelernt wurde. Einträge, die
+  länger als max_age Sekunden nicht bestätigt wurden, gelten als veraltet.
+- Veraltete Einträge werden beim Zugriff entfernt (lazy) und zusätzlich
+  durch expire() - z.B. periodisch über einen POX-Timer.
+- Ist die Tabelle voll, wird der am längsten nicht mehr gelernte Eintrag
+  verdrängt (LRU).
+
+Da ein Eintrag bei jedem Lernen ans Ende wandert, ist die Tabelle immer nach
+Lernzeitpunkt sortiert; expire() muss nur vorne nachsehen.
+
+Beispiel:
+    mac_to_port = HostTable(max_entries=4096, max_age=300)
+    mac_to_port[src_mac] = in_port
+    if dst_mac in mac_to_port:
+        out_port = mac_to_port[dst_mac]
+    Timer(30, mac_to_port.expire, recurring=True)
+"""
+
+import time
+from collections import OrderedDict
+
+# Standardwerte für die Lerntabellen der Switches
+HOST_TABLE_SIZE = 4096
+HOST_MAX_AGE = 300
+AGING_INTERVAL = 30
+
+_MISSING = object()
+
+
+class _Entry(object):
+    """
+    Eintrag einer HostTable
+    """
+
+    __slots__ = ('value', 'learned')
+
+    def __init__(self, value, learned):
+        self.value = value
+        self.learned = learned
+
+
+class HostTable(object):
+    """
+    Dictionary mit Alterung und LRU-Verdrängung
+
+    Args:
+        max_entries: Maximale Anzahl Einträge (0 = unbegrenzt)
+        max_age: Sekunden bis ein nicht bestätigter Eintrag verfällt (0 = nie)
+        clock: Zeitquelle (für Tests austauschbar)
+        name: Name für Log-Ausgaben und Statistiken
+    """
+
+    def __init__(self, max_entries=HOST_TABLE_SIZE, max_age=HOST_MAX_AGE,
+                 clock=time.time, name=None):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.clock = clock
+        self.name = name
+        self._entries = OrderedDict()  # Schlüssel → _Entry, zuletzt gelernt am Ende
+        self.learned = 0      # Neu gelernte Einträge
+        self.moved = 0        # Einträge mit geändertem Wert (z.B. Host umgezogen)
+        self.evictions = 0    # Wegen voller Tabelle verdrängt
+        self.expirations = 0  # Wegen Alterung entfernt
+
+    def _is_stale(self, entry, now):
+        return self.max_age and now - entry.learned >= self.max_age
+
+    def learn(self, key, value, now=None):
+        """
+        Lernt bzw. bestätigt einen Eintrag
+
+        Args:
+            key: Schlüssel (z.B. MAC-Adresse)
+            value: Wert (z.B. Port)
+            now: Aktueller Zeitpunkt (Standard: clock())
+
+        Returns:
+            bool: True wenn der Eintrag neu ist oder sich der Wert geändert hat
+        """
+        now = self.clock() if now is None else now
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry.learned = now
+            self._entries.move_to_end(key)
+            if entry.value == value:
+                return False
+            entry.value = value
+            self.moved += 1
+            return True
+
+        self._entries[key] = _Entry(value, now)
+        self.learned += 1
+        if self.max_entries and len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return True
+
+    def get(self, key, default=None, now=None):
+        """
+        Liefert den Wert zu einem Schlüssel (veraltete Einträge zählen nicht)
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        if self._is_stale(entry, self.clock() if now is None else now):
+            del self._entries[key]
+            self.expirations += 1
+            return default
+        return entry.value
+
+    def pop(self, key, default=None):
+        """
+        Entfernt einen Eintrag und liefert seinen Wert
+        """
+        entry = self._entries.pop(key, None)
+        return default if entry is None else entry.value
+
+    def expire(self, now=None):
+        """
+        Entfernt alle veralteten Einträge
+
+        Args:
+            now: Aktueller Zeitpunkt (Standard: clock())
+
+        Returns:
+            int: Anzahl entfernter Einträge
+        """
+        if not self.max_age:
+            return 0
+        now = self.clock() if now is None else now
+        removed = 0
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if not self._is_stale(entry, now):
+                break
+            del self._entries[key]
+            removed += 1
+        self.expirations += removed
+        return removed
+
+    def __setitem__(self, key, value):
+        self.learn(key, value)
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __delitem__(self, key):
+        del self._entries[key]
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(list(self._entries))
+
+    def items(self):
+        """
+        Liefert alle (auch noch nicht aufgeräumte) Einträge als (Schlüssel, Wert)
+        """
+        return [(key, entry.value) for key, entry in self._entries.items()]
+
+    def stats(self):
+        """
+        Liefert Größe und Zähler der Tabelle
+
+        Returns:
+            dict: size, capacity, learned, moved, evictions, expirations
+        """
+        return {
+            'size': len(self._entries),
+            'capacity': self.max_entries,
+            'learned': self.learned,
+            'moved': self.moved,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
+
@@ -0,0 +1,183 @@
+"""
+Logging für den PacketIn-Hot-Path
+
+Pro Paket mehrere log.info-Aufrufe kosten unter Last mehr Zeit als die
+eigentliche Paketverarbeitung: Die Nachricht wird formatiert und synchron
+in die Konsole bzw. Datei geschrieben, während der OpenFlow-Event-Loop wartet.
+Dieses Modul bietet zwei Bausteine:
+
+LogAggregator
+    Zählt gleichartige Ereignisse und gibt höchstens einmal pro Intervall
+    eine Zusammenfassung aus, z.B.
+    "Firewall: 1234 Pakete blockiert durch Rule(...) (letzte 1 s)".
+    Pro Paket kostet das nur einen Dictionary-Zugriff; formatiert wird erst
+    bei der Ausgabe.
+
+enable_async_logging()
+    Ersetzt die Handler des Root-Loggers durch einen QueueHandler. Die
+    bisherigen Handler laufen in einem Hintergrund-Thread (QueueListener);
+    ein langsames Log-Ziel bremst den Event-Loop damit nicht mehr aus.
+    Auch das Formatieren übernimmt der Hintergrund-Thread. Ist die Queue
+    voll, werden Log-Einträge verworfen statt zu blockieren.
+
+Ausgaben pro Paket gibt es weiterhin auf DEBUG-Level; sie sind mit
+log.isEnabledFor() geschützt, damit ohne --DEBUG auch die Argumente nicht
+berechnet werden.
+
+Beispiel:
+    stats = LogAggregator(log)
+    stats.count("Firewall: %d Pakete blockiert durch %s", rule)
+"""
+
+import atexit
+import logging
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+# Standardintervall für Zusammenfassungen in Sekunden
+SUMMARY_INTERVAL = 1.0
+
+# Maximale Anzahl verschiedener Zusammenfassungen pro Intervall
+MAX_SUMMARY_KEYS = 20
+
+# Maximale Anzahl Log-Einträge in der Queue des Hintergrund-Threads
+LOG_QUEUE_SIZE = 10000
+
+
+class LogAggregator(object):
+    """
+    Fasst gleichartige Log-Ereignisse zu periodischen Zusammenfassungen zusammen
+
+    Ein Ereignis besteht aus einem Format-String und seinen Argumenten. Der
+    erste Platzhalter des Format-Strings erhält die Anzahl, die übrigen die
+    Argumente. Die Zusammenfassung wird beim ersten Ereignis nach Ablauf des
+    Intervalls ausgegeben (oder mit flush()). Die Controller rufen flush()
+    zusätzlich per Timer im selben Intervall und beim ConnectionDown auf,
+    sonst bliebe die Zusammenfassung des letzten Bursts liegen.
+
+    Args:
+        logger: Ziel-Logger
+        interval: Sekunden zwischen zwei Zusammenfassungen
+        level: Log-Level der Zusammenfassungen
+        max_keys: Maximale Anzahl verschiedener Ereignisse pro Intervall,
+                  weitere werden nur noch gesammelt gezählt
+        clock: Zeitquelle (für Tests austauschbar)
+    """
+
+    def __init__(self, logger, interval=SUMMARY_INTERVAL, level=logging.INFO,
+                 max_keys=MAX_SUMMARY_KEYS, clock=time.time):
+        self.logger = logger
+        self.interval = interval
+        self.level = level
+        self.max_keys = max_keys
+        self.clock = clock
+        self._counts = {}   # (Format-String, Argumente) → Anzahl
+        self._other = 0     # Ereignisse jenseits von max_keys
+        self._started = clock()
+
+    def count(self, msg, *args):
+        """
+        Zählt ein Ereignis
+
+        Args:
+            msg: Format-String, erster Platzhalter = Anzahl
+            *args: Weitere Argumente des Format-Strings
+        """
+        key = (msg, args)
+        counts = self._counts
+        if key in counts:
+            counts[key] += 1
+        elif len(counts) < self.max_keys:
+            counts[key] = 1
+        else:
+            self._other += 1
+        now = self.clock()
+        if now - self._started >= self.interval:
+            self.flush(now)
+
+    def flush(self, now=None):
+        """
+        Gibt die gesammelten Zusammenfassungen aus und beginnt ein neues Intervall
+
+        Returns:
+            int: Anzahl zusammengefasster Ereignisse
+        """
+        now = self.clock() if now is None else now
+        elapsed = now - self._started
+        counts, other = self._counts, self._other
+        self._counts = {}
+        self._other = 0
+        self._started = now
+        if not self.logger.isEnabledFor(self.level):
+            return 0
+        for (msg, args), number in counts.items():
+            self.logger.log(self.level, msg + " (letzte %.1f s)", number, *(args + (elapsed,)))
+        if other:
+            self.logger.log(self.level, "%d weitere Ereignisse (letzte %.1f s)", other, elapsed)
+        return sum(counts.values()) + other
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler, der bei voller Queue verwirft statt zu blockieren
+    und das Formatieren dem Hintergrund-Thread überlässt
+    """
+
+    def __init__(self, log_queue):
+        QueueHandler.__init__(self, log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener = None
+
+
+def enable_async_logging(logger=None, queue_size=LOG_QUEUE_SIZE):
+    """
+    Verlagert die Log-Ausgabe in einen Hintergrund-Thread
+
+    Mehrfache Aufrufe sind unschädlich; es wird nur ein Thread gestartet.
+
+    Args:
+        logger: Logger, dessen Handler verlagert werden (Standard: Root-Logger)
+        queue_size: Maximale Anzahl wartender Log-Einträge
+
+    Returns:
+        QueueListener: Hintergrund-Listener oder None, wenn keine Handler existieren
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+    target = logging.getLogger() if logger is None else logger
+    handlers = [handler for handler in target.handlers
+                if not isinstance(handler, QueueHandler)]
+    if not handlers:
+        return None
+
+    log_queue = queue.Queue(queue_size)
+    for handler in handlers:
+        target.removeHandler(handler)
+    target.addHandler(_DroppingQueueHandler(log_queue))
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(disable_async_logging)
+    return _listener
+
+
+def disable_async_logging():
+    """
+    Stoppt den Hintergrund-Thread und gibt noch wartende Einträge aus
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
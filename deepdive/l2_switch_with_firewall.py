@@ -16,14 +16,48 @@ Topologie:
     sudo mn --custom custom_topo.py --topo sdnfirewall --controller=remote,ip=127.0.0.1,port=6633 --mac -x
 """
 
+import logging
+
 from pox.core import core
 import pox.openflow.libopenflow_01 as of
-from pox.lib.packet import ethernet, ipv4, tcp, udp, icmp
-from pox.lib.addresses import EthAddr, IPAddr
+from pox.lib.packet import ethernet, tcp, udp, icmp
+from pox.lib.addresses import EthAddr
+from pox.lib.util import str_to_bool
+
+from .acl_compiler import Rule, compile_rules, ALLOW, DENY
+from .acl_cache import CachedACL
+from .admission import AdmissionControl, PORT_RATE, SOURCE_RATE, QUARANTINE_TIME
+from .elephant import StatsTraceWriter, ELEPHANT_RATE, ELEPHANT_TOP_K
+from .flow_key import flow_key_from_event
+from .flow_registry import DEDUP_WINDOW
+from .flow_table import FLOW_TABLE_SIZE, STATS_INTERVAL
+from .flow_utils import (drop_flow, match_from_flow_key, match_from_region,
+                         packet_out_from_flow_mod)
+from .host_registry import HostRegistry
+from .host_table import HOST_TABLE_SIZE, HOST_MAX_AGE, AGING_INTERVAL
+from .hot_log import enable_async_logging
+from .switch_base import SwitchBase
 
 log = core.getLogger()
 
-class LearningSwitchWithFirewall(object):
+# --- Statische ACL ---
+# Die Regeln werden deklarativ beschrieben und einmalig kompiliert.
+# Die erste passende Regel entscheidet, sonst gilt die Standard-Regel (erlauben).
+ACL_RULES = [
+    # Regel 1: HTTP-Zugriff (Port 80) zu h2 von allen Hosts erlauben
+    Rule(dst="10.0.0.2", proto="tcp", dport=80, action=ALLOW,
+         name="HTTP-Zugriff zu h2"),
+
+    # Regel 2: Gesamten Traffic von externem Client (h3) blockieren
+    Rule(src="10.0.0.3", action=DENY,
+         name="Traffic von externem Client h3"),
+
+    # Regel 3: SSH-Zugriff (Port 22) von internem Client (h1) zu h2 blockieren
+    Rule(src="10.0.0.1", dst="10.0.0.2", proto="tcp", dport=22, action=DENY,
+         name="SSH von h1 zu h2"),
+]
+
+class LearningSwitchWithFirewall(SwitchBase):
     """
     Kombinierter L2 Learning Switch mit Firewall-Funktionalität
     
@@ -33,15 +67,50 @@ class LearningSwitchWithFirewall(object):
     3. Flow-Installation für Performance-Optimierung
     """
     
-    def __init__(self, connection):
+    def __init__(self, connection, acl=None, host_table_size=HOST_TABLE_SIZE,
+                 host_max_age=HOST_MAX_AGE, aging_interval=AGING_INTERVAL, fast_path=False,
+                 batch=False, dedup_window=DEDUP_WINDOW, flow_table_size=FLOW_TABLE_SIZE,
+                 stats_interval=STATS_INTERVAL, elephants=False, elephant_rate=ELEPHANT_RATE,
+                 elephant_top_k=ELEPHANT_TOP_K, stats_trace=None, registry=None,
+                 admission=None):
         """
         Initialisiert den Learning Switch mit Firewall
         
         Args:
             connection: OpenFlow-Verbindung zum Switch
+            acl: Vorkompilierte ACL, ggf. mit Cache (Standard: ACL_RULES)
+            host_table_size: Maximale Anzahl gelernter MAC-Adressen
+            host_max_age: Sekunden bis eine gelernte MAC-Adresse verfällt
+            aging_interval: Sekunden zwischen zwei Aufräum-Durchläufen
+                            (0 = nur beim Zugriff aufräumen)
+            fast_path: IPv4-Header direkt aus den Rohdaten lesen, POX-Parser
+                       nur für ARP, IP-Optionen und Fragmente
+            batch: Ausgehende Nachrichten bündeln und pro Event-Burst
+                   gemeinsam schreiben (siehe msg_batcher.py)
+            dedup_window: Sekunden, in denen ein identischer Flow-Mod durch
+                          einen PacketOut ersetzt wird (0 = aus)
+            flow_table_size: Angenommene Größe der Flow-Tabelle des Switches
+            stats_interval: Sekunden zwischen zwei Flow-Statistik-Abfragen
+                            (0 = keine Abfragen)
+            elephants: Elephant-Flows aus der Flow-Statistik erkennen, mit
+                       längeren Timeouts neu installieren und Mice zu
+                       Wildcard-Flows zusammenfassen (siehe elephant.py)
+            elephant_rate: Bytes/s, ab denen ein Flow ein Elephant ist
+            elephant_top_k: Zusätzlich die k Flows mit der höchsten Rate
+            stats_trace: Optionaler StatsTraceWriter, der jede Flow-Statistik
+                         aufzeichnet
+            registry: Gemeinsame HostRegistry aller Switches (Standard: eigene
+                      Tabellen mit host_table_size und host_max_age)
+            admission: Gemeinsame AdmissionControl; PacketIns über dem Budget
+                       von Port oder Quell-MAC werden verworfen und die Quelle
+                       per Drop-Flow gesperrt (Standard: keine Begrenzung)
         """
-        self.connection = connection
-        self.mac_to_port = {}  # Zuordnung MAC-Adresse → Port
+        SwitchBase.__init__(self, connection,
+                            acl if acl is not None else CachedACL(compile_rules(ACL_RULES)),
+                            host_table_size, host_max_age, fast_path, batch, dedup_window,
+                            flow_table_size, elephants, elephant_rate, elephant_top_k,
+                            stats_trace, registry, admission)
+        self._start_timers(aging_interval, stats_interval)
         connection.addListeners(self)
         log.info("LearningSwitch mit Firewall verbunden mit %s", connection)
 
@@ -54,109 +123,97 @@ class LearningSwitchWithFirewall(object):
         2. Firewall-Prüfung für IP-Pakete
         3. L2-Switching basierend auf gelernten MAC-Adressen
         
+        Die Header werden einmal in einen FlowKey gelesen; alle weiteren
+        Schritte arbeiten nur noch mit diesem Schlüssel. Mit fast_path
+        kommt der Schlüssel direkt aus den Rohdaten (siehe flow_key.py).
+        
         Args:
             event: OpenFlow PacketIn-Event
         """
-        packet = event.parsed
-
-        if not packet.parsed:
+        key = flow_key_from_event(event, self.fast_path)
+        if key is None:
             log.warning("Unverständliches Paket - wird verworfen")
             return
-
-        eth = packet.find('ethernet')
-        if not eth:
-            log.warning("Kein Ethernet-Frame gefunden - wird verworfen")
+        if self.admission is not None and not self._admit(key):
             return
-            
-        src_mac = eth.src
-        dst_mac = eth.dst
-        in_port = event.port
 
         # --- Sektion A: MAC-Adresse lernen ---
-        self._learn_mac_address(src_mac, in_port)
+        self._learn_mac_address(key.eth_src, key.in_port)
+        if key.is_arp and key.ip_src:
+            # ARP-Absender: IP, MAC und Standort für alle Switches merken
+            self.hosts.learn_host(key.ip_src, key.eth_src, self.connection.dpid, key.in_port)
 
         # --- Sektion B: Firewall-Prüfung für IP-Pakete ---
-        if self._should_check_firewall(packet):
-            if self._is_packet_blocked(packet):
-                log.info("Firewall: Paket blockiert von %s nach %s", 
-                        packet.find('ipv4').srcip, packet.find('ipv4').dstip)
+        if self._should_check_firewall(key):
+            if self._is_packet_blocked(key):
+                # Drop-Flow installieren, damit weitere Pakete im Switch verworfen werden
+                self._install_drop_flow(key)
                 return  # Paket wird nicht weitergeleitet
 
         # --- Sektion C: L2-Switching basierend auf gelernten MAC-Adressen ---
-        self._handle_l2_switching(packet, src_mac, dst_mac, in_port, event)
+        self._handle_l2_switching(key, event)
 
-    def _learn_mac_address(self, src_mac, in_port):
-        """
-        Lernt die Zuordnung von MAC-Adresse zu Port
-        
-        Args:
-            src_mac: Quell-MAC-Adresse
-            in_port: Eingangsport
-        """
-        self.mac_to_port[src_mac] = in_port
-        log.debug("MAC-Adresse gelernt: %s → Port %s", src_mac, in_port)
-
-    def _should_check_firewall(self, packet):
+    def _should_check_firewall(self, key):
         """
         Prüft ob ein Paket Firewall-Prüfung benötigt
         
         Args:
-            packet: Zu prüfendes Paket
+            key: FlowKey des zu prüfenden Pakets
             
         Returns:
-            bool: True wenn IP-Paket gefunden wurde
+            bool: True wenn es ein IP-Paket ist
         """
-        return packet.find('ipv4') is not None
+        return key.is_ip and key.ip_src is not None
 
-    def _is_packet_blocked(self, packet):
+    def _is_packet_blocked(self, key):
         """
         Firewall-Logik: Prüft ob ein IP-Paket blockiert werden soll
         
-        Extrahiert relevante Felder aus dem IP-Paket und wendet ACL-Regeln an.
+        Wendet die ACL-Regeln auf die Felder des FlowKeys an.
         
         Args:
-            packet: Zu prüfendes IP-Paket
+            key: FlowKey des zu prüfenden IP-Pakets
             
         Returns:
             bool: True wenn Paket blockiert werden soll
         """
-        ip_packet = packet.find('ipv4')
-        src_ip = ip_packet.srcip
-        dst_ip = ip_packet.dstip
-        proto = ip_packet.protocol
-
-        # Ports extrahieren basierend auf Protokoll
-        dst_port = self._extract_dst_port(packet, proto)
+        # Ports sind im FlowKey bereits extrahiert (ICMP → None)
+        return self._is_blocked_by_acl(key.ip_src, key.ip_dst, key.proto, key.dport)
 
-        # Firewall-Regeln anwenden
-        return self._is_blocked_by_acl(src_ip, dst_ip, proto, dst_port)
-
-    def _extract_dst_port(self, packet, proto):
+    def _install_drop_flow(self, key):
         """
-        Extrahiert den Zielport basierend auf dem Protokoll
+        Installiert einen Drop-Flow für ein blockiertes IP-Paket
+        
+        Der Match wird so weit gefasst, wie es die auslösende Regel erlaubt:
+        Felder, die die Regel nicht prüft (z.B. der Quellport), bleiben
+        Wildcards, und gilt die Regel für ein ganzes Subnetz, wird das Subnetz
+        übernommen. So landen weitere Pakete eines Scans nicht erneut beim
+        Controller.
         
         Args:
-            packet: IP-Paket
-            proto: Protokoll-ID
-            
-        Returns:
-            int: Zielport oder None
+            key: FlowKey des blockierten IP-Pakets
         """
-        if proto == ipv4.ICMP_PROTOCOL:
-            return None  # ICMP → keine Ports
-        elif proto == ipv4.TCP_PROTOCOL:
-            tcp_packet = packet.find('tcp')
-            return tcp_packet.dstport if tcp_packet else None
-        elif proto == ipv4.UDP_PROTOCOL:
-            udp_packet = packet.find('udp')
-            return udp_packet.dstport if udp_packet else None
-        return None
+        rule = self.acl.lookup(key.ip_src, key.ip_dst, key.proto, key.dport)
+        self.log_stats.count("Firewall: %d Pakete blockiert durch %s",
+                             rule if rule is not None else "Standard-Regel")
+        region = self.acl.widest_region(rule, key.ip_src, key.ip_dst, key.proto, key.dport)
+        if region is not None:
+            match = match_from_region(region)
+        else:
+            # Entscheidung lässt sich nicht weiter fassen → exakter Match
+            match = match_from_flow_key(key)
+        msg = drop_flow(match)
+        self._track_flow_mod(msg)
+        self.sender.send(msg)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Firewall: Paket blockiert von %s nach %s, Drop-Flow: %s",
+                      key.src_ip, key.dst_ip, match)
 
     def _is_blocked_by_acl(self, src, dst, proto, dport):
         """
         Statische ACL-Regeln
         
-        Implementiert die Firewall-Logik basierend auf:
+        Prüft das Paket gegen die kompilierte ACL basierend auf:
         - Quell-IP-Adresse
         - Ziel-IP-Adresse  
         - Protokoll (TCP, UDP, ICMP)
@@ -171,88 +228,131 @@ class LearningSwitchWithFirewall(object):
         Returns:
             bool: True wenn Paket blockiert werden soll
         """
-        # --- Beispielhafter Regelsatz ---
-        # Regel 1: HTTP-Zugriff (Port 80) zu h2 von allen Hosts erlauben
-        if dst == IPAddr("10.0.0.2") and proto == ipv4.TCP_PROTOCOL and dport == 80:
-            log.debug("ACL: HTTP-Zugriff zu h2 erlaubt")
-            return False
+        # Regeln siehe ACL_RULES - Lookup in der vorkompilierten ACL
+        rule = self.acl.lookup(src, dst, proto, dport)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("ACL: %s", rule if rule is not None else "Standard-Regel")
+        return self.acl.action_for(rule) == DENY
 
-        # Regel 2: Gesamten Traffic von externem Client (h3) blockieren
-        if src == IPAddr("10.0.0.3"):
-            log.debug("ACL: Traffic von externem Client h3 blockiert")
-            return True
-
-        # Regel 3: SSH-Zugriff (Port 22) von internem Client (h1) zu h2 blockieren
-        if src == IPAddr("10.0.0.1") and dst == IPAddr("10.0.0.2") and proto == ipv4.TCP_PROTOCOL and dport == 22:
-            log.debug("ACL: SSH von h1 zu h2 blockiert")
-            return True
-
-        # Standard: Paket erlauben
-        log.debug("ACL: Paket erlaubt (Standard-Regel)")
-        return False
-
-    def _handle_l2_switching(self, packet, src_mac, dst_mac, in_port, event):
+    def _handle_l2_switching(self, key, event):
         """
         Führt L2-Switching basierend auf gelernten MAC-Adressen durch
         
         Args:
-            packet: Zu verarbeitendes Paket
-            src_mac: Quell-MAC-Adresse
-            dst_mac: Ziel-MAC-Adresse
-            in_port: Eingangsport
+            key: FlowKey des zu verarbeitenden Pakets
             event: OpenFlow-Event
         """
+        src_mac = key.eth_src
+        dst_mac = key.eth_dst
+        in_port = key.in_port
         if dst_mac in self.mac_to_port:
             # Ziel bekannt → direktes Switching
             out_port = self.mac_to_port[dst_mac]
-            log.info("L2-Switching: %s -> %s über Port %s", src_mac, dst_mac, out_port)
-            self._install_flow_and_forward(packet, in_port, out_port, event)
+            self.log_stats.count("L2-Switching: %d Pakete weitergeleitet")
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("L2-Switching: %s -> %s über Port %s", src_mac, dst_mac, out_port)
+            self._install_flow_and_forward(key, out_port, event)
         else:
             # Ziel unbekannt → Flood
-            log.info("Unbekanntes Ziel %s – Flood an alle Ports", dst_mac)
+            self.log_stats.count("L2-Switching: %d Pakete an unbekannte Ziele geflutet")
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("Unbekanntes Ziel %s – Flood an alle Ports", dst_mac)
             self._flood_packet(event, in_port)
 
-    def _install_flow_and_forward(self, packet, in_port, out_port, event):
+    def _install_flow_and_forward(self, key, out_port, event):
         """
         Installiert Flow-Regel und leitet Paket weiter
         
         Args:
-            packet: Zu verarbeitendes Paket
-            in_port: Eingangsport
+            key: FlowKey des zu verarbeitenden Pakets
             out_port: Ausgangsport
             event: OpenFlow-Event
         """
         msg = of.ofp_flow_mod()
-        msg.match = of.ofp_match.from_packet(packet, in_port)
+        msg.match = match_from_flow_key(key)
         msg.idle_timeout = 30  # Flow-Regel wird nach Inaktivität gelöscht
         msg.hard_timeout = 300  # max. Lebenszeit der Flow-Regel
         msg.actions.append(of.ofp_action_output(port=out_port))
-        msg.data = event.ofp  # sendet auch gleich das aktuelle Paket
-        self.connection.send(msg)
-        log.debug("Flow installiert: %s -> %s", in_port, out_port)
-
-    def _flood_packet(self, event, in_port):
-        """
-        Leitet Paket an alle Ports weiter (Flood)
-        
-        Args:
-            event: OpenFlow-Event
-            in_port: Eingangsport (wird ausgeschlossen)
-        """
-        msg = of.ofp_packet_out(data=event.ofp)
-        msg.actions.append(of.ofp_action_output(port=of.OFPP_FLOOD))
-        msg.in_port = in_port
-        self.connection.send(msg)
-        log.debug("Paket geflutet von Port %s", in_port)
+        self.buffers.attach(msg, event.ofp)  # sendet auch gleich das aktuelle Paket
+        if self._is_duplicate_flow(msg):
+            msg = packet_out_from_flow_mod(msg, key.in_port)
+        else:
+            self._track_flow_mod(msg)
+        self.sender.send(msg)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Flow installiert: %s -> %s", key.in_port, out_port)
 
-def launch():
+def launch(acl_cache_size=4096, host_table_size=HOST_TABLE_SIZE,
+           host_max_age=HOST_MAX_AGE, aging_interval=AGING_INTERVAL, async_log=True,
+           fast_path=False, batch=False, dedup_window=DEDUP_WINDOW,
+           flow_table_size=FLOW_TABLE_SIZE, stats_interval=STATS_INTERVAL, elephants=False,
+           elephant_rate=ELEPHANT_RATE, elephant_top_k=ELEPHANT_TOP_K, stats_trace=None,
+           admission=False, port_rate=PORT_RATE, source_rate=SOURCE_RATE,
+           quarantine_time=QUARANTINE_TIME):
     """
     Startet den Learning Switch mit Firewall
     
     Registriert einen Event-Listener für neue OpenFlow-Verbindungen
+    
+    Args:
+        acl_cache_size: Größe des ACL-Entscheidungs-Caches (0 = kein Cache)
+        host_table_size: Maximale Anzahl gelernter MAC-Adressen pro Switch
+        host_max_age: Sekunden bis eine gelernte MAC-Adresse verfällt
+        aging_interval: Sekunden zwischen zwei Aufräum-Durchläufen (0 = kein Timer)
+        async_log: Log-Ausgabe in einen Hintergrund-Thread verlagern
+                   (--async_log=False schaltet das ab)
+        fast_path: PacketIns ohne vollständigen POX-Parser klassifizieren
+                   (--fast_path)
+        batch: Flow-Mods und PacketOuts pro Event-Burst in einem Socket-Write
+               senden (--batch)
+        dedup_window: Sekunden, in denen ein identischer Flow-Mod nur als
+                      PacketOut gesendet wird (--dedup_window=0 schaltet das ab)
+        flow_table_size: Angenommene Größe der Flow-Tabelle pro Switch; nahe der
+                         Grenze werden Timeouts verkürzt und Einträge verdrängt
+        stats_interval: Sekunden zwischen zwei Flow-Statistik-Abfragen (0 = keine)
+        elephants: Elephant-Flows aus der Flow-Statistik erkennen (--elephants);
+                   Elephants bekommen längere Timeouts, Mice werden zu
+                   Wildcard-Flows zusammengefasst
+        elephant_rate: Bytes/s, ab denen ein Flow ein Elephant ist
+        elephant_top_k: Zusätzlich die k Flows mit der höchsten Rate pro Switch
+        stats_trace: Datei, in die jede Flow-Statistik als JSON-Zeile geschrieben
+                     wird (Auswertung offline mit python -m deepdive.elephant)
+        admission: PacketIns per Token-Bucket pro Port und Quell-MAC begrenzen
+                   (--admission); Quellen bzw. Ports über dem Budget werden
+                   per Drop-Flow gesperrt
+        port_rate: PacketIns/s pro Switch-Port (Burst: doppelte Rate)
+        source_rate: PacketIns/s pro Quell-MAC (Burst: doppelte Rate)
+        quarantine_time: Sekunden, die eine Sperre im Switch bleibt
     """
+    if str_to_bool(async_log):
+        # Erst nach dem Start aller Komponenten, damit z.B. samples.pretty_log
+        # die Log-Handler schon eingerichtet hat
+        core.addListenerByName("UpEvent", lambda event: enable_async_logging())
+    # Ein Satz Lerntabellen für alle Switches
+    registry = HostRegistry(int(host_table_size), float(host_max_age))
+    switch_options = dict(registry=registry,
+                          aging_interval=float(aging_interval),
+                          fast_path=str_to_bool(fast_path),
+                          batch=str_to_bool(batch),
+                          dedup_window=float(dedup_window),
+                          flow_table_size=int(flow_table_size),
+                          stats_interval=float(stats_interval),
+                          elephants=str_to_bool(elephants),
+                          elephant_rate=float(elephant_rate),
+                          elephant_top_k=int(elephant_top_k))
+    if str_to_bool(admission):
+        switch_options['admission'] = AdmissionControl(float(port_rate), None,
+                                                       float(source_rate), None,
+                                                       float(quarantine_time))
+    if stats_trace:
+        switch_options['stats_trace'] = StatsTraceWriter(stats_trace)
+        log.info("Flow-Statistiken werden in %s aufgezeichnet", stats_trace)
+    acl = compile_rules(ACL_RULES)
+    if int(acl_cache_size) > 0:
+        acl = CachedACL(acl, int(acl_cache_size))
+
     def start_switch(event):
         log.info("Starte LearningSwitch mit Firewall auf %s", event.connection)
-        LearningSwitchWithFirewall(event.connection)
+        LearningSwitchWithFirewall(event.connection, acl, **switch_options)
     
     core.openflow.addListenerByName("ConnectionUp", start_switch)
@@ -17,17 +17,51 @@ Funktionen:
 
 Verwendung:
     ~/pox/pox.py l3_switch samples.pretty_log --DEBUG
+    ~/pox/pox.py deepdive.l3_switch_with_firewall --policy=deepdive/enterprise_policy.json
+    ~/pox/pox.py deepdive.l3_switch_with_firewall --proactive
+    ~/pox/pox.py openflow.discovery deepdive.l3_switch_with_firewall --topology
+    ~/pox/pox.py deepdive.l3_switch_with_firewall --offload=4
+    ~/pox/pox.py deepdive.l3_switch_with_firewall --policy=deepdive/enterprise_policy.json --watch_policy
 
 Topologie:
     sudo mn --custom custom_topo_subnets.py --topo sdnfirewall --controller=remote,ip=127.0.0.1,port=6633 --mac -x
+    sudo mn --custom deepdive/enterprise_network_topo.py --topo enterprise --controller=remote --mac
 """
 
+import logging
+import signal
+
 from pox.core import core
 import pox.openflow.libopenflow_01 as of
-from pox.lib.packet import ethernet, ipv4, tcp, udp, icmp, arp
+from pox.lib.packet import ethernet, tcp, udp, icmp, arp
 from pox.lib.addresses import EthAddr, IPAddr
 import time
 from pox.openflow.libopenflow_01 import ofp_action_dl_addr, OFPAT_SET_DL_SRC, OFPAT_SET_DL_DST
+from pox.lib.util import str_to_bool
+from pox.lib.recoco import Timer
+
+from .acl_compiler import Rule, compile_rules, restrict_region, uniform_action, ALLOW, DENY
+from .acl_cache import CachedACL
+from .admission import (AdmissionControl, PORT_RATE, SOURCE_RATE, QUARANTINE_TIME,
+                        QUARANTINE_PRIORITY)
+from .arp_proxy import ArpReplyTemplates
+from .arp_queue import PendingArpQueue
+from .elephant import StatsTraceWriter, ELEPHANT_RATE, ELEPHANT_TOP_K
+from .flow_key import flow_key_from_event
+from .flow_registry import DEDUP_WINDOW
+from .flow_table import FLOW_TABLE_SIZE, STATS_INTERVAL
+from .flow_utils import (delete_flow, drop_flow, match_from_flow_key, match_from_region,
+                         packet_out_from_flow_mod, region_from_match, transit_match)
+from .host_registry import HostRegistry
+from .host_table import HOST_TABLE_SIZE, HOST_MAX_AGE, AGING_INTERVAL
+from .hot_log import enable_async_logging
+from .offload import PolicyOffload, OFFLOAD_WORKERS
+from .policy_reload import PolicyDiff, PolicyWatcher, WATCH_INTERVAL
+from .proactive import ProactiveInstaller
+from .routing_table import RoutingTable
+from .switch_base import SwitchBase
+from .topology import Topology
+from .zone_policy import load_policy, resolve_policy_path
 
 log = core.getLogger()
 
@@ -40,7 +74,61 @@ gateway_ips = {
     # ... ggf. weitere Subnetze
 }
 
-class Layer3SwitchWithFirewall(object):
+# Präfixlänge der Gateway-Subnetze (Gateway-IP → Länge).
+# Nicht aufgeführte Gateways gelten als /24.
+gateway_prefixes = {
+    IPAddr("10.1.1.254"): 24,
+    IPAddr("10.2.1.254"): 24,
+    IPAddr("10.3.1.254"): 24,
+    IPAddr("10.4.1.254"): 24,
+    IPAddr("10.5.1.254"): 24,
+}
+
+# Statische Routen über einen Next-Hop (Netzwerk → Next-Hop-IP), z.B.
+# "192.168.0.0/16": "10.5.1.1". Direkt verbundene Subnetze stehen oben.
+STATIC_ROUTES = {}
+
+# --- L3-Switch ACL-Regeln ---
+# --------------------- Hier die Regeln einfügen ---------------------
+# Die Regeln werden deklarativ beschrieben und einmalig kompiliert.
+# Die erste passende Regel entscheidet, sonst gilt die Standard-Regel (erlauben).
+ACL_RULES = [
+    # Regel 1: HTTP-Zugriff (Port 80) zu DMZ-Server erlauben
+    Rule(dst="10.2.1.100", proto="tcp", dport=80, action=ALLOW,
+         name="HTTP-Zugriff zu DMZ-Server"),
+
+    # Regel 2: Gesamten Traffic aus externem Netz blockieren
+    Rule(src="10.3.1.0/24", action=DENY,
+         name="Traffic aus externem Netz"),
+
+    # Regel 3: SSH von internem Netz zur DMZ blockieren
+    Rule(src="10.1.1.0/24", dst="10.2.1.0/24", proto="tcp", dport=22, action=DENY,
+         name="SSH von internem zu DMZ-Netz"),
+]
+
+def build_routing_table(gateways=gateway_ips, static_routes=STATIC_ROUTES):
+    """
+    Baut die LPM-Routing-Tabelle aus Gateway-Subnetzen und statischen Routen
+    
+    Gateway-Subnetze werden zuerst eingetragen, damit statische Routen über
+    einen Next-Hop die Gateway-MAC des Next-Hop-Subnetzes übernehmen.
+    
+    Args:
+        gateways: Gateway-IP → Gateway-MAC
+        static_routes: Netzwerk → Next-Hop-IP
+        
+    Returns:
+        RoutingTable: Tabelle für Longest-Prefix-Match-Lookups
+    """
+    table = RoutingTable()
+    for gw_ip, gw_mac in gateways.items():
+        length = gateway_prefixes.get(gw_ip, 24)
+        table.add((gw_ip.toUnsigned(), length), gateway_ip=gw_ip, gateway_mac=gw_mac)
+    for prefix, next_hop in static_routes.items():
+        table.add(prefix, next_hop=next_hop)
+    return table
+
+class Layer3SwitchWithFirewall(SwitchBase):
     """
     Vollständiger Layer 3 Switch mit Firewall-Funktionalität
     
@@ -52,24 +140,101 @@ class Layer3SwitchWithFirewall(object):
     5. MAC-Adress-Learning für lokale Subnetze
     """
     
-    def __init__(self, connection):
+    def __init__(self, connection, acl=None, proactive=False,
+                 host_table_size=HOST_TABLE_SIZE, host_max_age=HOST_MAX_AGE,
+                 aging_interval=AGING_INTERVAL, fast_path=False,
+                 batch=False, dedup_window=DEDUP_WINDOW, flow_table_size=FLOW_TABLE_SIZE,
+                 stats_interval=STATS_INTERVAL, elephants=False, elephant_rate=ELEPHANT_RATE,
+                 elephant_top_k=ELEPHANT_TOP_K, stats_trace=None, subnet_flows=True,
+                 registry=None, topology=None, peers=None, gateway_arp=True,
+                 admission=None, offload=None):
         """
         Initialisiert den Layer 3 Switch mit Firewall
         
         Args:
             connection: OpenFlow-Verbindung zum Switch
+            acl: Vorkompilierte ACL, ggf. mit Cache (Standard: ACL_RULES)
+            proactive: ACL und Routen beim Verbindungsaufbau vorab installieren
+            host_table_size: Maximale Anzahl Einträge pro Lerntabelle
+            host_max_age: Sekunden bis ein gelernter Eintrag verfällt
+            aging_interval: Sekunden zwischen zwei Aufräum-Durchläufen
+                            (0 = nur beim Zugriff aufräumen)
+            fast_path: IPv4-Header direkt aus den Rohdaten lesen, POX-Parser
+                       nur für ARP, IP-Optionen und Fragmente
+            batch: Ausgehende Nachrichten bündeln und pro Event-Burst
+                   gemeinsam schreiben (siehe msg_batcher.py)
+            dedup_window: Sekunden, in denen ein identischer Flow-Mod durch
+                          einen PacketOut ersetzt wird (0 = aus)
+            flow_table_size: Angenommene Größe der Flow-Tabelle des Switches
+            stats_interval: Sekunden zwischen zwei Flow-Statistik-Abfragen
+                            (0 = keine Abfragen)
+            elephants: Elephant-Flows aus der Flow-Statistik erkennen, mit
+                       längeren Timeouts neu installieren und Mice zu
+                       Wildcard-Flows zusammenfassen (siehe elephant.py)
+            elephant_rate: Bytes/s, ab denen ein Flow ein Elephant ist
+            elephant_top_k: Zusätzlich die k Flows mit der höchsten Rate
+            stats_trace: Optionaler StatsTraceWriter, der jede Flow-Statistik
+                         aufzeichnet
+            subnet_flows: Geroutete Pakete mit einem Flow pro Quell-Subnetz und
+                          Ziel-Host weiterleiten, soweit die ACL die Quell-Hosts
+                          nicht unterscheidet (sonst ein exakter Flow pro Paar)
+            registry: Gemeinsame HostRegistry aller Switches (Standard: eigene
+                      Tabellen mit host_table_size und host_max_age)
+            topology: Gemeinsamer Topology-Graph aus openflow.discovery; geroutete
+                      Pakete zu Hosts anderer Switches bekommen dann auf dem
+                      ganzen Pfad auf einmal Flows (siehe topology.py)
+            peers: Gemeinsames dict dpid → Switch-Controller, über das die
+                   Flows auf den übrigen Switches des Pfades gesendet und
+                   Regelwechsel an alle Switches verteilt werden
+            gateway_arp: Im proaktiven Modus ARP-Requests an die Gateways per
+                         Flow direkt im Switch beantworten (Nicira-Actions, OVS)
+            admission: Gemeinsame AdmissionControl; PacketIns über dem Budget
+                       von Port oder Quelle werden verworfen und die Quelle
+                       per Drop-Flow gesperrt (Standard: keine Begrenzung)
+            offload: Gemeinsamer PolicyOffload; die Policy-Entscheidung für
+                     IP-Pakete läuft dann in dessen Workern, die Flows werden
+                     pro Flow in Ankunftsreihenfolge installiert (siehe offload.py)
         """
-        self.connection = connection
-        self.mac_to_port = {}  # MAC-Adresse → Port (für lokale Subnetze)
-        self.ip_to_mac = {}    # IP-Adresse → MAC-Adresse (ARP-Cache)
-        self.mac_to_ip = {}    # MAC-Adresse → IP-Adresse (Reverse-ARP)
-        self.arp_requests = {} # Ausstehende ARP-Requests
+        SwitchBase.__init__(self, connection,
+                            acl if acl is not None else CachedACL(compile_rules(ACL_RULES)),
+                            host_table_size, host_max_age, fast_path, batch, dedup_window,
+                            flow_table_size, elephants, elephant_rate, elephant_top_k,
+                            stats_trace, registry, admission, topology)
+        # IP-Adresse (Integer) → MAC-Adresse (ARP-Cache, gemeinsam)
+        self.ip_to_mac = self.hosts.ip_to_mac
+        # MAC-Adresse → IP-Adresse (Integer, Reverse-ARP, gemeinsam)
+        self.mac_to_ip = self.hosts.mac_to_ip
+        self.arp_requests = PendingArpQueue() # Ziel-IP → Pakete mit ausstehendem ARP-Request
+        self.arp_replies = ArpReplyTemplates() # Fertige ARP-Reply-Frames (ARP-Proxy)
         self.static_routes = {} # Statische Routen: Netzwerk → Gateway
         self.gateway_ips = gateway_ips # Gateway-IPs
+        self.subnet_flows = subnet_flows
+        # Pfad-Flows über mehrere Switches (nur mit Topologie)
+        self.peers = peers if peers is not None else {}
+        self.peers[connection.dpid] = self
+        # Worker für die Policy-Entscheidung (None = in der Event-Schleife)
+        self.offload = offload
         
         # Statische Routen konfigurieren
         self._setup_static_routes()
+        self.routing_table = self._build_routing_table()
+
+        # Proaktiver Modus: ACL und Routen direkt in die Flow-Tabelle schreiben
+        self.proactive = None
+        if proactive:
+            self.proactive = ProactiveInstaller(self.sender, self.acl, self.routing_table)
+            self.proactive.install_policy()
+            if gateway_arp:
+                self.proactive.install_gateway_arp(self.gateway_ips)
+            if batch:
+                # Erst nach dem Barrier-Reply steht fest, dass der Switch alle Einträge hat
+                self.sender.barrier(lambda count: log.info(
+                    "Proaktiver Modus: %d Nachrichten vom Switch bestätigt", count))
+
+        self._start_timers(aging_interval, stats_interval)
         
+        # Von anderen Switches gelernte Hosts geben zurückgehaltene Pakete frei
+        self.hosts.add_listener(connection.dpid, self._host_learned)
         connection.addListeners(self)
         log.info("Layer 3 Switch mit Firewall verbunden mit %s", connection)
 
@@ -77,20 +242,26 @@ class Layer3SwitchWithFirewall(object):
         """
         Konfiguriert statische Routen für die Topologie
         
-        Für custom_topo_subnets.py:
-        - 10.0.1.0/24 (internes Netz) → direkt verbunden
-        - 10.0.2.0/24 (DMZ) → direkt verbunden  
-        - 10.0.3.0/24 (externes Netz) → direkt verbunden
-        """
-        # Alle Subnetze sind direkt verbunden (gleicher Switch)
-        # In einer komplexeren Topologie würden hier Gateways definiert
-        self.static_routes = {
-            "10.0.1.0/24": None,  # Direkt verbunden
-            "10.0.2.0/24": None,  # Direkt verbunden
-            "10.0.3.0/24": None   # Direkt verbunden
-        }
+        Die Subnetze des Enterprise-Netzes (enterprise_network_topo.py,
+        10.1.1.0/24 bis 10.5.1.0/24) sind direkt verbunden und ergeben sich
+        aus gateway_ips/gateway_prefixes. Welcher Switch (s1..s5) ein Subnetz
+        anbindet, liefert die Topologie. Hier stehen nur Netze, die über
+        einen Next-Hop erreicht werden (Netzwerk → Next-Hop-IP).
+        """
+        self.static_routes = dict(STATIC_ROUTES)
         log.info("Statische Routen konfiguriert: %s", list(self.static_routes.keys()))
 
+    def _build_routing_table(self):
+        """
+        Baut die LPM-Routing-Tabelle aus Gateway-Subnetzen und statischen Routen
+        
+        Returns:
+            RoutingTable: Tabelle für Longest-Prefix-Match-Lookups
+        """
+        table = build_routing_table(self.gateway_ips, self.static_routes)
+        log.info("Routing-Tabelle: %d Routen", len(table))
+        return table
+
     def _handle_PacketIn(self, event):
         """
         Hauptmethode zur Paketverarbeitung
@@ -101,127 +272,303 @@ class Layer3SwitchWithFirewall(object):
         3. Firewall-Prüfung für IP-Pakete
         4. L3-Routing oder L2-Switching
         
+        Die Header werden einmal in einen FlowKey gelesen; alle weiteren
+        Schritte arbeiten nur noch mit diesem Schlüssel. Mit fast_path
+        kommt der Schlüssel direkt aus den Rohdaten (siehe flow_key.py).
+        Mit offload geht die Firewall-Prüfung eines IP-Pakets an die Worker,
+        der Rest läuft, sobald die Entscheidung zurück ist.
+        
         Args:
             event: OpenFlow PacketIn-Event
         """
-        packet = event.parsed
-
-        if not packet.parsed:
+        key = flow_key_from_event(event, self.fast_path)
+        if key is None:
             log.warning("Unverständliches Paket - wird verworfen")
             return
-
-        eth = packet.find('ethernet')
-        if not eth:
-            log.warning("Kein Ethernet-Frame gefunden - wird verworfen")
+        if self.admission is not None and not self._admit(key):
             return
-            
-        src_mac = eth.src
-        dst_mac = eth.dst
-        in_port = event.port
+        in_port = key.in_port
 
         # --- Sektion A: MAC-Adresse lernen ---
-        self._learn_mac_address(src_mac, in_port)
+        self._learn_mac_address(key.eth_src, in_port)
 
         # --- Sektion B: Paket-Typ bestimmen und verarbeiten ---
-        if packet.find('arp'):
-            self._handle_arp_packet(packet, src_mac, dst_mac, in_port, event)
-        elif packet.find('ipv4'):
-            self._handle_ip_packet(packet, src_mac, dst_mac, in_port, event)
+        if key.is_arp and key.ip_src is not None:
+            self._handle_arp_packet(key, event)
+        elif key.is_ip and self.offload is not None:
+            self.offload.submit(key, (key.ip_src, key.ip_dst, key.proto, key.dport),
+                                lambda decision: self._handle_ip_packet(key, event, decision))
+        elif key.is_ip:
+            self._handle_ip_packet(key, event)
         else:
             # Unbekanntes Protokoll → Flood
-            log.debug("Unbekanntes Protokoll - Flood")
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("Unbekanntes Protokoll - Flood")
             self._flood_packet(event, in_port)
 
-    def _learn_mac_address(self, src_mac, in_port):
+    def _admission_source(self, key):
+        """
+        Quelle eines PacketIns für den Token-Bucket
+        
+        Quelle ist die IP-Adresse (IP und ARP), sonst die MAC-Adresse.
+        
+        Args:
+            key: FlowKey des Pakets
+            
+        Returns:
+            tuple: (Quelle, Bezeichnung für das Log, Felder für quarantine_flows)
+        """
+        if key.ip_src is not None:
+            return key.ip_src, key.src_ip, {'ip_src': key.ip_src}
+        return SwitchBase._admission_source(self, key)
+
+    def _counters(self):
         """
-        Lernt die Zuordnung von MAC-Adresse zu Port
+        Sammelt die Zähler der Komponenten, zusätzlich ARP-Proxy und Offload
+        
+        Returns:
+            list: (Name, stats()-Dictionary)
+        """
+        counters = SwitchBase._counters(self)
+        counters.append(("ARP-Proxy", self.arp_replies.stats()))
+        if self.offload is not None:
+            counters.append(("Offload", self.offload.stats()))
+        return counters
+
+    def _handle_ConnectionDown(self, event):
+        """
+        Beendet die Timer und meldet den Switch bei den übrigen ab
+        """
+        SwitchBase._handle_ConnectionDown(self, event)
+        if self.peers.get(self.connection.dpid) is self:
+            del self.peers[self.connection.dpid]
+
+    def apply_policy(self, acl, diff):
+        """
+        Gleicht die Flow-Tabelle nach einem Regelwechsel ab
+        
+        Geprüft werden nur die verbuchten Flows, deren Match den geänderten
+        Header-Raum überschneidet (siehe policy_reload.py). Verbietet die
+        neue ACL einen Flow vollständig, ersetzt ein Drop-Flow mit gleichem
+        Match und gleicher Priorität den Eintrag (OFPFC_ADD); in allen
+        anderen Fällen wird er per OFPFC_DELETE_STRICT gelöscht und das
+        nächste Paket neu entschieden. Quarantäne-Flows bleiben bestehen.
         
         Args:
-            src_mac: Quell-MAC-Adresse
-            in_port: Eingangsport
+            acl: Neue ACL (bei gemeinsamem CachedACL bereits ausgetauscht)
+            diff: PolicyDiff zwischen alter und neuer ACL
+            
+        Returns:
+            tuple: (gelöschte, durch Drop-Flows ersetzte Einträge)
         """
-        self.mac_to_port[src_mac] = in_port
-        log.debug("MAC-Adresse gelernt: %s → Port %s", src_mac, in_port)
+        self.acl = acl
+        if self.proactive is not None:
+            self.proactive.acl = acl
+            self.proactive.reload_policy()
+        deleted = replaced = 0
+        for entry in self.flow_table:
+            if entry.priority == QUARANTINE_PRIORITY:
+                continue
+            region = region_from_match(entry.match)
+            if region is None or not diff.changed(region):
+                continue
+            if uniform_action(diff.new, region) == DENY:
+                msg = drop_flow(entry.match)
+                msg.priority = entry.priority
+                self._track_flow_mod(msg)
+                replaced += 1
+            else:
+                msg = delete_flow(entry.match, entry.priority)
+                self.flow_table.removed(entry.match, entry.priority)
+                deleted += 1
+            if self.flow_registry is not None:
+                self.flow_registry.removed(entry.match, entry.priority)
+            self.sender.send(msg)
+        log.info("Regeln neu geladen auf %s: %d Flows gelöscht, %d durch Drop-Flows ersetzt, "
+                 "%d unverändert", self.connection, deleted, replaced,
+                 len(self.flow_table) - replaced)
+        return deleted, replaced
 
-    def _handle_arp_packet(self, packet, src_mac, dst_mac, in_port, event):
+    def _handle_arp_packet(self, key, event):
         """
         Verarbeitet ARP-Pakete (Request und Reply)
         
         Args:
-            packet: ARP-Paket
-            src_mac: Quell-MAC-Adresse
-            dst_mac: Ziel-MAC-Adresse
-            in_port: Eingangsport
+            key: FlowKey des Pakets (ip_src/ip_dst = protosrc/protodst, proto = Opcode)
             event: OpenFlow-Event
         """
-        arp_packet = packet.find('arp')
+        arp_packet = event.parsed.find('arp')
+        src_mac = key.eth_src
         
-        if arp_packet.protosrc:  # IP-Adresse vorhanden
-            # MAC-IP-Zuordnung lernen
-            self.ip_to_mac[arp_packet.protosrc] = src_mac
-            self.mac_to_ip[src_mac] = arp_packet.protosrc
-            log.debug("ARP: IP %s → MAC %s gelernt", arp_packet.protosrc, src_mac)
+        if key.ip_src:  # IP-Adresse vorhanden
+            # MAC-IP-Zuordnung und Standort für alle Switches lernen
+            if (self.hosts.learn_host(key.ip_src, src_mac, self.connection.dpid, key.in_port)
+                    and log.isEnabledFor(logging.DEBUG)):
+                log.debug("ARP: IP %s → MAC %s gelernt", arp_packet.protosrc, src_mac)
+            if self.proactive and arp_packet.protosrc not in self.gateway_ips:
+                # Host bekannt → Routen proaktiv installieren
+                self.proactive.host_learned(key.ip_src, src_mac, key.in_port)
 
-        if arp_packet.opcode == arp.REQUEST:
+        if key.proto == arp.REQUEST:
             # ARP-Request verarbeiten
-            self._handle_arp_request(arp_packet, src_mac, in_port, event)
-        elif arp_packet.opcode == arp.REPLY:
+            self._handle_arp_request(arp_packet, key, event)
+        elif key.proto == arp.REPLY:
             # ARP-Reply verarbeiten
-            self._handle_arp_reply(arp_packet, event)
+            self._handle_arp_reply(arp_packet, key, event)
 
-    def _handle_arp_request(self, arp_packet, src_mac, in_port, event):
+    def _handle_arp_request(self, arp_packet, key, event):
         """
-        Verarbeitet ARP-Requests
+        Verarbeitet ARP-Requests (ARP-Proxy)
+        
+        Gateways und alle Hosts mit bekanntem Standort beantwortet der
+        Controller selbst. Für unbekannte Ziele wartet der Requester wie ein
+        zurückgehaltenes IP-Paket auf die Auflösung; pro Ziel-IP geht nur ein
+        ARP-Request (vom Gateway) hinaus statt jeden Request zu fluten.
         
         Args:
             arp_packet: ARP-Paket
-            src_mac: Quell-MAC-Adresse
-            in_port: Eingangsport
+            key: FlowKey des Pakets
             event: OpenFlow-Event
         """
         target_ip = arp_packet.protodst
+        src_mac = key.eth_src
+        in_port = key.in_port
         
         # Prüfe, ob die Ziel-IP eine Gateway-IP ist
         if target_ip in self.gateway_ips:
             gw_mac = self.gateway_ips[target_ip]
             self._send_arp_reply(target_ip, gw_mac, arp_packet.protosrc, src_mac, in_port)
-            log.info("ARP: Gateway-Reply für %s → %s", target_ip, gw_mac)
+            self.log_stats.count("ARP: %d Gateway-Replies gesendet")
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("ARP: Gateway-Reply für %s → %s", target_ip, gw_mac)
             return
 
-        if target_ip in self.ip_to_mac:
+        if key.ip_src == key.ip_dst:
+            # Gratuitous ARP: Absender ist schon gelernt, niemand wartet auf eine Antwort
+            self.log_stats.count("ARP: %d Gratuitous ARPs verarbeitet")
+            return
+
+        location = self.hosts.locate(key.ip_dst)
+        target_mac = location.mac if location is not None else self._get_destination_mac(key.ip_dst)
+        if target_mac is not None:
             # Ziel-IP bekannt → ARP-Reply senden
-            target_mac = self.ip_to_mac[target_ip]
             self._send_arp_reply(target_ip, target_mac, arp_packet.protosrc, src_mac, in_port)
-            log.info("ARP: Reply für %s → %s", target_ip, target_mac)
-        else:
-            # Ziel-IP unbekannt → Request weiterleiten
-            log.info("ARP: Request für unbekannte IP %s - Flood", target_ip)
-            self._flood_packet(event, in_port)
+            self.log_stats.count("ARP: %d Replies als ARP-Proxy gesendet")
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("ARP: Reply für %s → %s", target_ip, target_mac)
+        elif self.arp_requests.add(key.ip_dst, (key, event)):
+            # Ziel-IP unbekannt → eigener Request, der Requester bekommt den Reply danach
+            self.log_stats.count("ARP: %d Requests für unbekannte IPs aufgelöst")
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("ARP: Request für unbekannte IP %s - eigener ARP-Request", target_ip)
+            self._send_arp_request(target_ip, in_port)
 
-    def _handle_arp_reply(self, arp_packet, event):
+    def _handle_arp_reply(self, arp_packet, key, event):
         """
         Verarbeitet ARP-Replies
         
+        Antworten auf eigene ARP-Requests geben die zurückgehaltenen Pakete
+        frei; alle anderen Replies werden an den Requester weitergeleitet.
+        
         Args:
             arp_packet: ARP-Paket
+            key: FlowKey des Pakets
             event: OpenFlow-Event
         """
+        if key.ip_src in self.arp_requests:
+            self._flush_pending(key.ip_src)
+            return
+        if arp_packet.protodst in self.gateway_ips:
+            return  # Reply an ein Gateway, keine Pakete mehr ausstehend
+
         # ARP-Reply an den ursprünglichen Requester weiterleiten
-        requester_mac = arp_packet.protodst
+        requester_mac = arp_packet.hwdst
         if requester_mac in self.mac_to_port:
             out_port = self.mac_to_port[requester_mac]
-            self._install_flow_and_forward(event.parsed, event.port, out_port, event,
-                set_src_mac=self.gateway_ips[event.parsed.find('ipv4').dstip],
-                set_dst_mac=requester_mac)
-            log.info("ARP: Reply weitergeleitet an %s über Port %s", requester_mac, out_port)
+            msg = of.ofp_packet_out()
+            self.buffers.attach(msg, event.ofp)
+            msg.actions.append(of.ofp_action_output(port=out_port))
+            msg.in_port = event.port
+            self.sender.send(msg)
+            self.log_stats.count("ARP: %d Replies weitergeleitet")
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("ARP: Reply weitergeleitet an %s über Port %s", requester_mac, out_port)
         else:
             log.warning("ARP: Reply für unbekannte MAC %s - Flood", requester_mac)
             self._flood_packet(event, event.port)
 
+    def _flush_pending(self, ip):
+        """
+        Leitet die Pakete weiter, die auf die ARP-Auflösung von ip gewartet haben
+        
+        Pro Flow wird nur einmal ein Flow-Eintrag installiert; weitere
+        zurückgehaltene Pakete desselben Flows (gleicher FlowKey) gehen als
+        PacketOut hinaus.
+        
+        Args:
+            ip: Aufgelöste IP-Adresse (Integer)
+        """
+        pending = self.arp_requests.pop(ip)
+        dst_mac = self._get_destination_mac(ip)
+        if dst_mac:
+            # Wartende ARP-Requests (ARP-Proxy) beantworten
+            requests = [item for item in pending if item[0].is_arp]
+            for key, event in requests:
+                self._send_arp_reply(ip, dst_mac, key.ip_src, key.eth_src, key.in_port)
+            if requests:
+                pending = [item for item in pending if not item[0].is_arp]
+                if not pending:
+                    return
+        if dst_mac and pending and self._route_path(pending[0][0], pending[0][1], dst_mac):
+            # Host hängt an einem anderen Switch: Pfad steht, Rest wie neue PacketIns
+            for key, event in pending[1:]:
+                self._route_ip_packet(key, event)
+            return
+        out_port = self._get_output_port(dst_mac, ip) if dst_mac else None
+        if out_port is None:
+            if dst_mac and self.hosts.locate(ip) is not None:
+                # Von einem anderen Switch gelernt: Port hier unbekannt
+                for key, event in pending:
+                    self._flood_routed(key, event, dst_mac)
+                return
+            log.warning("ARP: Kein Ausgangsport für %s - %d Pakete verworfen",
+                        IPAddr(ip), len(pending))
+            return
+
+        installed = set()
+        for key, event in pending:
+            set_src_mac, set_dst_mac = self._mac_rewrite(key.ip_src, ip, dst_mac)
+            if key not in installed:
+                installed.add(key)
+                self._install_flow_and_forward(key, out_port, event,
+                    set_src_mac=set_src_mac, set_dst_mac=set_dst_mac)
+            else:
+                msg = of.ofp_packet_out(in_port=key.in_port)
+                self.buffers.attach(msg, event.ofp)
+                msg.actions.extend(self._forward_actions(out_port, set_src_mac, set_dst_mac))
+                self.sender.send(msg)
+        self.log_stats.count("ARP: %d Adressen aufgelöst, zurückgehaltene Pakete weitergeleitet")
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("ARP: %s aufgelöst - %d zurückgehaltene Pakete weitergeleitet (%d Flows)",
+                      IPAddr(ip), len(pending), len(installed))
+
+    def _host_learned(self, ip):
+        """
+        Callback der HostRegistry: gibt Pakete frei, die auf ip gewartet haben
+        
+        Args:
+            ip: Gelernte IP-Adresse (Integer), ggf. von einem anderen Switch
+        """
+        if ip in self.arp_requests:
+            self._flush_pending(ip)
+
     def _send_arp_reply(self, target_ip, target_mac, requester_ip, requester_mac, out_port):
         """
         Sendet ARP-Reply
         
+        Der Frame kommt aus einer vorgefertigten Vorlage pro Ziel-Adresse,
+        nur die Felder des Requesters werden eingesetzt (siehe arp_proxy.py).
+        
         Args:
             target_ip: IP-Adresse des Ziels
             target_mac: MAC-Adresse des Ziels
@@ -229,110 +576,89 @@ class Layer3SwitchWithFirewall(object):
             requester_mac: MAC-Adresse des Requesters
             out_port: Ausgangsport
         """
-        # ARP-Reply erstellen
-        arp_reply = arp()
-        arp_reply.hwsrc = target_mac
-        arp_reply.hwdst = requester_mac
-        arp_reply.protosrc = target_ip
-        arp_reply.protodst = requester_ip
-        arp_reply.opcode = arp.REPLY
-
-        # Ethernet-Frame erstellen
-        eth_frame = ethernet()
-        eth_frame.src = target_mac
-        eth_frame.dst = requester_mac
-        eth_frame.type = ethernet.ARP_TYPE
-        eth_frame.payload = arp_reply
-
-        # Paket senden
         msg = of.ofp_packet_out()
-        msg.data = eth_frame.pack()
+        msg.data = self.arp_replies.reply(target_ip, target_mac, requester_ip, requester_mac)
         msg.actions.append(of.ofp_action_output(port=out_port))
-        self.connection.send(msg)
+        self.sender.send(msg)
 
-    def _handle_ip_packet(self, packet, src_mac, dst_mac, in_port, event):
+    def _handle_ip_packet(self, key, event, decision=None):
         """
         Verarbeitet IP-Pakete (Routing + Firewall)
         
         Args:
-            packet: IP-Paket
-            src_mac: Quell-MAC-Adresse
-            dst_mac: Ziel-MAC-Adresse
-            in_port: Eingangsport
+            key: FlowKey des IP-Pakets
             event: OpenFlow-Event
+            decision: Policy-Entscheidung aus dem PolicyOffload
+                      (None = hier prüfen)
         """
-        ip_packet = packet.find('ipv4')
-        src_ip = ip_packet.srcip
-        dst_ip = ip_packet.dstip
-
         # --- Sektion A: Firewall-Prüfung ---
-        if self._is_packet_blocked(packet):
-            log.info("Firewall: IP-Paket blockiert von %s nach %s", src_ip, dst_ip)
-            # Drop-Flow installieren
-            msg = of.ofp_flow_mod()
-            msg.match = of.ofp_match.from_packet(packet, in_port)
-            msg.idle_timeout = 30  # oder länger, je nach Bedarf
-            msg.hard_timeout = 300
-            # Keine Actions = Drop!
-            self.connection.send(msg)
+        blocked = decision.blocked if decision is not None else self._is_packet_blocked(key)
+        if blocked:
+            # Drop-Flow installieren (Keine Actions = Drop!)
+            self._install_drop_flow(key, decision)
             return
 
         # --- Sektion B: Routing-Entscheidung ---
+        dst_mac = key.eth_dst
         if dst_mac.is_multicast or dst_mac.is_broadcast:
             # Broadcast/Multicast → Flood
-            log.info("IP: Broadcast/Multicast - Flood")
-            self._flood_packet(event, in_port)
+            self.log_stats.count("IP: %d Broadcast-/Multicast-Pakete geflutet")
+            self._flood_packet(event, key.in_port)
         else:
             # Unicast → Routing
-            self._route_ip_packet(packet, src_ip, dst_ip, in_port, event)
+            self._route_ip_packet(key, event, decision)
 
-    def _is_packet_blocked(self, packet):
+    def _install_drop_flow(self, key, decision=None):
         """
-        Firewall-Logik: Prüft ob ein IP-Paket blockiert werden soll
+        Installiert einen Drop-Flow für ein blockiertes IP-Paket
+        
+        Der Match wird so weit gefasst, wie es die auslösende Regel erlaubt:
+        Felder, die die Regel nicht prüft (z.B. der Quellport), bleiben
+        Wildcards, und gilt die Regel für ein ganzes Subnetz, wird das Subnetz
+        übernommen. So landen weitere Pakete eines Scans nicht erneut beim
+        Controller.
         
         Args:
-            packet: Zu prüfendes IP-Paket
-            
-        Returns:
-            bool: True wenn Paket blockiert werden soll
+            key: FlowKey des blockierten IP-Pakets
+            decision: Policy-Entscheidung mit Regel und Region (None = hier bestimmen)
         """
-        ip_packet = packet.find('ipv4')
-        src_ip = ip_packet.srcip
-        dst_ip = ip_packet.dstip
-        proto = ip_packet.protocol
-
-        # Ports extrahieren basierend auf Protokoll
-        dst_port = self._extract_dst_port(packet, proto)
-
-        # Firewall-Regeln anwenden
-        return self._is_blocked_by_acl(src_ip, dst_ip, proto, dst_port)
+        if decision is not None:
+            rule, region = decision.rule, decision.region
+        else:
+            rule = self.acl.lookup(key.ip_src, key.ip_dst, key.proto, key.dport)
+            region = self.acl.widest_region(rule, key.ip_src, key.ip_dst, key.proto, key.dport)
+        self.log_stats.count("Firewall: %d IP-Pakete blockiert durch %s",
+                             rule if rule is not None else "Standard-Regel")
+        if region is not None:
+            match = match_from_region(region)
+        else:
+            # Entscheidung lässt sich nicht weiter fassen → exakter Match
+            match = match_from_flow_key(key)
+        msg = drop_flow(match)
+        self._track_flow_mod(msg)
+        self.sender.send(msg)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Firewall: IP-Paket blockiert von %s nach %s, Drop-Flow: %s",
+                      key.src_ip, key.dst_ip, match)
 
-    def _extract_dst_port(self, packet, proto):
+    def _is_packet_blocked(self, key):
         """
-        Extrahiert den Zielport basierend auf dem Protokoll
+        Firewall-Logik: Prüft ob ein IP-Paket blockiert werden soll
         
         Args:
-            packet: IP-Paket
-            proto: Protokoll-ID
+            key: FlowKey des zu prüfenden IP-Pakets
             
         Returns:
-            int: Zielport oder None
-        """
-        if proto == ipv4.ICMP_PROTOCOL:
-            return None  # ICMP → keine Ports
-        elif proto == ipv4.TCP_PROTOCOL:
-            tcp_packet = packet.find('tcp')
-            return tcp_packet.dstport if tcp_packet else None
-        elif proto == ipv4.UDP_PROTOCOL:
-            udp_packet = packet.find('udp')
-            return udp_packet.dstport if udp_packet else None
-        return None
+            bool: True wenn Paket blockiert werden soll
+        """
+        # Ports sind im FlowKey bereits extrahiert (ICMP → None)
+        return self._is_blocked_by_acl(key.ip_src, key.ip_dst, key.proto, key.dport)
 
     def _is_blocked_by_acl(self, src, dst, proto, dport):
         """
         Statische ACL-Regeln für L3-Switch
         
-        Implementiert Firewall-Logik basierend auf:
+        Prüft das Paket gegen die kompilierte ACL basierend auf:
         - Quell-IP-Adresse/Subnetz
         - Ziel-IP-Adresse/Subnetz
         - Protokoll (TCP, UDP, ICMP)
@@ -347,71 +673,187 @@ class Layer3SwitchWithFirewall(object):
         Returns:
             bool: True wenn Paket blockiert werden soll
         """
-        # --- L3-Switch ACL-Regeln ---
-        # --------------------- Hier die Regeln einfügen ---------------------
-        
-        # Regel 1: HTTP-Zugriff (Port 80) zu DMZ-Server erlauben
-        if dst == IPAddr("10.2.1.100") and proto == ipv4.TCP_PROTOCOL and dport == 80:
-            log.debug("ACL: HTTP-Zugriff zu DMZ-Server erlaubt")
-            return False
-
-        # Regel 2: Gesamten Traffic aus externem Netz blockieren
-        if src.inNetwork("10.3.1.0/24"):
-            log.debug("ACL: Traffic aus externem Netz blockiert")
-            return True
-
-        # Regel 3: SSH von internem Netz zur DMZ blockieren
-        if src.inNetwork("10.1.1.0/24") and dst.inNetwork("10.2.1.0/24") and proto == ipv4.TCP_PROTOCOL and dport == 22:
-            log.debug("ACL: SSH von internem zu DMZ-Netz blockiert")
-            return True
+        # Regeln siehe ACL_RULES - Lookup in der vorkompilierten ACL
+        rule = self.acl.lookup(src, dst, proto, dport)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("ACL: %s", rule if rule is not None else "Standard-Regel")
+        return self.acl.action_for(rule) == DENY
 
-        # Standard: Paket erlauben
-        log.debug("ACL: Paket erlaubt (Standard-Regel)")
-        return False
-
-    def _route_ip_packet(self, packet, src_ip, dst_ip, in_port, event):
+    def _route_ip_packet(self, key, event, decision=None):
         """
         Führt IP-Routing durch
         
         Args:
-            packet: IP-Paket
-            src_ip: Quell-IP-Adresse
-            dst_ip: Ziel-IP-Adresse
-            in_port: Eingangsport
+            key: FlowKey des IP-Pakets
             event: OpenFlow-Event
+            decision: Policy-Entscheidung aus dem PolicyOffload (oder None)
         """
+        src_ip = key.ip_src
+        dst_ip = key.ip_dst
+        in_port = key.in_port
+
         # Ziel-MAC-Adresse ermitteln
         dst_mac = self._get_destination_mac(dst_ip)
         
+        if dst_mac and self._route_path(key, event, dst_mac, decision):
+            # Host hängt an einem anderen Switch: Flows auf dem ganzen Pfad installiert
+            return
         if dst_mac:
             # Ziel-MAC bekannt → direkt routen
             out_port = self._get_output_port(dst_mac, dst_ip)
             if out_port:
-                log.info("L3-Routing: %s → %s über Port %s", src_ip, dst_ip, out_port)
-                src_gw_mac = self._get_gateway_mac_for_ip(src_ip)
-                dst_gw_mac = self._get_gateway_mac_for_ip(dst_ip)
-                if src_gw_mac and dst_gw_mac and src_gw_mac != dst_gw_mac:
-                    # Routing zwischen Subnetzen: setze Source-MAC auf Gateway-MAC des Ziel-Subnetzes
-                    self._install_flow_and_forward(packet, in_port, out_port, event,
-                        set_src_mac=dst_gw_mac,
-                        set_dst_mac=dst_mac)
-                else:
-                    # Innerhalb eines Subnetzes: kein Source-MAC-Rewrite
-                    self._install_flow_and_forward(packet, in_port, out_port, event)
+                self.log_stats.count("L3-Routing: %d Pakete geroutet")
+                if log.isEnabledFor(logging.DEBUG):
+                    log.debug("L3-Routing: %s → %s über Port %s", key.src_ip, key.dst_ip, out_port)
+                set_src_mac, set_dst_mac = self._mac_rewrite(src_ip, dst_ip, dst_mac)
+                match = None
+                if set_src_mac is not None and self.subnet_flows:
+                    # Routing zwischen Subnetzen: ein Flow für das ganze Quell-Subnetz
+                    match = self._subnet_match(key, decision)
+                self._install_flow_and_forward(key, out_port, event,
+                    set_src_mac=set_src_mac, set_dst_mac=set_dst_mac, match=match)
+            elif self.hosts.locate(dst_ip) is not None:
+                # Host hängt an einem anderen Switch: ohne ARP mit MAC-Rewrite fluten
+                self.log_stats.count("L3-Routing: %d Pakete an Hosts anderer Switches geflutet")
+                self._flood_routed(key, event, dst_mac)
             else:
-                log.warning("L3-Routing: Kein Ausgangsport für %s gefunden", dst_ip)
+                log.warning("L3-Routing: Kein Ausgangsport für %s gefunden", key.dst_ip)
                 self._flood_packet(event, in_port)
         else:
-            # Ziel-MAC unbekannt → ARP-Request senden
-            log.info("L3-Routing: MAC für %s unbekannt - ARP-Request", dst_ip)
-            self._send_arp_request(dst_ip, in_port)
+            # Ziel-MAC unbekannt → Paket zurückhalten, ein ARP-Request pro Ziel-IP
+            if self.arp_requests.add(dst_ip, (key, event)):
+                self.log_stats.count("L3-Routing: %d ARP-Requests für unbekannte Ziele")
+                if log.isEnabledFor(logging.DEBUG):
+                    log.debug("L3-Routing: MAC für %s unbekannt - ARP-Request", key.dst_ip)
+                self._send_arp_request(key.dst_ip, in_port)
+            elif log.isEnabledFor(logging.DEBUG):
+                log.debug("L3-Routing: ARP-Request für %s läuft bereits - Paket zurückgehalten",
+                          key.dst_ip)
+
+    def _route_path(self, key, event, dst_mac, decision=None):
+        """
+        Installiert die Flows aller Switches auf dem Pfad zum Ziel-Host
+        
+        Die Switches hinter dem ersten bekommen ihre Flows zuerst (vom Ziel
+        rückwärts), damit das Paket, das der erste Switch weiterleitet, dort
+        keinen weiteren PacketIn auslöst. Ohne Topologie, mit unbekanntem
+        Standort oder ohne Pfad bleibt es beim Routing über diesen Switch.
+        
+        Args:
+            key: FlowKey des gerouteten IP-Pakets
+            event: OpenFlow-Event
+            dst_mac: MAC-Adresse des Ziel-Hosts
+            decision: Policy-Entscheidung aus dem PolicyOffload (oder None)
+            
+        Returns:
+            bool: True, wenn der Pfad installiert wurde
+        """
+        if self.topology is None:
+            return False
+        location = self.hosts.locate(key.ip_dst)
+        dpid = self.connection.dpid
+        if location is None or location.dpid == dpid:
+            return False
+        hops = self.topology.route(dpid, location.dpid, location.port)
+        if hops is None or any(hop not in self.peers for hop, _ in hops[1:]):
+            return False
+
+        set_src_mac, set_dst_mac = self._mac_rewrite(key.ip_src, key.ip_dst, dst_mac)
+        match = None
+        if set_src_mac is not None and self.subnet_flows:
+            match = self._subnet_match(key, decision)
+        downstream = transit_match(match if match is not None else match_from_flow_key(key))
+        for hop, out_port in reversed(hops[1:]):
+            self.peers[hop]._install_transit_flow(downstream, out_port, set_src_mac, set_dst_mac)
+        self._install_flow_and_forward(key, hops[0][1], event,
+            set_src_mac=set_src_mac, set_dst_mac=set_dst_mac, match=match)
+        self.log_stats.count("L3-Routing: %d Pfade über mehrere Switches installiert")
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("L3-Routing: %s → %s über %s", key.src_ip, key.dst_ip,
+                      " → ".join("%s:%s" % hop for hop in hops))
+        return True
+
+    def _install_transit_flow(self, match, out_port, set_src_mac=None, set_dst_mac=None):
+        """
+        Installiert einen Flow für einen Pfad, den ein anderer Switch berechnet hat
+        
+        Args:
+            match: Match ohne Eingangsport und MAC-Adressen (transit_match)
+            out_port: Ausgangsport an diesem Switch
+            set_src_mac: Quell-MAC-Adresse für Source-MAC-Rewrite
+            set_dst_mac: Ziel-MAC-Adresse für Destination-MAC-Rewrite
+        """
+        msg = of.ofp_flow_mod(match=match, idle_timeout=30, hard_timeout=300)
+        msg.actions.extend(self._forward_actions(out_port, set_src_mac, set_dst_mac))
+        msg.flags |= of.OFPFF_SEND_FLOW_REM
+        if self.flow_registry is not None and self.flow_registry.is_duplicate(msg):
+            return
+        self._track_flow_mod(msg)
+        self.sender.send(msg)
+
+    def _subnet_match(self, key, decision=None):
+        """
+        Match für alle erlaubten Pakete aus dem Quell-Subnetz an den Ziel-Host
+        
+        Grundlage ist die größte Region um das Paket, in der die ACL gleich
+        entscheidet (wie beim Drop-Flow). Sie wird auf das Quell-Subnetz und
+        den Ziel-Host eingeschränkt: Die Actions (MAC-Rewrite auf Gateway und
+        Host, Ausgangsport) gelten für jeden Quell-Host dieses Subnetzes.
+        Unterscheidet die Policy die Quell-Hosts, bleibt die Region auf den
+        Quell-Host beschränkt; Quellports sind immer Wildcards.
+        
+        Args:
+            key: FlowKey des gerouteten IP-Pakets
+            decision: Policy-Entscheidung, deren Region bereits eingeschränkt
+                      ist (None = hier bestimmen)
+            
+        Returns:
+            ofp_match: Match mit Präfixen oder None (dann exakter Match)
+        """
+        if decision is not None:
+            if decision.region is None:
+                return None
+            self.log_stats.count("L3-Routing: %d Flows pro Quell-Subnetz installiert")
+            return match_from_region(decision.region)
+        src_route = self.routing_table.lookup(key.ip_src)
+        if src_route is None:
+            return None
+        rule = self.acl.lookup(key.ip_src, key.ip_dst, key.proto, key.dport)
+        region = self.acl.widest_region(rule, key.ip_src, key.ip_dst, key.proto, key.dport)
+        if region is None:
+            return None
+        region = restrict_region(region, src=src_route.prefix, dst=(key.ip_dst, 32))
+        if region is None:
+            return None
+        self.log_stats.count("L3-Routing: %d Flows pro Quell-Subnetz installiert")
+        return match_from_region(region)
+
+    def _mac_rewrite(self, src_ip, dst_ip, dst_mac):
+        """
+        Bestimmt die MAC-Rewrites für ein geroutetes Paket
+        
+        Args:
+            src_ip: Quell-IP-Adresse (IPAddr oder Integer)
+            dst_ip: Ziel-IP-Adresse (IPAddr oder Integer)
+            dst_mac: MAC-Adresse des Ziels
+            
+        Returns:
+            tuple: (neue Source-MAC, neue Ziel-MAC) - jeweils None = unverändert
+        """
+        src_gw_mac = self._get_gateway_mac_for_ip(src_ip)
+        dst_gw_mac = self._get_gateway_mac_for_ip(dst_ip)
+        if src_gw_mac and dst_gw_mac and src_gw_mac != dst_gw_mac:
+            # Routing zwischen Subnetzen: setze Source-MAC auf Gateway-MAC des Ziel-Subnetzes
+            return dst_gw_mac, dst_mac
+        # Innerhalb eines Subnetzes: kein Source-MAC-Rewrite
+        return None, None
 
     def _get_destination_mac(self, dst_ip):
         """
         Ermittelt die MAC-Adresse für eine IP-Adresse
         
         Args:
-            dst_ip: Ziel-IP-Adresse
+            dst_ip: Ziel-IP-Adresse (Integer)
             
         Returns:
             EthAddr: MAC-Adresse oder None
@@ -426,7 +868,7 @@ class Layer3SwitchWithFirewall(object):
         
         Args:
             dst_mac: Ziel-MAC-Adresse
-            dst_ip: Ziel-IP-Adresse
+            dst_ip: Ziel-IP-Adresse (Integer)
             
         Returns:
             int: Ausgangsport oder None
@@ -443,93 +885,322 @@ class Layer3SwitchWithFirewall(object):
         
         return None
 
-    def _send_arp_request(self, target_ip, out_port):
+    def _send_arp_request(self, target_ip, in_port):
         """
         Sendet ARP-Request für eine IP-Adresse
         
+        Der Request kommt vom Gateway des Ziel-Subnetzes, damit der Reply an
+        die Gateway-MAC geht und beim Controller landet. Ohne Gateway wird
+        ein ARP-Probe (Quell-IP 0.0.0.0) gesendet.
+        
         Args:
             target_ip: Ziel-IP-Adresse
-            out_port: Ausgangsport
+            in_port: Eingangsport des auslösenden Pakets (wird beim Flood ausgeschlossen)
         """
+        route = self.routing_table.lookup(target_ip)
+        if route is not None and route.gateway_mac is not None:
+            src_mac = route.gateway_mac
+            src_ip = route.gateway_ip
+        else:
+            src_mac = EthAddr("00:00:00:00:00:01")  # Switch-MAC
+            src_ip = IPAddr("0.0.0.0")  # Unbekannte Quell-IP
+
         # ARP-Request erstellen
         arp_req = arp()
-        arp_req.hwsrc = EthAddr("00:00:00:00:00:01")  # Switch-MAC
+        arp_req.hwsrc = src_mac
         arp_req.hwdst = EthAddr("ff:ff:ff:ff:ff:ff")  # Broadcast
-        arp_req.protosrc = IPAddr("0.0.0.0")  # Unbekannte Quell-IP
+        arp_req.protosrc = src_ip
         arp_req.protodst = target_ip
         arp_req.opcode = arp.REQUEST
 
         # Ethernet-Frame erstellen
         eth_frame = ethernet()
-        eth_frame.src = EthAddr("00:00:00:00:00:01")
+        eth_frame.src = src_mac
         eth_frame.dst = EthAddr("ff:ff:ff:ff:ff:ff")
         eth_frame.type = ethernet.ARP_TYPE
         eth_frame.payload = arp_req
 
-        # Paket senden
+        # Paket an alle Ports außer dem Eingangsport senden
         msg = of.ofp_packet_out()
         msg.data = eth_frame.pack()
-        msg.actions.append(of.ofp_action_output(port=out_port))
-        self.connection.send(msg)
+        msg.actions.append(of.ofp_action_output(port=of.OFPP_FLOOD))
+        msg.in_port = in_port
+        self.sender.send(msg)
         
-        log.debug("ARP-Request gesendet für %s über Port %s", target_ip, out_port)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("ARP-Request gesendet für %s (von %s)", target_ip, src_ip)
 
-    def _install_flow_and_forward(self, packet, in_port, out_port, event, set_src_mac=None, set_dst_mac=None):
+    def _install_flow_and_forward(self, key, out_port, event, set_src_mac=None, set_dst_mac=None,
+                                  match=None):
         """
         Installiert Flow-Regel und leitet Paket weiter
         
         Args:
-            packet: Zu verarbeitendes Paket
-            in_port: Eingangsport
+            key: FlowKey des zu verarbeitenden Pakets
             out_port: Ausgangsport
             event: OpenFlow-Event
             set_src_mac: Quell-MAC-Adresse für Source-MAC-Rewrite
             set_dst_mac: Ziel-MAC-Adresse für Destination-MAC-Rewrite
+            match: Match des Flows (Standard: exakter Match des Pakets)
         """
         msg = of.ofp_flow_mod()
-        msg.match = of.ofp_match.from_packet(packet, in_port)
+        msg.match = match if match is not None else match_from_flow_key(key)
         msg.idle_timeout = 30
         msg.hard_timeout = 300
+        msg.actions.extend(self._forward_actions(out_port, set_src_mac, set_dst_mac))
+        self.buffers.attach(msg, event.ofp)  # sendet auch gleich das aktuelle Paket
+        if self._is_duplicate_flow(msg):
+            msg = packet_out_from_flow_mod(msg, key.in_port)
+        else:
+            self._track_flow_mod(msg)
+        self.sender.send(msg)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Flow installiert: %s -> %s", key.in_port, out_port)
+
+    @staticmethod
+    def _forward_actions(out_port, set_src_mac=None, set_dst_mac=None):
+        """
+        Baut die Actions für ein weitergeleitetes Paket (optional mit MAC-Rewrite)
+        """
+        actions = []
         if set_src_mac:
-            msg.actions.append(ofp_action_dl_addr(type=OFPAT_SET_DL_SRC, dl_addr=set_src_mac))
+            actions.append(ofp_action_dl_addr(type=OFPAT_SET_DL_SRC, dl_addr=set_src_mac))
         if set_dst_mac:
-            msg.actions.append(ofp_action_dl_addr(type=OFPAT_SET_DL_DST, dl_addr=set_dst_mac))
-        msg.actions.append(of.ofp_action_output(port=out_port))
-        msg.data = event.ofp
-        self.connection.send(msg)
-        log.debug("Flow installiert: %s -> %s", in_port, out_port)
+            actions.append(ofp_action_dl_addr(type=OFPAT_SET_DL_DST, dl_addr=set_dst_mac))
+        actions.append(of.ofp_action_output(port=out_port))
+        return actions
 
-    def _flood_packet(self, event, in_port):
+    def _flood_routed(self, key, event, dst_mac):
         """
-        Leitet Paket an alle Ports weiter (Flood)
+        Flutet ein geroutetes Paket mit MAC-Rewrite (ohne Flow-Eintrag)
+        
+        Für Ziel-Hosts, die ein anderer Switch gelernt hat: Die MAC ist
+        bekannt, der Port zum Ziel an diesem Switch aber nicht.
         
         Args:
+            key: FlowKey des Pakets
             event: OpenFlow-Event
-            in_port: Eingangsport (wird ausgeschlossen)
+            dst_mac: MAC-Adresse des Ziel-Hosts
         """
-        msg = of.ofp_packet_out(data=event.ofp)
-        msg.actions.append(of.ofp_action_output(port=of.OFPP_FLOOD))
-        msg.in_port = in_port
-        self.connection.send(msg)
-        log.debug("Paket geflutet von Port %s", in_port)
+        set_src_mac, set_dst_mac = self._mac_rewrite(key.ip_src, key.ip_dst, dst_mac)
+        msg = of.ofp_packet_out(in_port=key.in_port)
+        self.buffers.attach(msg, event.ofp)
+        msg.actions.extend(self._forward_actions(of.OFPP_FLOOD, set_src_mac, set_dst_mac))
+        self.sender.send(msg)
 
     def _get_gateway_mac_for_ip(self, ip):
-        # Finde das passende Gateway für das Subnetz der Ziel-IP
-        for gw_ip in self.gateway_ips:
-            # Beispiel: 10.1.1.254 → 10.1.1.0/24
-            subnet = str(gw_ip).rsplit('.', 1)[0] + '.0/24'
-            if ip.inNetwork(subnet):
-                return self.gateway_ips[gw_ip]
-        return None
+        """
+        Ermittelt die Gateway-MAC für das Subnetz einer IP (Longest-Prefix-Match)
+        
+        Args:
+            ip: IP-Adresse (IPAddr oder Integer)
+            
+        Returns:
+            EthAddr: Gateway-MAC oder None
+        """
+        route = self.routing_table.lookup(ip)
+        return route.gateway_mac if route is not None else None
 
-def launch():
+def _flag_or_number(value, default):
+    """
+    Wertet eine Option aus, die Schalter oder Zahl sein kann
+    
+    Args:
+        value: True (Option allein), "True"/"False" oder Zahl als Text
+        default: Wert der eingeschalteten Option ohne Zahl
+        
+    Returns:
+        float: Angegebene Zahl, default oder 0 (ausgeschaltet)
+    """
+    if not isinstance(value, bool):
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    return default if str_to_bool(value) else 0
+
+def launch(policy=None, acl_cache_size=4096, proactive=False,
+           host_table_size=HOST_TABLE_SIZE, host_max_age=HOST_MAX_AGE,
+           aging_interval=AGING_INTERVAL, async_log=True, fast_path=False,
+           batch=False, dedup_window=DEDUP_WINDOW,
+           flow_table_size=FLOW_TABLE_SIZE, stats_interval=STATS_INTERVAL, elephants=False,
+           elephant_rate=ELEPHANT_RATE, elephant_top_k=ELEPHANT_TOP_K, stats_trace=None,
+           subnet_flows=True, topology=False, gateway_arp=True, admission=False,
+           port_rate=PORT_RATE, source_rate=SOURCE_RATE, quarantine_time=QUARANTINE_TIME,
+           offload=0, processes=False, watch_policy=False):
     """
     Startet den Layer 3 Switch mit Firewall
     
     Registriert einen Event-Listener für neue OpenFlow-Verbindungen
+    
+    Args:
+        policy: Optionaler Pfad zu einer JSON-Regeldatei
+                (z.B. --policy=deepdive/enterprise_policy.json).
+                Ohne Angabe werden die ACL_RULES verwendet.
+        acl_cache_size: Größe des ACL-Entscheidungs-Caches (0 = kein Cache)
+        proactive: ACL und Routen beim ConnectionUp vorab installieren
+                   (--proactive); PacketIns bleiben Fallback für unbekannte Hosts
+        host_table_size: Maximale Anzahl Einträge pro Lerntabelle (gemeinsam für alle Switches)
+        host_max_age: Sekunden bis ein gelernter Eintrag verfällt
+        aging_interval: Sekunden zwischen zwei Aufräum-Durchläufen (0 = kein Timer)
+        async_log: Log-Ausgabe in einen Hintergrund-Thread verlagern
+                   (--async_log=False schaltet das ab)
+        fast_path: PacketIns ohne vollständigen POX-Parser klassifizieren
+                   (--fast_path)
+        batch: Flow-Mods und PacketOuts pro Event-Burst in einem Socket-Write
+               senden (--batch)
+        dedup_window: Sekunden, in denen ein identischer Flow-Mod nur als
+                      PacketOut gesendet wird (--dedup_window=0 schaltet das ab)
+        flow_table_size: Angenommene Größe der Flow-Tabelle pro Switch; nahe der
+                         Grenze werden Timeouts verkürzt und Einträge verdrängt
+        stats_interval: Sekunden zwischen zwei Flow-Statistik-Abfragen (0 = keine)
+        elephants: Elephant-Flows aus der Flow-Statistik erkennen (--elephants);
+                   Elephants bekommen längere Timeouts, Mice werden zu
+                   Wildcard-Flows zusammengefasst
+        elephant_rate: Bytes/s, ab denen ein Flow ein Elephant ist
+        elephant_top_k: Zusätzlich die k Flows mit der höchsten Rate pro Switch
+        stats_trace: Datei, in die jede Flow-Statistik als JSON-Zeile geschrieben
+                     wird (Auswertung offline mit python -m deepdive.elephant)
+        subnet_flows: Geroutete Pakete über einen Flow pro Quell-Subnetz und
+                      Ziel-Host weiterleiten, wo die ACL das erlaubt
+                      (--subnet_flows=False: ein exakter Flow pro Verbindung)
+        topology: Topologie aus den LinkEvents von openflow.discovery aufbauen
+                  (--topology, openflow.discovery muss mitgestartet werden) und
+                  geroutete Pakete mit Flows auf dem ganzen Pfad weiterleiten
+        gateway_arp: Im proaktiven Modus ARP-Requests an die Gateways per Flow
+                     im Switch beantworten (Nicira-Actions, nur Open vSwitch;
+                     --gateway_arp=False für andere Switches)
+        admission: PacketIns per Token-Bucket pro Port und Quelle begrenzen
+                   (--admission); Quellen bzw. Ports über dem Budget werden
+                   per Drop-Flow gesperrt
+        port_rate: PacketIns/s pro Switch-Port (Burst: doppelte Rate)
+        source_rate: PacketIns/s pro Quell-IP bzw. -MAC (Burst: doppelte Rate)
+        quarantine_time: Sekunden, die eine Sperre im Switch bleibt
+        offload: Anzahl Worker für die Policy-Entscheidung von IP-Paketen
+                 (--offload=4, --offload allein: OFFLOAD_WORKERS; 0 oder False
+                 = in der Event-Schleife, siehe offload.py)
+        processes: Prozesse statt Threads als Worker (--processes)
+        watch_policy: Regeldatei alle n Sekunden auf Änderungen prüfen und im
+                      Betrieb neu laden (--watch_policy=2; --watch_policy allein:
+                      WATCH_INTERVAL; 0 oder False = aus). Unabhängig davon lädt SIGHUP die
+                      Regeldatei neu (kill -HUP). Nur geänderte Flows werden
+                      gelöscht bzw. ersetzt (siehe policy_reload.py)
     """
+    proactive = str_to_bool(proactive)
+    if str_to_bool(async_log):
+        # Erst nach dem Start aller Komponenten, damit z.B. samples.pretty_log
+        # die Log-Handler schon eingerichtet hat
+        core.addListenerByName("UpEvent", lambda event: enable_async_logging())
+    # Ein Satz Lerntabellen für alle Switches
+    registry = HostRegistry(int(host_table_size), float(host_max_age))
+    # Alle verbundenen Switches (Pfad-Flows und Regelwechsel)
+    peers = {}
+    switch_options = dict(registry=registry,
+                          peers=peers,
+                          aging_interval=float(aging_interval),
+                          fast_path=str_to_bool(fast_path),
+                          batch=str_to_bool(batch),
+                          dedup_window=float(dedup_window),
+                          flow_table_size=int(flow_table_size),
+                          stats_interval=float(stats_interval),
+                          elephants=str_to_bool(elephants),
+                          elephant_rate=float(elephant_rate),
+                          elephant_top_k=int(elephant_top_k),
+                          subnet_flows=str_to_bool(subnet_flows),
+                          gateway_arp=str_to_bool(gateway_arp))
+    if str_to_bool(admission):
+        switch_options['admission'] = AdmissionControl(float(port_rate), None,
+                                                       float(source_rate), None,
+                                                       float(quarantine_time))
+    if str_to_bool(topology):
+        graph = Topology()
+        registry.topology = graph
+        switch_options['topology'] = graph
+
+        def link_changed(event):
+            link = event.link
+            if event.added:
+                changed = graph.link_up(link.dpid1, link.port1, link.dpid2, link.port2)
+            else:
+                changed = graph.link_down(link.dpid1, link.port1, link.dpid2, link.port2)
+            if changed:
+                log.info("Topologie: Link %s:%s → %s:%s %s, %s", link.dpid1, link.port1,
+                         link.dpid2, link.port2, "aktiv" if event.added else "ausgefallen",
+                         graph.stats())
+
+        core.call_when_ready(lambda: core.openflow_discovery.addListenerByName(
+            "LinkEvent", link_changed), "openflow_discovery")
+    if stats_trace:
+        switch_options['stats_trace'] = StatsTraceWriter(stats_trace)
+        log.info("Flow-Statistiken werden in %s aufgezeichnet", stats_trace)
+    if policy:
+        acl = load_policy(policy)
+        log.info("Regeldatei %s geladen: %d Regeln, %d Zonen", policy, len(acl), len(acl.zones))
+    else:
+        acl = compile_rules(ACL_RULES)
+    if int(acl_cache_size) > 0:
+        acl = CachedACL(acl, int(acl_cache_size))
+    workers = int(_flag_or_number(offload, OFFLOAD_WORKERS))
+    if workers > 0:
+        # Ergebnisse der Worker werden per callLater in der Event-Schleife abgeholt
+        pool = PolicyOffload(acl, build_routing_table(), workers, str_to_bool(processes),
+                             notify=core.callLater)
+        switch_options['offload'] = pool
+        core.addListenerByName("GoingDownEvent", lambda event: pool.shutdown())
+        log.info("Policy-Entscheidung in %d %s", workers,
+                 "Prozessen" if pool.processes else "Threads")
+
+    def reload_policy():
+        """
+        Lädt die Regeldatei neu und gleicht alle Switches ab
+        """
+        nonlocal acl
+        try:
+            new = load_policy(policy)
+        except (IOError, OSError, ValueError, KeyError, TypeError) as error:
+            log.error("Regeldatei %s fehlerhaft, bisherige Regeln bleiben aktiv: %s",
+                      policy, error)
+            return
+        current = acl.acl if isinstance(acl, CachedACL) else acl
+        diff = PolicyDiff(current, new)
+        if not diff:
+            log.info("Regeldatei %s geladen: keine geänderten Regeln", policy)
+            return
+        # Ein Schritt in der Event-Schleife: kein PacketIn sieht einen Zwischenstand
+        if isinstance(acl, CachedACL):
+            acl.set_acl(new)
+        else:
+            acl = new
+        if 'offload' in switch_options:
+            switch_options['offload'].set_acl(acl)
+        log.info("Regeldatei %s neu geladen: %d Regeln, %s", policy, len(new), diff.stats())
+        for switch in list(peers.values()):
+            try:
+                switch.apply_policy(acl, diff)
+            except ValueError as error:
+                # z.B. zu viele Regeln für den proaktiven Modus
+                log.error("Regelwechsel auf %s: %s", switch.connection, error)
+
+    watch_interval = _flag_or_number(watch_policy, WATCH_INTERVAL)
+    if policy:
+        # kill -HUP <pid> lädt die Regeldatei neu (in der Event-Schleife)
+        signal.signal(signal.SIGHUP, lambda signum, frame: core.callLater(reload_policy))
+        if watch_interval > 0:
+            watcher = PolicyWatcher(resolve_policy_path(policy))
+
+            def poll_policy():
+                # Kein Rückgabewert: False würde den wiederkehrenden Timer beenden
+                if watcher.changed():
+                    reload_policy()
+
+            Timer(watch_interval, poll_policy, recurring=True)
+            log.info("Regeldatei %s wird alle %.1f s auf Änderungen geprüft",
+                     watcher.path, watch_interval)
+    elif watch_interval > 0:
+        log.warning("--watch_policy braucht eine Regeldatei (--policy)")
+
     def start_switch(event):
         log.info("Starte Layer 3 Switch mit Firewall auf %s", event.connection)
-        Layer3SwitchWithFirewall(event.connection)
+        Layer3SwitchWithFirewall(event.connection, acl, proactive, **switch_options)
     
     core.openflow.addListenerByName("ConnectionUp", start_switch) 
\ No newline at end of file
@@ -0,0 +1,151 @@
+"""
+Gebündeltes Senden von OpenFlow-Nachrichten
+
+connection.send(msg) serialisiert jede Nachricht einzeln und schreibt sie
+sofort auf den Socket. Installiert ein Burst von PacketIns hunderte Flows,
+wird daraus ein Systemaufruf und meist ein TCP-Segment pro Nachricht.
+
+MessageBatcher hat dieselbe send()-Schnittstelle wie die Verbindung,
+sammelt die serialisierten Nachrichten aber in einem Puffer und schreibt
+sie gemeinsam:
+    - am Ende des aktuellen Event-Bursts (core.callLater - läuft, sobald
+      POX alle bereits gelesenen OpenFlow-Nachrichten verarbeitet hat),
+    - nach max_delay Sekunden, falls angegeben,
+    - sofort, wenn der Puffer max_bytes erreicht.
+Die Reihenfolge der Nachrichten bleibt erhalten.
+
+barrier() hängt einen ofp_barrier_request an und ruft den Callback auf,
+sobald der Switch alle bis dahin gesendeten Nachrichten bearbeitet hat.
+
+Beispiel:
+    sender = MessageBatcher(connection)
+    sender.send(flow_mod)
+    sender.barrier(lambda count: log.info("%d Nachrichten bestätigt", count))
+"""
+
+import pox.openflow.libopenflow_01 as of
+from pox.core import core
+
+# Puffergröße, ab der sofort geschrieben wird (Bytes)
+MAX_BATCH_BYTES = 16 * 1024
+
+
+class MessageBatcher(object):
+    """
+    Sammelt ausgehende OpenFlow-Nachrichten einer Verbindung
+
+    Args:
+        connection: OpenFlow-Verbindung zum Switch
+        max_bytes: Puffergröße, ab der sofort geschrieben wird
+        max_delay: Sekunden bis zum Schreiben (0 = am Ende des Event-Bursts)
+        auto_flush: Schreiben selbst einplanen; False = nur bei max_bytes und
+                    flush() (z.B. im Benchmark ohne laufenden Event-Loop)
+    """
+
+    def __init__(self, connection, max_bytes=MAX_BATCH_BYTES, max_delay=0, auto_flush=True):
+        self.connection = connection
+        self.max_bytes = max_bytes
+        self.max_delay = max_delay
+        self.auto_flush = auto_flush
+        self._chunks = []
+        self._size = 0
+        self._scheduled = False
+        self._pending_messages = 0   # Nachrichten seit der letzten Barrier
+        self._barriers = {}          # xid → (Callback, Anzahl Nachrichten)
+        self.messages = 0
+        self.bytes = 0
+        self.writes = 0
+        self.confirmed = 0
+        connection.addListeners(self)
+
+    def send(self, msg):
+        """
+        Reiht eine Nachricht ein
+
+        Args:
+            msg: OpenFlow-Nachricht oder bereits serialisierte Bytes
+        """
+        data = msg if isinstance(msg, bytes) else msg.pack()
+        self._chunks.append(data)
+        self._size += len(data)
+        self.messages += 1
+        self._pending_messages += 1
+        if self._size >= self.max_bytes:
+            self.flush()
+        elif self.auto_flush and not self._scheduled:
+            self._scheduled = True
+            if self.max_delay:
+                core.callDelayed(self.max_delay, self._scheduled_flush)
+            else:
+                core.callLater(self._scheduled_flush)
+
+    def _scheduled_flush(self):
+        self._scheduled = False
+        self.flush()
+
+    def flush(self):
+        """
+        Schreibt alle gesammelten Nachrichten in einem Aufruf
+
+        Returns:
+            int: Anzahl geschriebener Bytes
+        """
+        if not self._chunks:
+            return 0
+        data = b''.join(self._chunks)
+        self._chunks = []
+        self._size = 0
+        self.connection.send(data)
+        self.bytes += len(data)
+        self.writes += 1
+        return len(data)
+
+    def barrier(self, callback=None):
+        """
+        Bestätigt alle bisher gesendeten Nachrichten per Barrier-Request
+
+        Der Puffer wird dabei sofort geschrieben.
+
+        Args:
+            callback: Wird mit der Anzahl bestätigter Nachrichten aufgerufen,
+                      sobald der Barrier-Reply eintrifft
+
+        Returns:
+            int: xid des Barrier-Requests
+        """
+        msg = of.ofp_barrier_request()
+        self._barriers[msg.xid] = (callback, self._pending_messages)
+        self.send(msg)
+        self._pending_messages = 0
+        self.flush()
+        return msg.xid
+
+    def _handle_BarrierIn(self, event):
+        entry = self._barriers.pop(event.xid, None)
+        if entry is None:
+            return
+        callback, count = entry
+        self.confirmed += count
+        if callback is not None:
+            callback(count)
+
+    def _handle_ConnectionDown(self, event):
+        self._chunks = []
+        self._size = 0
+        self._barriers.clear()
+
+    def stats(self):
+        """
+        Liefert die Zähler des Batchers
+
+        Returns:
+            dict: messages, bytes, writes, messages_per_write, confirmed, pending_barriers
+        """
+        return {
+            'messages': self.messages,
+            'bytes': self.bytes,
+            'writes': self.writes,
+            'messages_per_write': float(self.messages) / self.writes if self.writes else 0.0,
+            'confirmed': self.confirmed,
+            'pending_barriers': len(self._barriers),
+        }
@@ -0,0 +1,275 @@
+"""
+Auslagern der Policy-Entscheidung in einen Thread- oder Prozess-Pool
+
+POX verarbeitet alle Events nacheinander in einer kooperativen
+Event-Schleife. Braucht die ACL-Auswertung eines PacketIns lange (große
+Regeldatei, Cache-Fehltreffer), warten alle anderen Switch-Verbindungen.
+
+PolicyOffload verlagert die reine Entscheidung eines IP-Pakets in einen
+Worker: ACL-Lookup, Drop- bzw. Subnetz-Region und Routen-Lookup
+(evaluate()). Alles mit Zustand - Lerntabellen, ARP, Flow-Tabelle und das
+Senden der Flow-Mods - bleibt in der Event-Schleife. Die Ergebnisse
+kommen über eine Completion-Queue zurück; drain() ruft die Callbacks in
+der Event-Schleife auf (launch() plant es per core.callLater ein, sobald
+ein Worker fertig ist).
+
+Reihenfolge:
+    Pro Flow (FlowKey) hält PolicyOffload eine Spur (lane) in
+    Einreichungsreihenfolge. Ein Callback läuft erst, wenn alle früheren
+    Aufgaben desselben Flows abgeschlossen sind - die Pakete eines Flows
+    verlassen den Controller damit in der Reihenfolge, in der sie ankamen.
+    Verschiedene Flows überholen sich dagegen.
+
+Worker:
+    threads (Standard): ThreadPoolExecutor, jeder Thread mit eigenem
+        ACL-Cache. Wegen des GIL entlastet das die Event-Schleife nur,
+        solange Worker auf I/O warten oder C-Code laufen lassen.
+    processes: ProcessPoolExecutor, ACL und Routing-Tabelle werden einmal
+        pro Prozess übertragen; pro Paket gehen nur die vier Felder hin
+        und die Entscheidung zurück.
+
+Schlägt eine Aufgabe fehl, bekommt der Callback None und der Controller
+entscheidet selbst (inline).
+
+Worker liefern statt der Regel ihre Position in acl.rules; drain() setzt
+die Regel der Event-Schleife wieder ein. Aus einem Prozess käme sonst pro
+Paket eine eigene Kopie zurück, und Rule vergleicht nach Identität (z.B.
+als Schlüssel im LogAggregator). Jede Aufgabe merkt sich die Generation
+der ACL, mit der sie eingereicht wurde. Stammt ein Ergebnis aus einer
+früheren Generation (vor set_acl()), passt die Position nicht mehr zu
+acl.rules: Der Callback bekommt dann None und der Controller entscheidet
+nach der neuen ACL selbst.
+
+Beispiel:
+    offload = PolicyOffload(acl, routing_table, workers=4, notify=core.callLater)
+    offload.submit(key, (key.ip_src, key.ip_dst, key.proto, key.dport),
+                   lambda decision: handle(key, event, decision))
+"""
+
+import queue
+import threading
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from .acl_cache import CachedACL
+from .acl_compiler import DENY, restrict_region
+
+# Standardanzahl Worker
+OFFLOAD_WORKERS = 4
+
+# Ergebnis von evaluate():
+#   rule: Entscheidende Regel (None = Standard-Aktion)
+#   blocked: True, wenn das Paket verworfen wird
+#   region: Blockiert → größte Drop-Region; erlaubt → Region pro
+#           Quell-Subnetz und Ziel-Host (siehe Layer3SwitchWithFirewall._subnet_match)
+Decision = namedtuple('Decision', ['rule', 'blocked', 'region'])
+
+_worker = threading.local()   # ACL und Routing-Tabelle des Workers
+
+
+def evaluate(acl, routing_table, src, dst, proto, dport):
+    """
+    Policy-Entscheidung für ein IP-Paket (ohne Zustand des Controllers)
+
+    Args:
+        acl: ACL (CompiledACL, ZonePolicy oder CachedACL)
+        routing_table: routing_table.RoutingTable
+        src: Quell-IP (Integer)
+        dst: Ziel-IP (Integer)
+        proto: Protokoll-ID
+        dport: Zielport oder None
+
+    Returns:
+        Decision: Regel, Entscheidung und Region
+    """
+    rule = acl.lookup(src, dst, proto, dport)
+    region = acl.widest_region(rule, src, dst, proto, dport)
+    if acl.action_for(rule) == DENY:
+        return Decision(rule, True, region)
+    src_route = routing_table.lookup(src)
+    if src_route is None or region is None:
+        return Decision(rule, False, None)
+    return Decision(rule, False, restrict_region(region, src=src_route.prefix, dst=(dst, 32)))
+
+
+def _init_worker(acl, cache_size, routing_table):
+    _worker.acl = CachedACL(acl, cache_size) if cache_size else acl
+    _worker.routing_table = routing_table
+    _worker.rule_index = {id(rule): index for index, rule in enumerate(acl.rules)}
+
+
+def _evaluate_in_worker(src, dst, proto, dport):
+    decision = evaluate(_worker.acl, _worker.routing_table, src, dst, proto, dport)
+    if decision.rule is None:
+        return decision
+    return decision._replace(rule=_worker.rule_index[id(decision.rule)])
+
+
+class _Task(object):
+    __slots__ = ('callback', 'generation', 'future')
+
+    def __init__(self, callback, generation):
+        self.callback = callback
+        self.generation = generation
+        self.future = None
+
+
+class PolicyOffload(object):
+    """
+    Führt evaluate() in Workern aus und liefert die Ergebnisse pro Flow geordnet
+
+    Args:
+        acl: ACL; ein CachedACL wird pro Worker mit eigenem Cache nachgebaut
+        routing_table: routing_table.RoutingTable
+        workers: Anzahl Threads bzw. Prozesse
+        processes: ProcessPoolExecutor statt ThreadPoolExecutor
+        notify: Wird (aus dem Worker-Thread) mit drain aufgerufen, wenn
+                Ergebnisse bereitliegen, z.B. core.callLater
+                (None = der Aufrufer ruft drain() selbst auf)
+    """
+
+    def __init__(self, acl, routing_table, workers=OFFLOAD_WORKERS, processes=False,
+                 notify=None):
+        self.routing_table = routing_table
+        self.workers = workers
+        self.processes = processes
+        self.notify = notify
+        self.generation = 0   # Zählt die ACL-Wechsel (set_acl)
+        self.executor = self._start(acl)
+        self._completed = queue.Queue()   # Flows mit abgeschlossener Aufgabe
+        self._lanes = {}                  # Flow → deque(_Task) in Einreichungsreihenfolge
+        self._lock = threading.Lock()
+        self._drain_scheduled = False
+        self.submitted = 0
+        self.completed = 0
+        self.held = 0      # Fertig, aber hinter einer früheren Aufgabe desselben Flows
+        self.failed = 0
+        self.stale = 0     # Ergebnis nach einer älteren ACL, verworfen
+
+    def __len__(self):
+        return sum(len(lane) for lane in self._lanes.values())
+
+    def _start(self, acl):
+        cache_size = 0
+        if isinstance(acl, CachedACL):
+            acl, cache_size = acl.acl, acl.max_entries
+        self._rules = acl.rules
+        executor_class = ProcessPoolExecutor if self.processes else ThreadPoolExecutor
+        return executor_class(self.workers, initializer=_init_worker,
+                              initargs=(acl, cache_size, self.routing_table))
+
+    def set_acl(self, acl):
+        """
+        Tauscht die ACL der Worker aus (neue Worker, siehe policy_reload.py)
+
+        Offene Aufgaben werden vorher abgeschlossen und zugestellt, damit
+        keine Entscheidung nach der alten ACL mehr nach dem Wechsel ankommt.
+        Was danach noch aus einer älteren Generation fertig wird, verwirft
+        drain().
+
+        Args:
+            acl: Neue ACL
+        """
+        self.drain(block=True)
+        self.generation += 1
+        executor, self.executor = self.executor, self._start(acl)
+        executor.shutdown(wait=False)
+
+    def submit(self, flow, args, callback):
+        """
+        Reicht die Entscheidung für ein Paket ein
+
+        Args:
+            flow: Schlüssel für die Reihenfolge (z.B. FlowKey)
+            args: (src, dst, proto, dport) für evaluate()
+            callback: Wird in drain() mit der Decision (oder None) aufgerufen
+        """
+        task = _Task(callback, self.generation)
+        lane = self._lanes.get(flow)
+        if lane is None:
+            lane = self._lanes[flow] = deque()
+        lane.append(task)
+        self.submitted += 1
+        task.future = self.executor.submit(_evaluate_in_worker, *args)
+        task.future.add_done_callback(lambda future, flow=flow: self._done(flow))
+
+    def _done(self, flow):
+        """
+        Läuft im Worker- bzw. Verwaltungs-Thread: meldet den Flow als fertig
+        """
+        self._completed.put(flow)
+        if self.notify is None:
+            return
+        with self._lock:
+            if self._drain_scheduled:
+                return
+            self._drain_scheduled = True
+        self.notify(self.drain)
+
+    def drain(self, block=False):
+        """
+        Ruft die Callbacks fertiger Aufgaben auf (in der Event-Schleife)
+
+        Args:
+            block: Warten, bis alle eingereichten Aufgaben erledigt sind
+
+        Returns:
+            int: Anzahl aufgerufener Callbacks
+        """
+        with self._lock:
+            self._drain_scheduled = False
+        done = 0
+        while True:
+            try:
+                flow = self._completed.get(block and bool(self._lanes))
+            except queue.Empty:
+                break
+            lane = self._lanes.get(flow)
+            if not lane:
+                continue
+            if not lane[0].future.done():
+                self.held += 1
+                continue
+            while lane and lane[0].future.done():
+                task = lane.popleft()
+                try:
+                    decision = task.future.result()
+                except Exception:
+                    decision = None
+                    self.failed += 1
+                else:
+                    if task.generation != self.generation:
+                        decision = None
+                        self.stale += 1
+                    elif decision.rule is not None:
+                        decision = decision._replace(rule=self._rules[decision.rule])
+                task.callback(decision)
+                done += 1
+            if not lane:
+                del self._lanes[flow]
+        self.completed += done
+        return done
+
+    def shutdown(self):
+        """
+        Beendet die Worker (wartet nicht auf laufende Aufgaben)
+        """
+        self.executor.shutdown(wait=False)
+
+    def stats(self):
+        """
+        Liefert die Zähler
+
+        Returns:
+            dict: workers, processes, submitted, completed, pending, held, failed, stale
+        """
+        return {
+            'workers': self.workers,
+            'processes': self.processes,
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'pending': len(self),
+            'held': self.held,
+            'failed': self.failed,
+            'stale': self.stale,
+        }
@@ -0,0 +1,147 @@
+"""
+Regeldatei im laufenden Betrieb neu laden
+
+Bisher wurde die Regeldatei nur beim Start geladen; eine Änderung hieß POX
+neu starten, alle Flows verwerfen und über PacketIns neu lernen.
+
+PolicyWatcher prüft die Regeldatei (Änderungszeit und Größe) und meldet
+Änderungen. Die neue Datei wird vollständig geladen und kompiliert, bevor
+irgendetwas ausgetauscht wird; eine fehlerhafte Datei lässt die alte ACL
+in Kraft.
+
+PolicyDiff vergleicht alte und neue ACL in Prüfreihenfolge (längste
+gemeinsame Teilfolge der Regeln, difflib). Regeln, die nur in einer der
+beiden Fassungen vorkommen oder die Position relativ zu anderen Regeln
+geändert haben, bilden den geänderten Header-Raum: Ein Paket, das keine
+dieser Regeln trifft, sieht in beiden Fassungen dieselbe Folge passender
+Regeln und bekommt dieselbe Entscheidung. Nur Flows, deren Match diesen
+Raum überschneidet, werden überhaupt geprüft (uniform_action mit alter und
+neuer ACL); alle anderen bleiben ohne Controller-Verkehr im Switch.
+
+Beispiel:
+    watcher = PolicyWatcher("deepdive/enterprise_policy.json")
+    if watcher.changed():
+        diff = PolicyDiff(old_acl, load_policy(watcher.path))
+        if diff.changed(region_from_match(flow.match)):
+            ...
+"""
+
+import difflib
+import os
+
+from .acl_compiler import uniform_action
+
+# Sekunden zwischen zwei Prüfungen der Regeldatei
+WATCH_INTERVAL = 2.0
+
+
+def rule_key(rule):
+    """
+    Vergleichsschlüssel einer Regel (alle Match-Felder und die Aktion, ohne Namen)
+    """
+    return (rule.src, rule.src_except, rule.dst, rule.dst_except, rule.proto, rule.dport,
+            rule.action, rule.priority)
+
+
+class PolicyDiff(object):
+    """
+    Unterschied zwischen zwei ACL-Fassungen
+
+    Args:
+        old: Bisherige ACL (rules, default_action)
+        new: Neue ACL
+    """
+
+    def __init__(self, old, new):
+        self.old = old
+        self.new = new
+        self.removed = []   # Regeln nur in der alten Fassung (bzw. verschoben)
+        self.added = []     # Regeln nur in der neuen Fassung (bzw. verschoben)
+        matcher = difflib.SequenceMatcher(None, [rule_key(rule) for rule in old.rules],
+                                          [rule_key(rule) for rule in new.rules],
+                                          autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag != 'equal':
+                self.removed.extend(old.rules[i1:i2])
+                self.added.extend(new.rules[j1:j2])
+        self.default_changed = old.default_action != new.default_action
+
+    def __bool__(self):
+        return bool(self.removed or self.added or self.default_changed)
+
+    def affects(self, region):
+        """
+        Prüft, ob die Region den geänderten Header-Raum überschneiden kann
+
+        Args:
+            region: acl_compiler.Region
+        """
+        if self.default_changed:
+            return True
+        return any(rule.overlaps(region) for rule in self.removed) or any(
+            rule.overlaps(region) for rule in self.added)
+
+    def changed(self, region):
+        """
+        Prüft, ob ein Flow über die Region nach dem Wechsel falsch entscheiden würde
+
+        Args:
+            region: acl_compiler.Region des Flows
+
+        Returns:
+            bool: True, wenn die neue ACL anders oder nicht mehr einheitlich
+                  über die Region entscheidet
+        """
+        if not self.affects(region):
+            return False
+        action = uniform_action(self.new, region)
+        return action is None or action != uniform_action(self.old, region)
+
+    def stats(self):
+        """
+        Liefert den Umfang der Änderung
+
+        Returns:
+            dict: removed, added, default_changed
+        """
+        return {
+            'removed': len(self.removed),
+            'added': len(self.added),
+            'default_changed': self.default_changed,
+        }
+
+
+class PolicyWatcher(object):
+    """
+    Erkennt Änderungen einer Regeldatei anhand von Änderungszeit und Größe
+
+    Args:
+        path: Pfad der Regeldatei
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._signature = self._stat()
+
+    def _stat(self):
+        try:
+            info = os.stat(self.path)
+        except OSError:
+            return None
+        return (info.st_mtime, info.st_size)
+
+    def changed(self):
+        """
+        Prüft, ob sich die Datei seit dem letzten Aufruf geändert hat
+
+        Eine gelöschte oder gerade ersetzte Datei zählt erst als geändert,
+        wenn sie wieder vorhanden ist.
+
+        Returns:
+            bool: True bei einer Änderung
+        """
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return False
+        self._signature = signature
+        return True
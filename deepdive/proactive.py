@@ -0,0 +1,406 @@
+"""
+Proaktive Flow-Installation für den L3-Switch mit Firewall
+
+Im reaktiven Betrieb kostet jede neue Verbindung mindestens einen Umweg über
+den Controller (PacketIn). Im proaktiven Modus werden beim ConnectionUp die
+ACL und die bekannten Routen als priorisierte OpenFlow-Einträge auf den Switch
+geschrieben. Sobald ein Host bekannt ist, bekommt er einen Ziel-Routen-Eintrag;
+Verkehr zwischen bekannten Hosts erreicht den Controller danach nicht mehr.
+Unbekannte Ziele landen wie bisher per Table-Miss beim Controller.
+
+Aufbau der Flow-Tabelle (OpenFlow 1.0, eine Tabelle):
+
+    Priorität                     Einträge
+    ACL_PRIORITY_BASE - 2*i       Regel i (ALLOW): Regel ∩ Ziel-Host → Route
+    ACL_PRIORITY_BASE - 2*i - 1   Regel i: DENY → Drop, ALLOW → Controller
+    ...                           (Standard-Aktion DENY: Drop für alles IP)
+    ROUTE_PRIORITY + 1            Ziel-Host aus dem eigenen Subnetz → Port
+    ROUTE_PRIORITY                Ziel-Host → Gateway-MAC setzen, Port
+    ROUTE_PRIORITY - 1            Statische Routen mit bekanntem Next-Hop
+
+ALLOW-Regeln werden nur installiert, wenn eine spätere DENY-Regel (oder die
+Standard-Aktion DENY) sie überschneidet - sonst greifen direkt die Routen.
+Da eine Tabelle kein "weiter zur nächsten Regel" kennt, wird eine benötigte
+ALLOW-Regel mit jeder bekannten Ziel-Route kombiniert; für noch unbekannte
+Ziele schickt der Platzhalter-Eintrag das Paket an den Controller.
+
+ARP-Requests an die Gateway-IPs beantwortet der Switch mit je einem Eintrag
+(GATEWAY_ARP_PRIORITY) selbst: Nicira-Actions (Open vSwitch) tauschen Absender
+und Ziel, setzen Opcode REPLY und die Gateway-Adressen und schicken das Paket
+über OFPP_IN_PORT zurück. ARP-Stürme und Gratuitous ARP an ein Gateway
+erreichen den Controller damit nicht mehr.
+
+Regeln, die sich nicht exakt als OpenFlow-1.0-Match ausdrücken lassen (große
+Port-Bereiche), werden auf einen größeren Match ohne Zielport abgebildet, der
+an den Controller geht. Die Entscheidung trifft dann wie bisher die reaktive
+Verarbeitung.
+
+Ändert sich die Regeldatei im Betrieb, berechnet reload_policy() die Einträge
+der neuen ACL und vergleicht sie mit den installierten: Nur wegfallende
+Einträge werden per OFPFC_DELETE_STRICT gelöscht, neue bzw. geänderte per
+OFPFC_ADD geschrieben (ein ADD mit gleichem Match und gleicher Priorität
+ersetzt den bisherigen Eintrag).
+"""
+
+from pox.core import core
+import pox.openflow.libopenflow_01 as of
+import pox.openflow.nicira as nx
+from pox.lib.addresses import IPAddr
+from pox.lib.packet import arp, ethernet
+
+from .acl_compiler import (ALLOW, DENY, PROTOCOLS, Region, ip_to_int,
+                           prefix_contains, prefix_difference)
+from .arp_proxy import mac_to_bytes
+from .flow_utils import delete_flow, match_from_region
+
+log = core.getLogger()
+
+ACL_PRIORITY_BASE = 60000
+ROUTE_PRIORITY = 1000
+GATEWAY_ARP_PRIORITY = ACL_PRIORITY_BASE + 1
+
+# Port-Bereiche bis zu dieser Größe werden in Einzel-Ports aufgelöst
+MAX_PORT_EXPANSION = 32
+
+
+def _expand_prefixes(prefixes, excluded):
+    """
+    Liefert disjunkte Präfixe für eine Regel-Dimension (None = beliebig)
+    """
+    if excluded is None:
+        return [None] if prefixes is None else list(prefixes)
+    parents = [(0, 0)] if prefixes is None else list(prefixes)
+    result = []
+    for parent in parents:
+        result.extend(prefix_difference(parent, excluded))
+    return result
+
+
+def expand_rule(rule, max_ports=MAX_PORT_EXPANSION):
+    """
+    Zerlegt eine Regel in OpenFlow-1.0-taugliche Regionen
+
+    Mehrere Präfixe, Ausnahmen und Port-Listen werden ausmultipliziert.
+
+    Args:
+        rule: acl_compiler.Rule
+        max_ports: Maximale Anzahl Einzel-Ports pro Regel
+
+    Returns:
+        tuple: (Liste von Regionen, exakt) - exakt ist False, wenn die
+               Regionen die Regel nur überdecken (Port-Bereich zu groß)
+    """
+    sources = _expand_prefixes(rule.src, rule.src_except)
+    destinations = _expand_prefixes(rule.dst, rule.dst_except)
+
+    exact = True
+    if rule.dport is None:
+        ports = [None]
+    else:
+        count = sum(hi - lo + 1 for lo, hi in rule.dport)
+        if count > max_ports:
+            ports = [None]
+            exact = False
+        else:
+            ports = [port for lo, hi in rule.dport for port in range(lo, hi + 1)]
+
+    if rule.proto is not None:
+        protos = [rule.proto]
+    elif rule.dport is not None:
+        # Zielports gibt es nur bei TCP und UDP (vgl. _extract_dst_port)
+        protos = [PROTOCOLS['tcp'], PROTOCOLS['udp']]
+    else:
+        protos = [None]
+
+    regions = [Region(src, dst, proto, port)
+               for src in sources for dst in destinations
+               for proto in protos for port in ports]
+    return regions, exact
+
+
+def _restrict_dst(region, host):
+    """
+    Schneidet eine Region mit einem Ziel-Host (Netz, 32) - None wenn disjunkt
+    """
+    if region.dst is not None and not prefix_contains(region.dst, host):
+        return None
+    return region._replace(dst=host)
+
+
+class ProactiveInstaller(object):
+    """
+    Schreibt ACL und Routen eines L3-Switches proaktiv in die Flow-Tabelle
+
+    Args:
+        connection: OpenFlow-Verbindung zum Switch (oder msg_batcher.MessageBatcher)
+        acl: ACL mit den Attributen rules und default_action
+        routing_table: routing_table.RoutingTable mit Gateway-Subnetzen und
+                       statischen Routen
+        idle_timeout: Idle-Timeout der Host-Routen (0 = unbegrenzt)
+    """
+
+    def __init__(self, connection, acl, routing_table, idle_timeout=0):
+        self.connection = connection
+        self.acl = acl
+        self.routing_table = routing_table
+        self.idle_timeout = idle_timeout
+        self.hosts = {}          # IP (Integer) → (MAC, Port)
+        self._allow_slots = []   # [(Priorität, Regionen)] benötigter ALLOW-Regeln
+        self._entries = {}       # (Region, Priorität) → Drop (True) oder Controller
+
+    def _send_flow(self, region, priority, actions, idle_timeout=0):
+        msg = of.ofp_flow_mod()
+        msg.match = match_from_region(region)
+        msg.priority = priority
+        msg.idle_timeout = idle_timeout
+        msg.actions.extend(actions)
+        self.connection.send(msg)
+
+    def _allow_needed(self, index):
+        """
+        Prüft ob eine ALLOW-Regel eine spätere DENY-Regel überschneidet
+        """
+        if self.acl.default_action == DENY:
+            return True
+        regions = expand_rule(self.acl.rules[index])[0]
+        for later in self.acl.rules[index + 1:]:
+            if later.action == DENY and any(later.overlaps(region) for region in regions):
+                return True
+        return False
+
+    def _policy_entries(self):
+        """
+        Berechnet die ACL-Einträge der aktuellen ACL (ohne zu senden)
+
+        Returns:
+            tuple: ({(Region, Priorität): Drop}, [(Priorität, Regionen)]
+                   benötigter ALLOW-Regeln)
+        """
+        rules = self.acl.rules
+        if ACL_PRIORITY_BASE - 2 * len(rules) - 2 <= ROUTE_PRIORITY + 1:
+            raise ValueError("Zu viele Regeln für den proaktiven Modus: %d" % len(rules))
+
+        entries = {}
+        allow_slots = []
+        for index, rule in enumerate(rules):
+            route_priority = ACL_PRIORITY_BASE - 2 * index
+            rule_priority = route_priority - 1
+            regions, exact = expand_rule(rule)
+
+            if rule.action == DENY and exact:
+                drop = True   # Keine Actions = Drop
+            elif rule.action == ALLOW and not self._allow_needed(index):
+                continue
+            else:
+                # Benötigte ALLOW-Regel oder nicht exakt darstellbar → Controller
+                drop = False
+            if rule.action == ALLOW and exact:
+                allow_slots.append((route_priority, regions))
+
+            for region in regions:
+                entries[(region, rule_priority)] = drop
+
+        if self.acl.default_action == DENY:
+            # Alles, was keine ALLOW-Regel erlaubt, verwerfen
+            entries[(Region(None, None, None, None), ACL_PRIORITY_BASE - 2 * len(rules) - 1)] = True
+        return entries, allow_slots
+
+    def _send_entry(self, region, priority, drop):
+        actions = [] if drop else [of.ofp_action_output(port=of.OFPP_CONTROLLER)]
+        self._send_flow(region, priority, actions)
+
+    def install_policy(self):
+        """
+        Installiert die ACL-Einträge und statischen Routen (beim ConnectionUp)
+
+        Returns:
+            int: Anzahl gesendeter Flow-Mods
+        """
+        self._entries, self._allow_slots = self._policy_entries()
+        for (region, priority), drop in self._entries.items():
+            self._send_entry(region, priority, drop)
+        sent = len(self._entries)
+
+        sent += self._install_static_routes()
+        log.info("Proaktiver Modus: %d Flow-Einträge für %d Regeln installiert",
+                 sent, len(self.acl.rules))
+        return sent
+
+    def reload_policy(self):
+        """
+        Gleicht die installierten ACL-Einträge mit der (ausgetauschten) ACL ab
+
+        Einträge, die es nicht mehr gibt, werden per OFPFC_DELETE_STRICT
+        gelöscht; neue und geänderte per OFPFC_ADD geschrieben. Die
+        Kombinationen benötigter ALLOW-Regeln mit bekannten Hosts werden
+        genauso abgeglichen, unveränderte Einträge bleiben unberührt.
+
+        Returns:
+            tuple: (gelöschte, geschriebene Einträge)
+        """
+        entries, allow_slots = self._policy_entries()
+        deleted = written = 0
+        for key, drop in self._entries.items():
+            if key not in entries:
+                self.connection.send(delete_flow(match_from_region(key[0]), key[1]))
+                deleted += 1
+        for (region, priority), drop in entries.items():
+            if self._entries.get((region, priority)) != drop:
+                self._send_entry(region, priority, drop)
+                written += 1
+
+        for key, (mac, port) in self.hosts.items():
+            old = self._allow_entries(self._allow_slots, key)
+            new = self._allow_entries(allow_slots, key)
+            for region, priority in old:
+                if (region, priority) not in new:
+                    self.connection.send(delete_flow(match_from_region(region), priority))
+                    deleted += 1
+            for (region, priority), local in new.items():
+                if old.get((region, priority)) != local:
+                    self._send_flow(region, priority, self._host_actions(key, mac, port, local),
+                                    self.idle_timeout)
+                    written += 1
+
+        self._entries, self._allow_slots = entries, allow_slots
+        log.info("Proaktiver Modus: Regeln neu geladen, %d Einträge gelöscht, %d geschrieben",
+                 deleted, written)
+        return deleted, written
+
+    def install_gateway_arp(self, gateways):
+        """
+        Installiert ARP-Responder-Einträge für die Gateway-IPs
+
+        Args:
+            gateways: dict Gateway-IP → Gateway-MAC
+
+        Returns:
+            int: Anzahl gesendeter Flow-Mods
+        """
+        for gw_ip, gw_mac in gateways.items():
+            msg = of.ofp_flow_mod()
+            # In OpenFlow 1.0 steht der ARP-Opcode in nw_proto, die Target-IP in nw_dst
+            msg.match = of.ofp_match(dl_type=ethernet.ARP_TYPE, nw_proto=arp.REQUEST,
+                                     nw_dst=IPAddr(gw_ip))
+            msg.priority = GATEWAY_ARP_PRIORITY
+            msg.actions.extend([
+                nx.nx_reg_move(src=nx.NXM_OF_ETH_SRC, dst=nx.NXM_OF_ETH_DST),
+                of.ofp_action_dl_addr.set_src(gw_mac),
+                nx.nx_reg_load(dst=nx.NXM_OF_ARP_OP, value=arp.REPLY),
+                nx.nx_reg_move(src=nx.NXM_NX_ARP_SHA, dst=nx.NXM_NX_ARP_THA),
+                nx.nx_reg_load(dst=nx.NXM_NX_ARP_SHA,
+                               value=int.from_bytes(mac_to_bytes(gw_mac), 'big')),
+                nx.nx_reg_move(src=nx.NXM_OF_ARP_SPA, dst=nx.NXM_OF_ARP_TPA),
+                nx.nx_reg_load(dst=nx.NXM_OF_ARP_SPA, value=ip_to_int(gw_ip)),
+                of.ofp_action_output(port=of.OFPP_IN_PORT),
+            ])
+            self.connection.send(msg)
+        log.info("Proaktiver Modus: ARP-Responder für %d Gateways installiert", len(gateways))
+        return len(gateways)
+
+    def _install_static_routes(self):
+        """
+        Installiert Präfix-Routen für statische Routen mit bekanntem Next-Hop
+        """
+        sent = 0
+        for route in self.routing_table.routes():
+            if route.next_hop is None:
+                continue  # direkt verbunden → Host-Routen nach dem Lernen
+            known = self.hosts.get(route.next_hop)
+            if known is None:
+                continue
+            mac, port = known
+            region = Region(None, route.prefix, None, None)
+            self._send_flow(region, ROUTE_PRIORITY - 1,
+                            self._route_actions(route.gateway_mac, mac, port))
+            sent += 1
+        return sent
+
+    @staticmethod
+    def _route_actions(src_mac, dst_mac, port):
+        actions = []
+        if src_mac is not None:
+            actions.append(of.ofp_action_dl_addr.set_src(src_mac))
+        actions.append(of.ofp_action_dl_addr.set_dst(dst_mac))
+        actions.append(of.ofp_action_output(port=port))
+        return actions
+
+    def _allow_entries(self, allow_slots, key):
+        """
+        Kombiniert benötigte ALLOW-Regeln mit der Route zu einem Host
+
+        Args:
+            allow_slots: [(Priorität, Regionen)] benötigter ALLOW-Regeln
+            key: IP-Adresse des Hosts (Integer)
+
+        Returns:
+            dict: (Region, Priorität) → True, wenn Quelle und Host im selben
+                  Subnetz liegen (kein Source-MAC-Rewrite)
+        """
+        host = (key, 32)
+        route = self.routing_table.lookup(key)
+        subnet = route.prefix if route is not None and route.is_connected else None
+        entries = {}
+        for priority, regions in allow_slots:
+            for region in regions:
+                restricted = _restrict_dst(region, host)
+                if restricted is None:
+                    continue
+                entries[(restricted, priority)] = (subnet is not None and restricted.src is not None
+                                                   and prefix_contains(subnet, restricted.src))
+        return entries
+
+    def _host_actions(self, key, mac, port, local):
+        """
+        Actions zu einem Host: lokal ohne, geroutet mit Gateway-MAC als Quelle
+        """
+        if local:
+            return self._route_actions(None, mac, port)
+        route = self.routing_table.lookup(key)
+        return self._route_actions(route.gateway_mac if route is not None else None, mac, port)
+
+    def host_learned(self, ip, mac, port):
+        """
+        Installiert Routen für einen neu gelernten (oder umgezogenen) Host
+
+        Args:
+            ip: IP-Adresse des Hosts
+            mac: MAC-Adresse des Hosts
+            port: Switch-Port des Hosts
+
+        Returns:
+            int: Anzahl gesendeter Flow-Mods (0 wenn schon bekannt)
+        """
+        key = ip_to_int(ip)
+        if self.hosts.get(key) == (mac, port):
+            return 0
+        self.hosts[key] = (mac, port)
+
+        host = (key, 32)
+        route = self.routing_table.lookup(key)
+        gw_mac = route.gateway_mac if route is not None else None
+        routed = self._route_actions(gw_mac, mac, port)
+        local = self._route_actions(None, mac, port)
+        sent = 0
+
+        # Ziel-Host aus dem eigenen Subnetz: kein Source-MAC-Rewrite
+        subnet = route.prefix if route is not None and route.is_connected else None
+        if subnet is not None:
+            self._send_flow(Region(subnet, host, None, None), ROUTE_PRIORITY + 1,
+                            local, self.idle_timeout)
+            sent += 1
+        self._send_flow(Region(None, host, None, None), ROUTE_PRIORITY,
+                        routed, self.idle_timeout)
+        sent += 1
+
+        # Benötigte ALLOW-Regeln mit der neuen Route kombinieren
+        for (region, priority), same_subnet in self._allow_entries(self._allow_slots,
+                                                                   key).items():
+            self._send_flow(region, priority, local if same_subnet else routed,
+                            self.idle_timeout)
+            sent += 1
+
+        sent += self._install_static_routes()
+        log.debug("Proaktiver Modus: Routen für %s → %s über Port %s installiert (%d Flows)",
+                  IPAddr(key), mac, port, sent)
+        return sent
@@ -0,0 +1,210 @@
+"""
+Routing-Tabelle mit Longest-Prefix-Match (LPM)
+
+Die Tabelle hält die Gateway-Subnetze und statischen Routen des L3-Switches.
+Intern gibt es einen Hash pro vorkommender Präfixlänge (Netz >> (32 - Länge)
+→ Route). Ein Lookup prüft die Präfixlängen von lang nach kurz und endet beim
+ersten Treffer - höchstens 33 Hash-Zugriffe auf Integer-Schlüssel, unabhängig
+von der Anzahl der Subnetze. Präfixe beliebiger Länge sind erlaubt.
+
+Beispiel:
+    table = RoutingTable()
+    table.add("10.1.1.0/24", gateway_ip=IPAddr("10.1.1.254"),
+              gateway_mac=EthAddr("00:aa:00:00:01:01"))
+    table.add("192.168.0.0/16", next_hop=IPAddr("10.1.1.1"))
+    route = table.lookup(IPAddr("192.168.3.4"))
+    route.next_hop, route.gateway_mac, route.port
+
+Benchmark gegen den bisherigen linearen Scan:
+    python -m deepdive.routing_table [Anzahl Subnetze]
+"""
+
+import random
+import sys
+import time
+
+from .acl_compiler import format_prefix, int_to_ip, ip_to_int, parse_prefix
+
+
+class Route(object):
+    """
+    Eintrag der Routing-Tabelle
+
+    Attributes:
+        prefix: Zielnetz (Netz, Länge)
+        next_hop: IP des Next-Hops als Integer (None = direkt verbunden)
+        gateway_ip: Gateway-IP des Switches im Egress-Subnetz
+        gateway_mac: Gateway-MAC des Switches im Egress-Subnetz (Source-MAC beim Routing)
+        port: Egress-Port, falls bekannt
+    """
+
+    __slots__ = ('prefix', 'next_hop', 'gateway_ip', 'gateway_mac', 'port')
+
+    def __init__(self, prefix, next_hop=None, gateway_ip=None, gateway_mac=None, port=None):
+        self.prefix = prefix
+        self.next_hop = next_hop
+        self.gateway_ip = gateway_ip
+        self.gateway_mac = gateway_mac
+        self.port = port
+
+    @property
+    def is_connected(self):
+        return self.next_hop is None
+
+    def __repr__(self):
+        via = "direkt" if self.next_hop is None else "via %s" % int_to_ip(self.next_hop)
+        return "Route(%s %s, gw=%s, port=%s)" % (format_prefix(*self.prefix), via,
+                                                 self.gateway_mac, self.port)
+
+
+class RoutingTable(object):
+    """
+    Longest-Prefix-Match-Tabelle (ein Hash pro Präfixlänge)
+    """
+
+    def __init__(self):
+        self._tables = {}   # Präfixlänge → {Netz >> (32 - Länge): Route}
+        self._order = []    # [(Shift, Tabelle)] von lang nach kurz
+
+    def _rebuild_order(self):
+        self._order = [(32 - length, self._tables[length])
+                       for length in sorted(self._tables, reverse=True)]
+
+    def add(self, prefix, next_hop=None, gateway_ip=None, gateway_mac=None, port=None):
+        """
+        Fügt eine Route hinzu (bzw. ersetzt eine bestehende)
+
+        Bei Routen über einen Next-Hop wird die Gateway-MAC, falls nicht
+        angegeben, aus dem direkt verbundenen Subnetz des Next-Hops übernommen.
+
+        Args:
+            prefix: Zielnetz, z.B. "10.1.1.0/24" oder (Netz, Länge)
+            next_hop: IP des Next-Hops (None = direkt verbunden)
+            gateway_ip: Gateway-IP im Egress-Subnetz
+            gateway_mac: Gateway-MAC im Egress-Subnetz
+            port: Egress-Port, falls bekannt
+
+        Returns:
+            Route: Neuer Eintrag
+        """
+        net, length = parse_prefix(prefix)
+        if next_hop is not None:
+            next_hop = ip_to_int(next_hop)
+            if gateway_mac is None:
+                connected = self.lookup(next_hop)
+                if connected is not None:
+                    gateway_ip = connected.gateway_ip
+                    gateway_mac = connected.gateway_mac
+        route = Route((net, length), next_hop, gateway_ip, gateway_mac, port)
+        if length not in self._tables:
+            self._tables[length] = {}
+            self._rebuild_order()
+        self._tables[length][net >> (32 - length)] = route
+        return route
+
+    def remove(self, prefix):
+        """
+        Entfernt eine Route
+
+        Returns:
+            Route: Entfernter Eintrag oder None
+        """
+        net, length = parse_prefix(prefix)
+        table = self._tables.get(length)
+        if table is None:
+            return None
+        route = table.pop(net >> (32 - length), None)
+        if not table:
+            del self._tables[length]
+            self._rebuild_order()
+        return route
+
+    def lookup(self, ip):
+        """
+        Longest-Prefix-Match für eine IP-Adresse
+
+        Args:
+            ip: IP-Adresse (IPAddr oder Integer)
+
+        Returns:
+            Route: Spezifischste passende Route oder None
+        """
+        ip = ip_to_int(ip)
+        for shift, table in self._order:
+            route = table.get(ip >> shift)
+            if route is not None:
+                return route
+        return None
+
+    def routes(self):
+        """
+        Liefert alle Routen (spezifischste zuerst)
+        """
+        return [route for _, table in self._order for route in table.values()]
+
+    def __len__(self):
+        return sum(len(table) for table in self._tables.values())
+
+
+def _linear_scan(gateways, ip):
+    """
+    Nachbau des bisherigen _get_gateway_mac_for_ip: linearer Scan mit
+    String-Aufbau und Parsen des /24-Subnetzes für jedes Gateway
+    """
+    for gw_ip, gw_mac in gateways:
+        subnet = str(gw_ip).rsplit('.', 1)[0] + '.0/24'
+        net, length = parse_prefix(subnet)
+        if ip_to_int(ip) >> (32 - length) == net >> (32 - length):
+            return gw_mac
+    return None
+
+
+def benchmark(subnets=500, lookups=20000, seed=1):
+    """
+    Vergleicht LPM-Lookup und linearen Scan bei vielen Subnetzen
+
+    Args:
+        subnets: Anzahl /24-Gateway-Subnetze
+        lookups: Anzahl Lookups pro Verfahren
+        seed: Startwert für den Zufallsgenerator
+
+    Returns:
+        dict: Mikrosekunden pro Lookup für beide Verfahren
+    """
+    rng = random.Random(seed)
+    gateways = []
+    table = RoutingTable()
+    for i in range(subnets):
+        net = (10 << 24) | ((i // 250) << 16) | ((i % 250) << 8)
+        gw_ip = int_to_ip(net | 254)
+        gw_mac = "00:aa:00:%02x:%02x:01" % (i // 250, i % 250)
+        gateways.append((gw_ip, gw_mac))
+        table.add((net, 24), gateway_ip=gw_ip, gateway_mac=gw_mac)
+    targets = [int_to_ip((10 << 24) | ((i // 250) << 16) | ((i % 250) << 8) | rng.randint(1, 200))
+               for i in (rng.randrange(subnets) for _ in range(lookups))]
+
+    start = time.perf_counter()
+    for ip in targets:
+        _linear_scan(gateways, ip)
+    scan = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for ip in targets:
+        table.lookup(ip)
+    lpm = time.perf_counter() - start
+
+    for ip in targets[:100]:
+        assert table.lookup(ip).gateway_mac == _linear_scan(gateways, ip)
+
+    return {
+        'subnets': subnets,
+        'linear_scan_us': scan / lookups * 1e6,
+        'lpm_us': lpm / lookups * 1e6,
+    }
+
+
+if __name__ == "__main__":
+    for count in [int(arg) for arg in sys.argv[1:]] or [5, 100, 500]:
+        result = benchmark(count)
+        print("%4d Subnetze: linearer Scan %8.2f µs, LPM %5.2f µs pro Lookup"
+              % (result['subnets'], result['linear_scan_us'], result['lpm_us']))
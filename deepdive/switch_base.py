@@ -0,0 +1,419 @@
+"""
+Gemeinsame Basis von L2- und L3-Switch mit Firewall
+
+Beide Controller führen dieselbe Buchhaltung pro Switch: Flow-Tabelle
+(Belegung, Verdrängung, Flow-Statistik), Flow-Register gegen doppelte
+Flow-Mods, Elephant-Erkennung, Zulassung mit Quarantäne, Lerntabellen mit
+Alterung und Log-Zusammenfassungen. SwitchBase bündelt diesen Zustand und
+die zugehörigen Event-Handler; die Unterklassen behalten nur ihre eigene
+Paketverarbeitung.
+
+Anpassungspunkte der Unterklassen:
+    _admission_source(key)  Quelle für den Token-Bucket (Standard: Quell-MAC)
+    _counters()             Weitere Zähler für das Log (Basis-Liste erweitern)
+    _handle_ConnectionDown  Eigenen Zustand aufräumen (Basis-Methode aufrufen)
+
+Beispiel:
+    class MySwitch(SwitchBase):
+        def __init__(self, connection, acl, **options):
+            SwitchBase.__init__(self, connection, acl, **options)
+            ...
+            self._start_timers(aging_interval, stats_interval)
+            connection.addListeners(self)
+"""
+
+import logging
+
+from pox.core import core
+import pox.openflow.libopenflow_01 as of
+from pox.lib.recoco import Timer
+
+from .acl_cache import CachedACL
+from .admission import ADMIT, QUARANTINE_PORT, QUARANTINE_SOURCE
+from .elephant import (ElephantDetector, ELEPHANT_RATE, ELEPHANT_TOP_K,
+                       ELEPHANT_IDLE_TIMEOUT, ELEPHANT_HARD_TIMEOUT)
+from .flow_registry import FlowRegistry, DEDUP_WINDOW
+from .flow_table import FlowTableAccountant, FLOW_TABLE_SIZE
+from .flow_utils import (BufferStats, aggregate_flow, delete_flow, quarantine_flows,
+                         reinstall_flow)
+from .host_registry import HostRegistry
+from .host_table import HOST_TABLE_SIZE, HOST_MAX_AGE
+from .hot_log import LogAggregator
+from .msg_batcher import MessageBatcher
+
+log = core.getLogger()
+
+
+class SwitchBase(object):
+    """
+    Zustand und Event-Handler, die L2- und L3-Switch gemeinsam haben
+
+    Args:
+        connection: OpenFlow-Verbindung zum Switch
+        acl: Vorkompilierte ACL, ggf. mit Cache
+        host_table_size: Maximale Anzahl Einträge pro Lerntabelle
+        host_max_age: Sekunden bis ein gelernter Eintrag verfällt
+        fast_path: IPv4-Header direkt aus den Rohdaten lesen
+        batch: Ausgehende Nachrichten bündeln (siehe msg_batcher.py)
+        dedup_window: Sekunden, in denen ein identischer Flow-Mod durch
+                      einen PacketOut ersetzt wird (0 = aus)
+        flow_table_size: Angenommene Größe der Flow-Tabelle des Switches
+        elephants: Elephant-Erkennung aus der Flow-Statistik (siehe elephant.py)
+        elephant_rate: Bytes/s, ab denen ein Flow ein Elephant ist
+        elephant_top_k: Zusätzlich die k Flows mit der höchsten Rate
+        stats_trace: Optionaler StatsTraceWriter
+        registry: Gemeinsame HostRegistry aller Switches (Standard: eigene)
+        admission: Gemeinsame AdmissionControl (Standard: keine Begrenzung)
+        topology: Gemeinsamer Topology-Graph (None = Links unbekannt)
+    """
+
+    def __init__(self, connection, acl, host_table_size=HOST_TABLE_SIZE,
+                 host_max_age=HOST_MAX_AGE, fast_path=False, batch=False,
+                 dedup_window=DEDUP_WINDOW, flow_table_size=FLOW_TABLE_SIZE,
+                 elephants=False, elephant_rate=ELEPHANT_RATE, elephant_top_k=ELEPHANT_TOP_K,
+                 stats_trace=None, registry=None, admission=None, topology=None):
+        self.connection = connection
+        # Ausgehende Nachrichten: direkt oder gebündelt über die Verbindung
+        self.sender = MessageBatcher(connection) if batch else connection
+        # Gemeinsame Lerntabellen aller Switches (oder eigene, wenn allein betrieben)
+        self.hosts = registry if registry is not None else HostRegistry(host_table_size,
+                                                                        host_max_age)
+        # Zuordnung MAC-Adresse → Port (nur dieser Switch)
+        self.mac_to_port = self.hosts.port_map(connection.dpid)
+        self.acl = acl
+        self.log_stats = LogAggregator(log)  # Zusammenfassungen statt Logs pro Paket
+        self.fast_path = fast_path
+        # Gesendete Flow-Mods, um Duplikate durch PacketOuts zu ersetzen
+        self.flow_registry = FlowRegistry(dedup_window) if dedup_window else None
+        # Pakete per buffer_id statt mit Daten an den Switch zurückgeben
+        self.buffers = BufferStats()
+        # Belegung der Flow-Tabelle (Flow-Mods, FlowRemoved, Flow-Statistiken)
+        self.flow_table = FlowTableAccountant(flow_table_size)
+        # Elephant-Erkennung aus derselben Flow-Statistik
+        self.elephants = ElephantDetector(elephant_rate, elephant_top_k) if elephants else None
+        self.stats_trace = stats_trace
+        # Token-Buckets gegen PacketIn-Fluten (gemeinsam für alle Switches)
+        self.admission = admission
+        # Links zwischen Switches (None = unbekannt)
+        self.topology = topology
+        self._aging_timer = self._stats_timer = self._log_timer = None
+
+    def _start_timers(self, aging_interval, stats_interval):
+        """
+        Startet Aufräum-, Statistik- und Log-Timer
+
+        Args:
+            aging_interval: Sekunden zwischen zwei Aufräum-Durchläufen (0 = keine)
+            stats_interval: Sekunden zwischen zwei Flow-Statistik-Abfragen (0 = keine)
+        """
+        if aging_interval:
+            self._aging_timer = Timer(aging_interval, self._age_host_tables, recurring=True)
+        if stats_interval:
+            self._stats_timer = Timer(stats_interval, self._request_flow_stats, recurring=True)
+        # Zusammenfassungen auch ausgeben, wenn nach einem Burst nichts mehr kommt
+        self._log_timer = Timer(self.log_stats.interval, self._flush_log_stats, recurring=True)
+
+    # --- Zulassung und Quarantäne ---
+
+    def _admission_source(self, key):
+        """
+        Quelle eines PacketIns für den Token-Bucket
+
+        Args:
+            key: FlowKey des Pakets
+
+        Returns:
+            tuple: (Quelle, Bezeichnung für das Log, Felder für quarantine_flows)
+        """
+        return key.eth_src, key.eth_src, {'eth_src': key.eth_src}
+
+    def _admit(self, key):
+        """
+        Prüft einen PacketIn gegen die Token-Buckets von Port und Quelle
+
+        Überschreitet die Quelle oder der Eingangsport sein Budget, sperrt
+        ein Drop-Flow die Quelle bzw. den Port für quarantine_time Sekunden
+        direkt im Switch (siehe admission.py). Links zu anderen Switches
+        werden mit Topologie nicht geprüft; dort kommt nur bereits
+        zugelassener Verkehr an. Ohne Topologie werden Uplinks beim ersten
+        erschöpften Budget erkannt (siehe _is_shared_port) und von der
+        Port-Prüfung ausgenommen.
+
+        Args:
+            key: FlowKey des Pakets
+
+        Returns:
+            bool: True, wenn der PacketIn verarbeitet werden soll
+        """
+        dpid = self.connection.dpid
+        if self.topology is not None and self.topology.is_link_port(dpid, key.in_port):
+            return True
+        source, name, fields = self._admission_source(key)
+        verdict = self.admission.check(dpid, key.in_port, source)
+        if verdict == ADMIT:
+            return True
+        if verdict == QUARANTINE_SOURCE:
+            self._quarantine("Quelle %s" % (name,), **fields)
+        elif verdict == QUARANTINE_PORT:
+            if self._is_shared_port(key):
+                self.admission.exempt_port(dpid, key.in_port)
+                return True
+            self._quarantine("Port %s" % (key.in_port,), in_port=key.in_port)
+        else:
+            self.log_stats.count("Zulassung: %d PacketIns in Quarantäne verworfen")
+        return False
+
+    def _is_shared_port(self, key):
+        """
+        Prüft, ob ein Port Verkehr von Hosts anderer Switches trägt (Uplink)
+
+        Mit Topologie sind Links bereits in _admit() ausgenommen. Ohne
+        Topologie gilt ein Port als Uplink, wenn Verkehr von Hosts darauf
+        ankommt, deren Standort die HostRegistry an einem anderen Switch
+        kennt: die Quelle des Pakets oder eine auf dem Port gelernte MAC-
+        Adresse. Die bloße Zahl gelernter MAC-Adressen reicht nicht - ein
+        MAC-Flood würde seinen Port sonst selbst freischalten. Geprüft wird
+        nur, wenn das Budget des Ports erschöpft ist.
+
+        Args:
+            key: FlowKey des Pakets, das das Budget überschritten hat
+
+        Returns:
+            bool: True, wenn der Port nicht gesperrt werden soll
+        """
+        if self.topology is not None:
+            return False
+        dpid = self.connection.dpid
+        sources = [key.ip_src] if key.ip_src is not None else []
+        sources.extend(self.hosts.mac_to_ip.get(mac) for mac, port in self.mac_to_port.items()
+                       if port == key.in_port)
+        for ip in sources:
+            location = self.hosts.locate(ip) if ip is not None else None
+            if location is not None and location.dpid != dpid:
+                return True
+        return False
+
+    def _quarantine(self, name, **source):
+        """
+        Sperrt einen Port oder eine Quelle per Drop-Flow mit Hard-Timeout
+
+        Args:
+            name: Bezeichnung für das Log
+            source: in_port, eth_src oder ip_src (siehe flow_utils.quarantine_flows)
+        """
+        hard_timeout = int(self.admission.quarantine_time)
+        for msg in quarantine_flows(hard_timeout, **source):
+            self.flow_table.added(msg.match, msg.priority, msg.idle_timeout, msg.hard_timeout)
+            self.sender.send(msg)
+        self.log_stats.count("Zulassung: %d Ports bzw. Quellen gesperrt")
+        log.warning("Zulassung: %s an Switch %s überschreitet das PacketIn-Budget - %d s gesperrt",
+                    name, self.connection.dpid, hard_timeout)
+
+    # --- Lerntabellen, Zähler und Log ---
+
+    def _learn_mac_address(self, src_mac, in_port):
+        """
+        Lernt die Zuordnung von MAC-Adresse zu Port
+
+        Args:
+            src_mac: Quell-MAC-Adresse
+            in_port: Eingangsport
+        """
+        if self.mac_to_port.learn(src_mac, in_port) and log.isEnabledFor(logging.DEBUG):
+            log.debug("MAC-Adresse gelernt: %s → Port %s", src_mac, in_port)
+
+    def _age_host_tables(self):
+        """
+        Entfernt veraltete Einträge aus den Lerntabellen (periodisch per Timer)
+
+        Im selben Takt gehen die Zähler der Komponenten ins DEBUG-Log.
+        """
+        for table in self.hosts.tables(self.connection.dpid):
+            removed = table.expire()
+            if removed:
+                log.debug("%s: %d veraltete Einträge entfernt, %s",
+                          table.name, removed, table.stats())
+        self._log_counters(logging.DEBUG)
+
+    def _counters(self):
+        """
+        Sammelt die Zähler der Komponenten (Grundlage z.B. für die Cache-Größe)
+
+        ACL-Cache und Zulassung teilen sich alle Switches; ihre Zähler
+        gelten für den ganzen Controller.
+
+        Returns:
+            list: (Name, stats()-Dictionary)
+        """
+        counters = [("Kontrollkanal", self.buffers.stats()),
+                    ("Flow-Tabelle", self.flow_table.stats())]
+        if isinstance(self.acl, CachedACL):
+            counters.append(("ACL-Cache", self.acl.stats()))
+        if self.admission is not None:
+            counters.append(("Zulassung", self.admission.stats()))
+        return counters
+
+    def _log_counters(self, level=logging.INFO):
+        """
+        Schreibt die Zähler der Komponenten ins Log (eine Zeile pro Komponente)
+        """
+        if not log.isEnabledFor(level):
+            return
+        for name, stats in self._counters():
+            log.log(level, "%s an Switch %s: %s", name, self.connection.dpid, stats)
+
+    def _flush_log_stats(self):
+        """
+        Gibt die gesammelten Log-Zusammenfassungen aus (periodisch per Timer)
+        """
+        self.log_stats.flush()
+
+    def _handle_ConnectionDown(self, event):
+        """
+        Beendet die Timer, wenn die Verbindung zum Switch abbricht
+
+        Vorher gehen die Zähler der Komponenten ins Log.
+        """
+        self._log_counters()
+        for timer in (self._aging_timer, self._stats_timer, self._log_timer):
+            if timer is not None:
+                timer.cancel()
+        self._aging_timer = self._stats_timer = self._log_timer = None
+        self.log_stats.flush()
+        if self.flow_registry is not None:
+            self.flow_registry.clear()
+        self.flow_table.clear()
+        if self.elephants is not None:
+            self.elephants.clear()
+        self.hosts.remove_switch(self.connection.dpid)
+        if self.admission is not None:
+            self.admission.remove_switch(self.connection.dpid)
+
+    # --- Flow-Tabelle, Flow-Register und Elephants ---
+
+    def _is_duplicate_flow(self, msg):
+        """
+        Prüft, ob derselbe Flow-Mod gerade erst gesendet wurde
+
+        Mit aktivem Flow-Register meldet der Switch entfernte Flows
+        (OFPFF_SEND_FLOW_REM), damit das Register synchron bleibt.
+
+        Args:
+            msg: Zu sendender Flow-Mod
+
+        Returns:
+            bool: True, wenn statt des Flow-Mods ein PacketOut genügt
+        """
+        if self.flow_registry is None:
+            return False
+        msg.flags |= of.OFPFF_SEND_FLOW_REM
+        if not self.flow_registry.is_duplicate(msg):
+            return False
+        self.log_stats.count("Flow-Register: %d doppelte Flow-Mods durch PacketOut ersetzt")
+        return True
+
+    def _track_flow_mod(self, msg):
+        """
+        Verbucht einen Flow-Mod in der Flow-Tabelle
+
+        Je voller die Tabelle, desto kürzer die Timeouts. Oberhalb der
+        Verdrängungsschwelle werden vorher die am wenigsten wertvollen
+        Einträge (wenigste Bytes, älteste) per OFPFC_DELETE_STRICT entfernt.
+
+        Args:
+            msg: Zu sendender Flow-Mod (OFPFC_ADD)
+        """
+        table = self.flow_table
+        for entry in table.eviction_candidates():
+            self.sender.send(delete_flow(entry.match, entry.priority))
+            table.evicted(entry)
+            if self.flow_registry is not None:
+                self.flow_registry.removed(entry.match, entry.priority)
+            self.log_stats.count("Flow-Tabelle: %d Einträge verdrängt")
+        msg.idle_timeout, msg.hard_timeout = table.timeouts(msg.idle_timeout, msg.hard_timeout)
+        msg.flags |= of.OFPFF_SEND_FLOW_REM
+        table.added(msg.match, msg.priority, msg.idle_timeout, msg.hard_timeout)
+
+    def _handle_FlowRemoved(self, event):
+        """
+        Hält Flow-Register und Flow-Tabelle synchron mit dem Switch
+
+        Args:
+            event: OpenFlow FlowRemoved-Event
+        """
+        if self.flow_registry is not None:
+            self.flow_registry.removed(event.ofp.match, event.ofp.priority)
+        self.flow_table.removed(event.ofp.match, event.ofp.priority)
+
+    def _request_flow_stats(self):
+        """
+        Fragt die Flow-Statistik des Switches ab (periodisch per Timer)
+        """
+        self.flow_table.poll_started()
+        self.sender.send(of.ofp_stats_request(body=of.ofp_flow_stats_request()))
+
+    def _handle_FlowStatsReceived(self, event):
+        """
+        Gleicht die Buchführung über die Flow-Tabelle mit dem Switch ab
+        und wertet die Flow-Statistik für die Elephant-Erkennung aus
+
+        Args:
+            event: OpenFlow FlowStatsReceived-Event
+        """
+        stale = self.flow_table.sync(event.stats)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Flow-Tabelle: %d veraltete Einträge entfernt, %s",
+                      stale, self.flow_table.stats())
+        if self.stats_trace is not None:
+            self.stats_trace.write(self.connection.dpid, event.stats)
+        if self.elephants is not None:
+            self._classify_flows(event.stats)
+
+    def _classify_flows(self, flow_stats):
+        """
+        Installiert neue Elephants mit längeren Timeouts und fasst Mice
+        mit gleichem Ziel und gleichen Actions zu Wildcard-Flows zusammen
+
+        Drop-, Quarantäne- und permanente Flows bleiben, wie sie sind
+        (FlowRate.reinstallable); eine Sperre liefe sonst mit den
+        Elephant-Timeouts weiter.
+
+        Args:
+            flow_stats: Liste von ofp_flow_stats
+        """
+        promoted, _ = self.elephants.update(flow_stats)
+        for rate in promoted:
+            if not rate.reinstallable:
+                continue
+            msg = reinstall_flow(rate, ELEPHANT_IDLE_TIMEOUT, ELEPHANT_HARD_TIMEOUT)
+            self.flow_table.added(msg.match, msg.priority, msg.idle_timeout, msg.hard_timeout)
+            self.sender.send(msg)
+            self.log_stats.count("Elephants: %d Flows mit längeren Timeouts neu installiert")
+
+        for group in self.elephants.mouse_groups():
+            msg = aggregate_flow(group)
+            self._track_flow_mod(msg)
+            self.sender.send(msg)
+            for rate in group:
+                self.sender.send(delete_flow(rate.match, rate.priority))
+                self.flow_table.removed(rate.match, rate.priority)
+                if self.flow_registry is not None:
+                    self.flow_registry.removed(rate.match, rate.priority)
+                self.elephants.forget(rate)
+            self.log_stats.count("Elephants: %d Mice-Gruppen zu Wildcard-Flows zusammengefasst")
+
+    def _flood_packet(self, event, in_port):
+        """
+        Leitet Paket an alle Ports weiter (Flood)
+
+        Args:
+            event: OpenFlow-Event
+            in_port: Eingangsport (wird ausgeschlossen)
+        """
+        msg = of.ofp_packet_out()
+        self.buffers.attach(msg, event.ofp)
+        msg.actions.append(of.ofp_action_output(port=of.OFPP_FLOOD))
+        msg.in_port = in_port
+        self.sender.send(msg)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Paket geflutet von Port %s", in_port)
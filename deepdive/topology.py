@@ -0,0 +1,233 @@
+"""
+Topologie-Graph aus der LLDP-Erkennung mit kürzesten Wegen
+
+Der L3-Switch ging bisher davon aus, dass alle Subnetze direkt an einem
+Switch hängen. In der Enterprise-Topologie (r1 mit s1..s5) landet ein
+geroutetes Paket dadurch an jedem Switch auf dem Weg erneut als PacketIn
+beim Controller.
+
+Topology baut aus den LinkEvents von openflow.discovery einen gerichteten
+Graphen der Switches und hält für alle Paare die Entfernung und den
+nächsten Switch (Next-Hop) vor. Die Tabellen werden bei Link-Änderungen
+inkrementell angepasst statt neu berechnet:
+    - link_up(u → v): Für jedes Paar (s, t) wird geprüft, ob der Weg
+      s ⇝ u → v ⇝ t kürzer ist - O(n²) statt n Breitensuchen.
+    - link_down(u → v): Nur für Quellen, auf deren kürzesten Wegen der
+      Link liegen kann (d(s, v) == d(s, u) + 1), wird die Breitensuche
+      wiederholt.
+
+route() liefert damit für ein Ziel (Switch, Port) alle Switches eines
+Pfades mit ihrem Ausgangsport, sodass der Controller die Flows des
+ganzen Pfades auf einmal installieren kann. is_link_port() unterscheidet
+Ports zwischen Switches von Host-Ports (für die Host-Standorte).
+
+Beispiel:
+    topology = Topology()
+    topology.link_up(1, 4, 2, 1)     # dpid 1 Port 4 → dpid 2 Port 1
+    topology.route(1, 2, 3)          # [(1, 4), (2, 3)]
+"""
+
+from collections import deque
+
+
+class Topology(object):
+    """
+    Gerichteter Graph der Switches mit kürzesten Wegen aller Paare
+    """
+
+    def __init__(self):
+        self._links = {}   # (dpid, Nachbar) → Menge der Ausgangsports
+        self._adjacent = {}  # dpid → {Nachbar: Ausgangsport}
+        self._link_ports = set()  # (dpid, Port) beider Link-Enden
+        self._distance = {}  # Quelle → {Ziel: Hops}
+        self._next_hop = {}  # Quelle → {Ziel: nächster Switch}
+        self.version = 0     # Zählt Änderungen (z.B. für Caches der Controller)
+        self.recomputations = 0
+
+    def __len__(self):
+        return len(self._adjacent)
+
+    @property
+    def switches(self):
+        return list(self._adjacent)
+
+    def add_switch(self, dpid):
+        """
+        Nimmt einen Switch (noch ohne Links) in den Graphen auf
+        """
+        if dpid in self._adjacent:
+            return
+        self._adjacent[dpid] = {}
+        self._distance[dpid] = {dpid: 0}
+        self._next_hop[dpid] = {}
+
+    def link_up(self, dpid1, port1, dpid2, port2):
+        """
+        Verbucht einen erkannten Link dpid1:port1 → dpid2:port2
+
+        Returns:
+            bool: True, wenn sich der Graph geändert hat
+        """
+        self.add_switch(dpid1)
+        self.add_switch(dpid2)
+        self._link_ports.add((dpid1, port1))
+        self._link_ports.add((dpid2, port2))
+        ports = self._links.setdefault((dpid1, dpid2), set())
+        if port1 in ports:
+            return False
+        ports.add(port1)
+        self.version += 1
+        if dpid2 in self._adjacent[dpid1]:
+            # Paralleler Link: Wege bleiben gleich, nur der Port ist eindeutig
+            self._adjacent[dpid1][dpid2] = min(ports)
+            return True
+        self._adjacent[dpid1][dpid2] = port1
+        self._relax(dpid1, dpid2)
+        return True
+
+    def _relax(self, u, v):
+        """
+        Passt Entfernungen und Next-Hops nach einem neuen Link u → v an
+        """
+        distance = self._distance
+        from_v = distance[v]
+        for source, dist in distance.items():
+            to_u = dist.get(u)
+            if to_u is None:
+                continue
+            next_hops = self._next_hop[source]
+            first = v if source == u else next_hops[u]
+            for target, rest in list(from_v.items()):
+                candidate = to_u + 1 + rest
+                if candidate < dist.get(target, candidate + 1):
+                    dist[target] = candidate
+                    next_hops[target] = first
+
+    def link_down(self, dpid1, port1, dpid2, port2):
+        """
+        Verbucht einen ausgefallenen Link dpid1:port1 → dpid2:port2
+
+        Returns:
+            bool: True, wenn sich der Graph geändert hat
+        """
+        ports = self._links.get((dpid1, dpid2))
+        if not ports or port1 not in ports:
+            return False
+        ports.discard(port1)
+        self._link_ports.discard((dpid1, port1))
+        self._link_ports.discard((dpid2, port2))
+        self.version += 1
+        if ports:
+            self._adjacent[dpid1][dpid2] = min(ports)
+            return True
+        del self._links[(dpid1, dpid2)]
+        del self._adjacent[dpid1][dpid2]
+        affected = [source for source, dist in self._distance.items()
+                    if dpid1 in dist and dist.get(dpid2) == dist[dpid1] + 1]
+        for source in affected:
+            self._bfs(source)
+        return True
+
+    def remove_switch(self, dpid):
+        """
+        Entfernt einen Switch mit allen Links (z.B. nach ConnectionDown)
+        """
+        if dpid not in self._adjacent:
+            return
+        for (a, b) in list(self._links):
+            if dpid in (a, b):
+                del self._links[(a, b)]
+        self._link_ports = set(port for port in self._link_ports if port[0] != dpid)
+        del self._adjacent[dpid]
+        for neighbors in self._adjacent.values():
+            neighbors.pop(dpid, None)
+        del self._distance[dpid]
+        del self._next_hop[dpid]
+        self.version += 1
+        for source in list(self._adjacent):
+            self._bfs(source)
+
+    def _bfs(self, source):
+        """
+        Berechnet Entfernungen und Next-Hops einer Quelle neu
+        """
+        distance = {source: 0}
+        next_hops = {}
+        queue = deque([source])
+        while queue:
+            node = queue.popleft()
+            for neighbor in self._adjacent[node]:
+                if neighbor in distance:
+                    continue
+                distance[neighbor] = distance[node] + 1
+                next_hops[neighbor] = neighbor if node == source else next_hops[node]
+                queue.append(neighbor)
+        self._distance[source] = distance
+        self._next_hop[source] = next_hops
+        self.recomputations += 1
+
+    def is_link_port(self, dpid, port):
+        """
+        Prüft, ob an einem Port ein anderer Switch hängt
+        """
+        return (dpid, port) in self._link_ports
+
+    def distance(self, src, dst):
+        """
+        Anzahl Links zwischen zwei Switches (None = nicht erreichbar)
+        """
+        return self._distance.get(src, {}).get(dst)
+
+    def path(self, src, dst):
+        """
+        Switches auf dem kürzesten Weg von src nach dst (inklusive beider)
+
+        Returns:
+            list: dpids oder None, wenn dst nicht erreichbar ist
+        """
+        if src == dst:
+            return [src]
+        next_hops = self._next_hop.get(src)
+        if next_hops is None or dst not in next_hops:
+            return None
+        path = [src]
+        node = src
+        while node != dst:
+            node = self._next_hop[node][dst]
+            path.append(node)
+        return path
+
+    def route(self, src, dst, dst_port):
+        """
+        Ausgangsports aller Switches auf dem Weg zu einem Host-Port
+
+        Args:
+            src: Switch, an dem das Paket ankommt
+            dst: Switch, an dem der Ziel-Host hängt
+            dst_port: Port des Ziel-Hosts an dst
+
+        Returns:
+            list: (dpid, Ausgangsport) vom ersten bis zum letzten Switch
+                  oder None, wenn dst nicht erreichbar ist
+        """
+        path = self.path(src, dst)
+        if path is None:
+            return None
+        hops = [(node, self._adjacent[node][following])
+                for node, following in zip(path, path[1:])]
+        hops.append((dst, dst_port))
+        return hops
+
+    def stats(self):
+        """
+        Liefert Größe und Zähler des Graphen
+
+        Returns:
+            dict: switches, links, version, recomputations
+        """
+        return {
+            'switches': len(self._adjacent),
+            'links': len(self._links),
+            'version': self.version,
+            'recomputations': self.recomputations,
+        }
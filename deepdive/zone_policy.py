@@ -0,0 +1,195 @@
+"""
+Zonen-basierte Policy-Engine für datengetriebene Firewall-Regeln
+
+Die Sicherheitsrichtlinie wird als Regeldatei (JSON) beschrieben und einmalig
+beim Start des Controllers geladen. Die Regeln werden dabei nach Quell- und
+Zielzone vorsortiert: Für jedes Zonenpaar (z.B. DMZ → Extern) wird nur die
+kurze Liste der Regeln gespeichert, die für dieses Paar überhaupt passen
+können. Ein Lookup ist damit ein Dictionary-Zugriff plus ein kurzer Scan
+in der ursprünglichen Regelreihenfolge (erste passende Regel gewinnt).
+
+Aufbau der Regeldatei:
+    {
+      "default_action": "allow",
+      "zones": {"intern": "10.1.0.0/16", "dmz": "10.2.0.0/16", ...},
+      "rules": [
+        {"name": "...", "src": "10.3.0.0/16", "dst": "10.2.0.0/16",
+         "proto": "tcp", "dport": [80, 443], "action": "allow"},
+        ...
+      ]
+    }
+
+Die Felder einer Regel entsprechen den Argumenten von acl_compiler.Rule.
+
+Verwendung:
+    ~/pox/pox.py deepdive.l3_switch_with_firewall --policy=deepdive/enterprise_policy.json
+"""
+
+import json
+import os
+
+from .acl_compiler import (ALLOW, DENY, compute_widest_region, ip_to_int,
+                           parse_prefix, prefix_contains, prefixes_overlap,
+                           rule_from_dict)
+
+# Mitgelieferte Enterprise-Richtlinie (siehe enterprise_firewall_rules.py)
+ENTERPRISE_POLICY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                      'enterprise_policy.json')
+
+
+class ZonePolicy(object):
+    """
+    Regel-Engine mit Index nach (Quellzone, Zielzone)
+
+    Bietet dieselbe Schnittstelle wie acl_compiler.CompiledACL
+    (lookup, action_for, is_blocked) und kann daher direkt an die
+    Switch-Klassen übergeben werden.
+
+    Args:
+        zones: Dictionary Zonenname → Präfix
+        rules: Liste von Rule-Objekten (Reihenfolge = Priorität)
+        default_action: Aktion, wenn keine Regel passt
+    """
+
+    def __init__(self, zones, rules, default_action=ALLOW):
+        if default_action not in (ALLOW, DENY):
+            raise ValueError("Unbekannte Aktion: %r" % (default_action,))
+        self.rules = sorted(rules, key=lambda rule: -rule.priority)
+        self.default_action = default_action
+        self.zones = dict((name, parse_prefix(prefix)) for name, prefix in zones.items())
+
+        # Zonen-Lookup: ein Hash pro Präfixlänge, längste Präfixe zuerst
+        by_length = {}
+        for name, (net, length) in self.zones.items():
+            by_length.setdefault(length, {})[net >> (32 - length)] = name
+        self._zone_tables = [(32 - length, by_length[length])
+                             for length in sorted(by_length, reverse=True)]
+
+        # Regel-Index: (Quellzone, Zielzone) → Regeln in Originalreihenfolge.
+        # None steht für Adressen außerhalb aller Zonen.
+        names = list(self.zones) + [None]
+        self._index = {}
+        for src_zone in names:
+            for dst_zone in names:
+                self._index[(src_zone, dst_zone)] = [
+                    rule for rule in self.rules
+                    if self._may_match(rule.src, src_zone)
+                    and self._may_match(rule.dst, dst_zone)]
+
+    def _may_match(self, prefixes, zone_name):
+        """
+        Prüft ob Präfixe einer Regel Adressen aus einer Zone enthalten können
+        """
+        if prefixes is None:
+            return True
+        if zone_name is None:
+            # Außerhalb aller Zonen: nur Präfixe, die nicht komplett in einer Zone liegen
+            return any(not any(prefix_contains(zone, prefix) for zone in self.zones.values())
+                       for prefix in prefixes)
+        zone = self.zones[zone_name]
+        return any(prefixes_overlap(prefix, zone) for prefix in prefixes)
+
+    def zone_of(self, ip):
+        """
+        Ermittelt die Zone einer IP-Adresse
+
+        Args:
+            ip: IP-Adresse (IPAddr oder Integer)
+
+        Returns:
+            str: Zonenname oder None
+        """
+        ip = ip_to_int(ip)
+        for shift, table in self._zone_tables:
+            name = table.get(ip >> shift)
+            if name is not None:
+                return name
+        return None
+
+    def candidates(self, src_zone, dst_zone):
+        """
+        Liefert die Regeln, die für ein Zonenpaar in Frage kommen
+        """
+        return self._index[(src_zone, dst_zone)]
+
+    def lookup(self, src, dst, proto, dport):
+        """
+        Sucht die erste passende Regel
+
+        Args:
+            src: Quell-IP-Adresse (IPAddr oder Integer)
+            dst: Ziel-IP-Adresse (IPAddr oder Integer)
+            proto: Protokoll-ID
+            dport: Zielport oder None
+
+        Returns:
+            Rule: Passende Regel oder None (→ Standard-Aktion)
+        """
+        src = ip_to_int(src)
+        dst = ip_to_int(dst)
+        for rule in self._index[(self.zone_of(src), self.zone_of(dst))]:
+            if rule.matches(src, dst, proto, dport):
+                return rule
+        return None
+
+    def action_for(self, rule):
+        """
+        Liefert die Aktion eines Lookup-Ergebnisses (None → Standard-Aktion)
+        """
+        if rule is None:
+            return self.default_action
+        return rule.action
+
+    def is_blocked(self, src, dst, proto, dport):
+        """
+        Firewall-Entscheidung für ein Paket
+
+        Returns:
+            bool: True wenn das Paket blockiert werden soll
+        """
+        return self.action_for(self.lookup(src, dst, proto, dport)) == DENY
+
+    def widest_region(self, rule, src, dst, proto, dport):
+        """
+        Größte Region um das Paket mit derselben Entscheidung wie rule
+
+        Siehe acl_compiler.compute_widest_region().
+        """
+        return compute_widest_region(self, rule, src, dst, proto, dport)
+
+    def __len__(self):
+        return len(self.rules)
+
+
+def resolve_policy_path(path):
+    """
+    Löst einen Pfad zur Regeldatei auf
+
+    Relative Pfade werden zuerst relativ zum Arbeitsverzeichnis, dann relativ
+    zum Verzeichnis über diesem Paket gesucht (z.B. "deepdive/enterprise_policy.json"
+    beim Start aus einem beliebigen Verzeichnis).
+    """
+    if os.path.isabs(path) or os.path.exists(path):
+        return path
+    package_parent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    candidate = os.path.join(package_parent, path)
+    if os.path.exists(candidate):
+        return candidate
+    return path
+
+
+def load_policy(path=ENTERPRISE_POLICY_FILE):
+    """
+    Lädt eine Regeldatei und baut den Zonen-Index auf
+
+    Args:
+        path: Pfad zur JSON-Regeldatei
+
+    Returns:
+        ZonePolicy: Einsatzbereite Policy-Engine
+    """
+    with open(resolve_policy_path(path)) as f:
+        data = json.load(f)
+    rules = [rule_from_dict(entry) for entry in data.get('rules', [])]
+    return ZonePolicy(data.get('zones', {}), rules,
+                      data.get('default_action', ALLOW))
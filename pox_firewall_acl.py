@@ -1,16 +1,35 @@
 # Aufgabe B: SDN-Firewall mit statischer ACL
 #
 
+import logging
+
 from pox.core import core
 import pox.openflow.libopenflow_01 as of
 from pox.lib.packet import ethernet, ipv4, tcp, udp, icmp
 from pox.lib.addresses import IPAddr
+from pox.lib.recoco import Timer
+
+# Bausteine aus deepdive/: Regeldatei und weit gefasste Drop-Flows, FlowKey,
+# Flow-Register gegen doppelte Flow-Mods, buffer_id und Log-Zusammenfassungen
+from deepdive.flow_key import flow_key_from_packet
+from deepdive.flow_registry import FlowRegistry
+from deepdive.flow_utils import (BufferStats, drop_flow, match_from_region,
+                                 packet_out_from_flow_mod)
+from deepdive.hot_log import LogAggregator
+from deepdive.zone_policy import load_policy
 
 log = core.getLogger()
 
 class SimpleFirewall (object):
-    def __init__(self, connection):
+    def __init__(self, connection, acl=None):
         self.connection = connection
+        # optional: vorkompilierte ACL (z.B. aus deepdive/acl_compiler.py)
+        self.acl = acl
+        self.log_stats = LogAggregator(log)
+        # Zusammenfassungen auch ausgeben, wenn nach einem Burst nichts mehr kommt
+        self._log_timer = Timer(self.log_stats.interval, self._flush_log_stats, recurring=True)
+        self.flow_registry = FlowRegistry()
+        self.buffers = BufferStats()
         connection.addListeners(self)
         log.info("Firewall-Controller verbunden mit %s", connection)
 
@@ -21,42 +40,37 @@ class SimpleFirewall (object):
             log.warning("Unverständliches Paket")
             return
 
-        ip_packet = packet.find('ipv4')
-        if ip_packet is None:
+        fields = self._extract_fields(packet, event.port)
+        if fields is None:
             # Kein IP-Paket z. B. ARP -> durchlassen
             self._allow_packet(event)
             return
-
-        # --- relevante Felder extrahieren ---
-        # hier werden Quell-/Ziel-IP, Protokoll, Ports aus dem IP-Paket extrahiert
-        src_ip = ip_packet.srcip
-        dst_ip = ip_packet.dstip
-        proto = ip_packet.protocol
-
-        src_port = None
-        dst_port = None
-
-        if proto == ipv4.ICMP_PROTOCOL:
-            pass  # ICMP -> keine Ports
-        elif proto == ipv4.TCP_PROTOCOL:
-            tcp_packet = packet.find('tcp')
-            if tcp_packet:
-                src_port = tcp_packet.srcport
-                dst_port = tcp_packet.dstport
-        elif proto == ipv4.UDP_PROTOCOL:
-            udp_packet = packet.find('udp')
-            if udp_packet:
-                src_port = udp_packet.srcport
-                dst_port = udp_packet.dstport
+        src_ip, dst_ip, proto, dst_port = fields
 
         # --- Entscheidung gemäß ACL ---
         if self.is_blocked(src_ip, dst_ip, proto, dst_port):
-            log.info("Blockiert: %s -> %s (proto %s, port %s)", src_ip, dst_ip, proto, dst_port)
+            self._log_decision("Blockiert", src_ip, dst_ip, proto, dst_port)
+            self._block_packet(src_ip, dst_ip, proto, dst_port)
             return  # Paket wird nicht weitergeleitet
         else:
-            log.info("Erlaubt: %s -> %s (proto %s, port %s)", src_ip, dst_ip, proto, dst_port)
+            self._log_decision("Erlaubt", src_ip, dst_ip, proto, dst_port)
             self._allow_packet(event)
 
+    def _extract_fields(self, packet, in_port):
+        # --- relevante Felder extrahieren ---
+        # Quell-/Ziel-IP, Protokoll und Zielport in einem Durchlauf (deepdive/flow_key.py)
+        # Rückgabe: (src_ip, dst_ip, proto, dst_port) oder None, wenn es kein IP-Paket ist
+        key = flow_key_from_packet(packet, in_port)
+        if not key.is_ip or key.ip_src is None:
+            return None
+        return key.src_ip, key.dst_ip, key.proto, key.dport
+
+    def _log_decision(self, decision, src, dst, proto, dport):
+        # eine Zusammenfassung pro Sekunde, einzelne Pakete nur mit --DEBUG
+        self.log_stats.count(decision + ": %d Pakete %s -> %s (proto %s)", src, dst, proto)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("%s: %s -> %s (proto %s, port %s)", decision, src, dst, proto, dport)
+
     # --- Statische ACL ---
     # TODO: in der Methode "is_blocked" sollt ihr Regeln festlegen
     """
@@ -75,6 +89,10 @@ class SimpleFirewall (object):
         print("Adresse liegt im Subnetz")
     """
     def is_blocked(self, src, dst, proto, dport):
+        # Falls eine vorkompilierte ACL übergeben wurde, entscheidet diese
+        if self.acl is not None:
+            return self.acl.is_blocked(src, dst, proto, dport)
+
         # hier Regeln definieren nach folgendem Muster:
         # if <Bedingung> and <weitere Bedingung>:
         #     return True  # True: Paket blockieren, False: Paket erlauben
@@ -83,17 +101,65 @@ class SimpleFirewall (object):
 
         return False
 
+    def _block_packet(self, src, dst, proto, dport):
+        # Drop-Flow installieren, damit weitere Pakete direkt im Switch
+        # verworfen werden und nicht erneut beim Controller landen.
+        # Die Entscheidung hängt nur von src, dst, proto und dport ab - alle
+        # anderen Felder (z.B. der Quellport) bleiben Wildcards.
+        if self.acl is not None:
+            # Regeldatei (--policy): so weit fassen, wie es die Regel erlaubt
+            rule = self.acl.lookup(src, dst, proto, dport)
+            region = self.acl.widest_region(rule, src, dst, proto, dport)
+            if region is not None:
+                self.connection.send(drop_flow(match_from_region(region)))
+                return
+        msg = of.ofp_flow_mod()
+        msg.match = of.ofp_match(dl_type=ethernet.IP_TYPE, nw_proto=proto)
+        msg.match.nw_src = src
+        msg.match.nw_dst = dst
+        if dport is not None:
+            msg.match.tp_dst = dport
+        msg.idle_timeout = 30
+        msg.hard_timeout = 300
+        # Keine Actions = Drop
+        self.connection.send(msg)
+
     def _allow_packet(self, event):
         # Flow installieren, damit das Paket durchgeht
         msg = of.ofp_flow_mod()
         msg.match = of.ofp_match.from_packet(event.parsed)
         msg.idle_timeout = 30
         msg.actions.append(of.ofp_action_output(port=of.OFPP_FLOOD))
-        msg.data = event.ofp
+        self.buffers.attach(msg, event.ofp)
+        # Gleicher Flow gerade erst installiert -> nur das Paket weiterleiten
+        msg.flags |= of.OFPFF_SEND_FLOW_REM
+        if self.flow_registry.is_duplicate(msg):
+            msg = packet_out_from_flow_mod(msg, event.port)
         self.connection.send(msg)
 
-def launch():
+    def _flush_log_stats(self):
+        # periodisch per Timer: letzte Zusammenfassungen ausgeben
+        self.log_stats.flush()
+
+    def _handle_ConnectionDown(self, event):
+        if self._log_timer is not None:
+            self._log_timer.cancel()
+            self._log_timer = None
+            self.log_stats.flush()
+        self.flow_registry.clear()
+
+    def _handle_FlowRemoved(self, event):
+        # Flow-Register synchron zur Flow-Tabelle des Switches halten
+        self.flow_registry.removed(event.ofp.match, event.ofp.priority)
+
+def launch(policy=None):
+    # optional: --policy=deepdive/enterprise_policy.json ersetzt is_blocked durch die Regeldatei
+    acl = None
+    if policy:
+        acl = load_policy(policy)
+        log.info("Regeldatei %s geladen: %d Regeln", policy, len(acl))
+
     def start_switch(event):
         log.info("Starte Firewall auf %s", event.connection)
-        SimpleFirewall(event.connection)
+        SimpleFirewall(event.connection, acl)
     core.openflow.addListenerByName("ConnectionUp", start_switch)
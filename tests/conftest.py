@@ -0,0 +1,13 @@
+"""
+Gemeinsame Einstellungen der Tests
+
+Die Tests laufen ohne Controller und ohne Mininet. Module, die POX
+brauchen, werden per pytest.importorskip("pox") übersprungen, wenn POX
+nicht im PYTHONPATH liegt (z.B. PYTHONPATH=~/pox python -m pytest).
+"""
+
+import os
+import sys
+
+# deepdive und pox_firewall_acl aus dem Repository importieren
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,58 @@
+"""
+Tests für acl_cache.py: Invalidierung per Generation und LRU-Verdrängung
+"""
+
+from deepdive.acl_compiler import ALLOW, DENY, Rule, compile_rules, ip_to_int
+from deepdive.acl_cache import CachedACL
+
+SRC = ip_to_int("10.1.1.10")
+DST = ip_to_int("10.2.1.20")
+
+
+def make_acl(action=DENY):
+    return compile_rules([Rule(src="10.1.0.0/16", dst="10.2.0.0/16", proto="tcp", dport=22,
+                               action=action, name="SSH")])
+
+
+def test_repeated_lookups_hit_the_cache():
+    acl = make_acl()
+    cache = CachedACL(acl)
+    assert cache.lookup(SRC, DST, 6, 22) is acl.rules[0]
+    assert cache.lookup(SRC, DST, 6, 22) is acl.rules[0]
+    assert cache.lookup(SRC, DST, 6, 80) is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['size']) == (1, 2, 2)
+
+
+def test_set_acl_starts_a_new_generation():
+    cache = CachedACL(make_acl(DENY))
+    assert cache.is_blocked(SRC, DST, 6, 22)
+    new = make_acl(ALLOW)
+    cache.set_acl(new)
+    assert cache.generation == 1
+    # Der alte Eintrag liegt noch im Cache, gilt aber nicht mehr
+    assert cache.lookup(SRC, DST, 6, 22) is new.rules[0]
+    assert not cache.is_blocked(SRC, DST, 6, 22)
+    assert (cache.stats()['hits'], cache.stats()['misses']) == (1, 2)
+
+
+def test_invalidate_forces_a_new_lookup():
+    cache = CachedACL(make_acl())
+    cache.lookup(SRC, DST, 6, 22)
+    cache.invalidate()
+    cache.lookup(SRC, DST, 6, 22)
+    assert cache.stats()['misses'] == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = CachedACL(make_acl(), max_entries=2)
+    cache.lookup(SRC, DST, 6, 22)
+    cache.lookup(SRC, DST, 6, 80)
+    cache.lookup(SRC, DST, 6, 22)      # 22 wieder zuletzt benutzt
+    cache.lookup(SRC, DST, 6, 443)     # verdrängt 80
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['size'] == 2
+    cache.lookup(SRC, DST, 6, 22)
+    assert cache.stats()['hits'] == 2
+    cache.lookup(SRC, DST, 6, 80)
+    assert cache.stats()['misses'] == 4
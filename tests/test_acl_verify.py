@@ -0,0 +1,93 @@
+"""
+Tests für acl_verify.py: Befunde der Regeldatei und Gegenprobe mit Paketen
+"""
+
+import itertools
+import random
+
+from deepdive.acl_compiler import ALLOW, DENY, Rule, compile_rules, ip_to_int, prefix_mask
+from deepdive.acl_verify import CONFLICT, REDUNDANT, SHADOWED, analyze, random_rules, summary
+from deepdive.zone_policy import ENTERPRISE_POLICY_FILE, load_policy
+
+
+def test_enterprise_policy_rules_9_and_10_are_shadowed():
+    policy = load_policy(ENTERPRISE_POLICY_FILE)
+    findings = analyze(policy)
+    shadowed = [finding.rule.name for finding in findings if finding.kind == SHADOWED]
+    assert [name for name in shadowed if name.startswith(("Regel 9:", "Regel 10:"))] == [
+        "Regel 9: MySQL von Anwendungs-Servern",
+        "Regel 9: MySQL sonst blockieren",
+        "Regel 10: PostgreSQL von Anwendungs-Servern",
+        "Regel 10: PostgreSQL sonst blockieren",
+    ]
+    assert summary(findings) == {SHADOWED: 7, REDUNDANT: 1, CONFLICT: 15}
+
+
+def test_handwritten_findings():
+    acl = compile_rules([
+        Rule(src="10.1.0.0/16", action=DENY, name="Büro gesperrt"),
+        Rule(src="10.1.1.0/24", action=ALLOW, name="verdeckt"),
+        Rule(src="10.1.2.0/24", action=DENY, name="redundant"),
+        Rule(dst="10.2.0.0/16", proto="tcp", dport=80, action=DENY, name="Web"),
+        Rule(src="10.3.0.0/16", action=ALLOW, name="erlaubt ohnehin"),
+    ])
+    findings = dict((finding.rule.name, finding) for finding in analyze(acl))
+    assert findings["verdeckt"].kind == SHADOWED
+    assert findings["verdeckt"].others == [0]
+    assert findings["redundant"].kind == REDUNDANT
+    assert findings["erlaubt ohnehin"].kind == REDUNDANT
+    assert findings["erlaubt ohnehin"].others == [None]
+    # Web überschneidet Büro gesperrt nur teilweise, ist aber gleiche Aktion
+    assert "Web" not in findings
+    assert "Büro gesperrt" not in findings
+
+
+def test_exception_before_general_rule_is_no_conflict():
+    acl = compile_rules([
+        Rule(src="10.1.1.10/32", dst="10.2.0.0/16", action=ALLOW, name="Ausnahme"),
+        Rule(src="10.1.0.0/16", dst="10.2.0.0/16", action=DENY, name="allgemein"),
+        Rule(src="10.1.0.0/16", proto="tcp", action=ALLOW, name="teilweise"),
+    ], default_action=DENY)
+    findings = dict((finding.rule.name, finding) for finding in analyze(acl))
+    assert "allgemein" not in findings
+    # TCP aus dem Büro: allgemein und teilweise enthalten einander nicht
+    assert findings["teilweise"].kind == CONFLICT
+    assert findings["teilweise"].others == [1]
+
+
+def addresses(rules, rng, count):
+    """Erster und letzter Host jedes Präfixes der Regeln, dazu Zufallsadressen"""
+    result = set()
+    for rule in rules:
+        for net, length in (rule.src or ()) + (rule.dst or ()):
+            last = net | (~prefix_mask(length) & 0xffffffff)
+            result.update((net, last))
+    result.update((10 << 24) | rng.getrandbits(24) for _ in range(count))
+    return sorted(result)
+
+
+def test_findings_agree_with_packet_decisions():
+    rng = random.Random(1)
+    acl = compile_rules(random_rules(40, seed=3))
+    ips = addresses(acl.rules, rng, 20)
+    ips = rng.sample(ips, min(len(ips), 60)) + [ip_to_int("192.168.1.1")]
+    packets = [(6, port) for port in (22, 53, 80, 443, 3306, 8080)] + [(17, 53), (1, None)]
+    first = {}
+    for src, dst in itertools.product(ips, ips):
+        for proto, dport in packets:
+            rule = acl.lookup(src, dst, proto, dport)
+            first[(src, dst, proto, dport)] = rule
+
+    findings = analyze(acl)
+    assert findings
+    hit = set(id(rule) for rule in first.values())
+    for finding in findings:
+        if finding.kind == SHADOWED:
+            assert id(finding.rule) not in hit, finding.rule
+        if finding.kind in (SHADOWED, REDUNDANT):
+            # Ohne die Regel entscheidet die ACL für jedes Paket gleich
+            reduced = compile_rules([rule for rule in acl.rules if rule is not finding.rule],
+                                    acl.default_action)
+            for (src, dst, proto, dport), rule in first.items():
+                assert reduced.is_blocked(src, dst, proto, dport) == (
+                    acl.action_for(rule) == DENY)
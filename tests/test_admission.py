@@ -0,0 +1,68 @@
+"""
+Tests für admission.py: Token-Buckets, Quarantäne und ausgenommene Ports
+"""
+
+from deepdive.admission import (ADMIT, DROP, QUARANTINE_PORT, QUARANTINE_SOURCE,
+                                AdmissionControl)
+
+
+def make_control(**options):
+    settings = dict(port_rate=10.0, port_burst=5, source_rate=1.0, source_burst=2,
+                    quarantine_time=10.0, clock=lambda: 0.0)
+    settings.update(options)
+    return AdmissionControl(**settings)
+
+
+def test_noisy_source_is_quarantined():
+    control = make_control()
+    verdicts = [control.check(1, 1, 'a', now=0.0) for _ in range(4)]
+    assert verdicts == [ADMIT, ADMIT, QUARANTINE_SOURCE, DROP]
+    # Andere Quellen am selben Port sind nicht betroffen
+    assert control.check(1, 1, 'b', now=0.0) == ADMIT
+    # Nach der Quarantäne hat der Bucket wieder Tokens
+    assert control.check(1, 1, 'a', now=10.0) == ADMIT
+    stats = control.stats()
+    assert (stats['admitted'], stats['dropped'], stats['quarantined_sources']) == (4, 2, 1)
+
+
+def test_flood_with_new_sources_quarantines_the_port():
+    control = make_control()
+    verdicts = [control.check(1, 1, source, now=0.0) for source in range(7)]
+    assert verdicts == [ADMIT] * 5 + [QUARANTINE_PORT, DROP]
+    assert control.check(1, 2, 'x', now=0.0) == ADMIT
+    assert control.check(2, 1, 'y', now=0.0) == ADMIT
+    assert control.check(1, 1, 'z', now=9.9) == DROP
+    assert control.check(1, 1, 'z', now=10.0) == ADMIT
+
+
+def test_tokens_refill_with_the_rate():
+    control = make_control()
+    assert [control.check(1, 1, 'a', now=0.0) for _ in range(2)] == [ADMIT, ADMIT]
+    assert control.check(1, 1, 'a', now=1.0) == ADMIT
+    assert control.check(1, 1, 'a', now=1.0) == QUARANTINE_SOURCE
+
+
+def test_exempt_port_lifts_the_new_quarantine():
+    control = make_control()
+    for source in range(5):
+        control.check(1, 1, source, now=0.0)
+    assert control.check(1, 1, 5, now=0.0) == QUARANTINE_PORT
+    control.exempt_port(1, 1)
+    stats = control.stats()
+    assert (stats['admitted'], stats['dropped'], stats['quarantined_ports']) == (6, 0, 0)
+    assert stats['exempt_ports'] == 1
+    # Ab jetzt gelten am Port nur noch die Quell-Buckets
+    assert all(control.check(1, 1, source, now=0.0) == ADMIT for source in range(6, 50))
+    assert control.check(1, 1, 6, now=0.0) == ADMIT
+    assert control.check(1, 1, 6, now=0.0) == QUARANTINE_SOURCE
+
+
+def test_remove_switch_forgets_ports_and_quarantine():
+    control = make_control()
+    for source in range(6):
+        control.check(1, 1, source, now=0.0)
+    control.exempt_port(1, 2)
+    control.remove_switch(1)
+    stats = control.stats()
+    assert (stats['quarantine'], stats['exempt_ports']) == (0, 0)
+    assert control.check(1, 1, 'new', now=0.0) == ADMIT
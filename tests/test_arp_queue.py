@@ -0,0 +1,45 @@
+"""
+Tests für arp_queue.py: Grenzen pro IP und insgesamt, Timeout
+"""
+
+from deepdive.arp_queue import PendingArpQueue
+
+IP_A = "10.1.1.10"
+IP_B = "10.1.1.11"
+
+
+def test_only_the_first_packet_triggers_a_request():
+    pending = PendingArpQueue(clock=lambda: 0.0)
+    assert pending.add(IP_A, 'a1')
+    assert not pending.add(IP_A, 'a2')
+    assert pending.add(IP_B, 'b1')
+    assert pending.pop(IP_A) == ['a1', 'a2']
+    assert pending.pop(IP_A) == []
+    stats = pending.stats()
+    assert (stats['requests'], stats['coalesced'], stats['released']) == (2, 1, 2)
+    assert (stats['pending'], stats['queued']) == (1, 1)
+
+
+def test_packets_beyond_the_limits_are_dropped():
+    pending = PendingArpQueue(max_per_ip=2, max_total=3, clock=lambda: 0.0)
+    for item in range(4):
+        pending.add(IP_A, item)
+    pending.add(IP_B, 'b1')
+    pending.add(IP_B, 'b2')
+    assert pending.stats()['dropped'] == 3
+    assert pending.pop(IP_A) == [0, 1]
+    assert pending.pop(IP_B) == ['b1']
+    assert pending.stats()['queued'] == 0
+
+
+def test_unanswered_requests_expire():
+    pending = PendingArpQueue(timeout=1.0, clock=lambda: 0.0)
+    pending.add(IP_A, 'a1', now=0.0)
+    pending.add(IP_B, 'b1', now=0.5)
+    assert pending.expire(now=1.2) == 1
+    assert IP_A not in pending and IP_B in pending
+    # Nach dem Timeout löst ein neues Paket wieder einen Request aus
+    assert pending.add(IP_A, 'a2', now=1.2)
+    assert pending.pop(IP_B, now=1.6) == []
+    assert pending.stats()['expired'] == 2
+    assert pending.pop(IP_A, now=1.6) == ['a2']
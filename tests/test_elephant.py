@@ -0,0 +1,69 @@
+"""
+Tests für elephant.py: Drop- und Quarantäne-Flows werden weder neu
+installiert noch zu Mice-Gruppen zusammengefasst
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from deepdive.admission import QUARANTINE_PRIORITY
+from deepdive.elephant import ElephantDetector, TraceAction, TraceMatch, TraceStat
+
+OUTPUT = [TraceAction(b'\x00\x00\x00\x08\x00\x02\xff\xff')]
+
+
+def mouse(tp_src, priority=100, actions=OUTPUT, idle_timeout=30, hard_timeout=300):
+    fields = dict(dl_type=0x0800, nw_proto=6, nw_src='10.0.1.10', nw_dst='10.0.2.20',
+                  tp_src=tp_src, tp_dst=80)
+    match = TraceMatch(("%d/%d" % (tp_src, priority)).encode(), fields)
+    return TraceStat(match, priority, 1, 100, 1, 0, idle_timeout, hard_timeout, actions)
+
+
+def test_mice_with_same_actions_are_grouped():
+    detector = ElephantDetector(threshold=0)
+    detector.update([mouse(port) for port in range(40000, 40004)], now=1.0)
+    groups = detector.mouse_groups()
+    assert len(groups) == 1
+    assert len(groups[0]) == 4
+
+
+@pytest.mark.parametrize('options', [
+    dict(actions=[]),
+    dict(priority=QUARANTINE_PRIORITY),
+    dict(idle_timeout=0, hard_timeout=0),
+])
+def test_drop_quarantine_and_permanent_flows_are_not_grouped(options):
+    detector = ElephantDetector(threshold=0)
+    detector.update([mouse(port, **options) for port in range(40000, 40004)], now=1.0)
+    assert detector.mouse_groups() == []
+    assert not any(rate.reinstallable for rate in detector)
+
+
+def test_drop_flows_are_promoted_but_not_reinstallable():
+    detector = ElephantDetector(threshold=50)
+    promoted, _ = detector.update([mouse(40000, actions=[]),
+                                   mouse(40001, priority=QUARANTINE_PRIORITY, actions=[]),
+                                   mouse(40002)], now=1.0)
+    assert len(promoted) == 3
+    assert [rate.match.tp_src for rate in promoted if rate.reinstallable] == [40002]
+
+
+def test_classify_flows_leaves_drop_and_quarantine_flows_alone():
+    pytest.importorskip('pox')
+    from deepdive.flow_table import FlowTableAccountant
+    from deepdive.switch_base import SwitchBase
+
+    sent = []
+    switch = SimpleNamespace(
+        elephants=ElephantDetector(threshold=50),
+        flow_table=FlowTableAccountant(),
+        flow_registry=None,
+        sender=SimpleNamespace(send=sent.append),
+        log_stats=SimpleNamespace(count=lambda *args: None),
+        _track_flow_mod=lambda msg: None)
+    flows = [mouse(port, actions=[]) for port in range(40000, 40004)]
+    flows += [mouse(port, priority=QUARANTINE_PRIORITY, actions=[], hard_timeout=10)
+              for port in range(41000, 41004)]
+    SwitchBase._classify_flows(switch, flows)
+    assert sent == []
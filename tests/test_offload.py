@@ -0,0 +1,127 @@
+"""
+Tests für offload.py: Entscheidung, Reihenfolge pro Flow und Ergebnisse
+nach einem Regelwechsel
+"""
+
+import threading
+import time
+
+from deepdive.acl_compiler import ALLOW, DENY, Rule, compile_rules, ip_to_int
+from deepdive.offload import PolicyOffload, evaluate
+from deepdive.routing_table import RoutingTable
+
+SRC = ip_to_int("10.1.1.10")
+DST = ip_to_int("10.2.1.20")
+
+
+def make_acl():
+    return compile_rules([
+        Rule(src="10.1.0.0/16", dst="10.2.0.0/16", proto="tcp", dport=22, action=DENY,
+             name="kein SSH"),
+        Rule(src="10.1.0.0/16", dst="10.2.0.0/16", action=ALLOW, name="Büro → Server"),
+    ])
+
+
+def make_routes():
+    table = RoutingTable()
+    table.add("10.1.1.0/24")
+    table.add("10.2.1.0/24")
+    return table
+
+
+class SlowACL(object):
+    """
+    ACL, deren erster Lookup wartet, bis der Test ihn freigibt
+    """
+
+    def __init__(self, acl):
+        self.acl = acl
+        self.release = threading.Event()
+        self._first = True
+        self._lock = threading.Lock()
+
+    @property
+    def rules(self):
+        return self.acl.rules
+
+    def lookup(self, *args):
+        with self._lock:
+            first, self._first = self._first, False
+        if first:
+            self.release.wait(5)
+        return self.acl.lookup(*args)
+
+    def widest_region(self, *args):
+        return self.acl.widest_region(*args)
+
+    def action_for(self, rule):
+        return self.acl.action_for(rule)
+
+
+def test_evaluate_restricts_allowed_region_to_source_subnet():
+    acl = make_acl()
+    blocked = evaluate(acl, make_routes(), SRC, DST, 6, 22)
+    assert blocked.blocked
+    assert blocked.rule is acl.rules[0]
+    allowed = evaluate(acl, make_routes(), SRC, DST, 6, 80)
+    assert not allowed.blocked
+    assert allowed.region.src == (ip_to_int("10.1.1.0"), 24)
+    assert allowed.region.dst == (DST, 32)
+
+
+def test_results_map_back_to_rules_of_the_event_loop():
+    acl = make_acl()
+    offload = PolicyOffload(acl, make_routes(), workers=2)
+    decisions = []
+    try:
+        offload.submit('flow', (SRC, DST, 6, 22), decisions.append)
+        offload.submit('other', (SRC, DST, 6, 80), decisions.append)
+        offload.drain(block=True)
+    finally:
+        offload.shutdown()
+    assert set(id(decision.rule) for decision in decisions) == set(map(id, acl.rules))
+
+
+def test_callbacks_of_one_flow_run_in_submission_order():
+    acl = SlowACL(make_acl())
+    offload = PolicyOffload(acl, make_routes(), workers=2)
+    order = []
+    try:
+        # Die erste Aufgabe hängt, die zweite desselben Flows wird vorher fertig
+        offload.submit('flow', (SRC, DST, 6, 80), lambda decision: order.append(1))
+        offload.submit('flow', (SRC, DST, 6, 80), lambda decision: order.append(2))
+        offload.submit('other', (SRC, DST, 6, 22), lambda decision: order.append('other'))
+        deadline = time.time() + 5
+        while not (order and offload._lanes['flow'][1].future.done()):
+            assert time.time() < deadline
+            offload.drain()
+            time.sleep(0.01)
+        offload.drain()
+        assert order == ['other']
+        acl.release.set()
+        offload.drain(block=True)
+    finally:
+        acl.release.set()
+        offload.shutdown()
+    assert order == ['other', 1, 2]
+    assert len(offload) == 0
+
+
+def test_results_from_an_older_acl_are_dropped():
+    offload = PolicyOffload(make_acl(), make_routes(), workers=1)
+    decisions = []
+    try:
+        offload.submit('flow', (SRC, DST, 6, 22), decisions.append)
+        offload.submit('flow', (SRC, DST, 6, 22), decisions.append)
+        # Regelwechsel, bevor drain() die Ergebnisse abholt
+        offload.generation += 1
+        offload.drain(block=True)
+        new = compile_rules([Rule(src="10.1.0.0/16", action=ALLOW, name="alles")])
+        offload.set_acl(new)
+        offload.submit('flow', (SRC, DST, 6, 22), decisions.append)
+        offload.drain(block=True)
+    finally:
+        offload.shutdown()
+    assert decisions[:2] == [None, None]
+    assert decisions[2].rule is new.rules[0]
+    assert offload.stats()['stale'] == 2
@@ -0,0 +1,68 @@
+"""
+Tests für policy_reload.py: welche installierten Flows ein Regelwechsel betrifft
+"""
+
+from deepdive.acl_compiler import ALLOW, DENY, Region, Rule, compile_rules, parse_prefix
+from deepdive.policy_reload import PolicyDiff
+
+OFFICE = "10.1.0.0/16"
+SERVERS = "10.2.0.0/16"
+
+
+def make_rules():
+    return [
+        Rule(src=OFFICE, dst=SERVERS, proto="tcp", dport=22, action=DENY, name="kein SSH"),
+        Rule(src=OFFICE, dst=SERVERS, proto="tcp", dport=80, action=ALLOW, name="Web"),
+        Rule(dst=SERVERS, action=DENY, name="Server sonst blockieren"),
+    ]
+
+
+def region(src, dst, proto=6, dport=None):
+    return Region(parse_prefix(src), parse_prefix(dst), proto, dport)
+
+
+def test_unchanged_policy_changes_nothing():
+    diff = PolicyDiff(compile_rules(make_rules()), compile_rules(make_rules()))
+    assert not diff
+    assert not diff.changed(region("10.1.1.10/32", "10.2.1.20/32", 6, 22))
+
+
+def test_only_flows_in_the_changed_region_are_reported():
+    rules = make_rules()
+    rules[0] = Rule(src=OFFICE, dst=SERVERS, proto="tcp", dport=22, action=ALLOW,
+                    name="SSH erlaubt")
+    diff = PolicyDiff(compile_rules(make_rules()), compile_rules(rules))
+    assert (len(diff.removed), len(diff.added)) == (1, 1)
+    assert diff.changed(region("10.1.1.10/32", "10.2.1.20/32", 6, 22))
+    assert not diff.changed(region("10.1.1.10/32", "10.2.1.20/32", 6, 80))
+    assert not diff.changed(region("10.3.1.10/32", "10.2.1.20/32", 6, 22))
+
+
+def test_same_verdict_over_the_region_is_not_a_change():
+    rules = make_rules()
+    # Verschobene Grenze, Entscheidung für den Flow bleibt DENY
+    rules[0] = Rule(src="10.1.1.0/24", dst=SERVERS, proto="tcp", dport=22, action=DENY,
+                    name="kein SSH aus 10.1.1.0/24")
+    diff = PolicyDiff(compile_rules(make_rules()), compile_rules(rules))
+    flow = region("10.1.2.10/32", "10.2.1.20/32", 6, 22)
+    assert diff.affects(flow)
+    assert not diff.changed(flow)
+
+
+def test_region_that_is_no_longer_uniform_is_a_change():
+    rules = make_rules()
+    rules.insert(0, Rule(src="10.1.1.10/32", dst=SERVERS, proto="tcp", dport=80,
+                         action=DENY, name="Host gesperrt"))
+    diff = PolicyDiff(compile_rules(make_rules()), compile_rules(rules))
+    # Ein Flow, der bisher für ganz 10.1.1.0/24 installiert war
+    assert diff.changed(region("10.1.1.0/24", "10.2.1.20/32", 6, 80))
+    assert not diff.changed(region("10.1.2.0/24", "10.2.1.20/32", 6, 80))
+
+
+def test_changed_default_action_affects_every_flow():
+    old = compile_rules(make_rules())
+    new = compile_rules(make_rules(), default_action=DENY)
+    diff = PolicyDiff(old, new)
+    assert diff.default_changed
+    assert diff.changed(region("10.3.1.10/32", "10.4.1.20/32", 17, 53))
+    assert not diff.changed(region("10.1.1.10/32", "10.2.1.20/32", 6, 22))
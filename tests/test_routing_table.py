@@ -0,0 +1,58 @@
+"""
+Tests für routing_table.py: Longest-Prefix-Match gegen den linearen Scan
+"""
+
+import random
+
+from deepdive.acl_compiler import int_to_ip, ip_to_int
+from deepdive.routing_table import RoutingTable, _linear_scan
+
+
+def test_lookup_matches_linear_scan_over_gateway_subnets():
+    rng = random.Random(1)
+    gateways = []
+    table = RoutingTable()
+    for _ in range(300):
+        net = (10 << 24) | (rng.getrandbits(16) << 8)
+        gw_ip = int_to_ip(net | 254)
+        gw_mac = "00:aa:00:%02x:%02x:01" % ((net >> 16) & 0xff, (net >> 8) & 0xff)
+        if table.lookup(net) is None:
+            gateways.append((gw_ip, gw_mac))
+            table.add((net, 24), gateway_ip=gw_ip, gateway_mac=gw_mac)
+    targets = [(ip_to_int(gw_ip) & ~0xff) | rng.randint(1, 253) for gw_ip, _ in gateways]
+    targets += [(10 << 24) | rng.getrandbits(24) for _ in range(2000)]
+    for ip in targets:
+        route = table.lookup(ip)
+        expected = _linear_scan(gateways, ip)
+        assert (route.gateway_mac if route is not None else None) == expected
+
+
+def test_most_specific_route_wins():
+    table = RoutingTable()
+    default = table.add("0.0.0.0/0", next_hop="10.0.0.1")
+    wide = table.add("10.1.0.0/16")
+    narrow = table.add("10.1.2.0/24")
+    host = table.add("10.1.2.3/32")
+    assert table.lookup("10.1.2.3") is host
+    assert table.lookup("10.1.2.4") is narrow
+    assert table.lookup("10.1.3.4") is wide
+    assert table.lookup("192.168.1.1") is default
+    assert table.routes()[0] is host
+
+
+def test_next_hop_takes_gateway_of_connected_subnet():
+    table = RoutingTable()
+    table.add("10.1.1.0/24", gateway_ip=ip_to_int("10.1.1.254"), gateway_mac="00:aa:00:00:01:01")
+    route = table.add("10.9.0.0/16", next_hop="10.1.1.1")
+    assert route.gateway_mac == "00:aa:00:00:01:01"
+    assert not route.is_connected
+
+
+def test_remove_falls_back_to_shorter_prefix():
+    table = RoutingTable()
+    wide = table.add("10.1.0.0/16")
+    table.add("10.1.2.0/24")
+    table.remove("10.1.2.0/24")
+    assert table.lookup("10.1.2.3") is wide
+    assert len(table) == 1
+    assert table.remove("10.1.2.0/24") is None
@@ -0,0 +1,67 @@
+"""
+Tests für zone_policy.py: enterprise_policy.json entscheidet wie
+enterprise_firewall_rules()
+"""
+
+import itertools
+
+import pytest
+
+from deepdive.acl_compiler import int_to_ip, ip_to_int, prefix_mask
+from deepdive.zone_policy import ENTERPRISE_POLICY_FILE, load_policy
+
+# Einzelne Hosts aus enterprise_firewall_rules() und je ein Host aus
+# Subnetzen, die dort nicht vorkommen
+HOSTS = [
+    "10.1.4.10", "10.2.1.100", "10.2.1.101", "10.2.2.110", "10.2.2.111", "10.2.3.120",
+    "10.2.3.121", "10.2.4.130", "10.2.9.9", "10.3.2.210", "10.4.1.220", "10.4.1.221",
+    "10.4.2.230", "10.4.3.10", "10.5.1.250", "10.5.1.251", "10.5.2.10", "10.6.0.1",
+    "192.168.1.1",
+]
+
+PORTS = [20, 21, 22, 25, 53, 80, 143, 443, 500, 993, 3306, 4500, 5432, 8000, 8080, 12345]
+
+# (Protokoll, Zielport): TCP und UDP mit allen Ports der Richtlinie, ICMP
+# ohne Port und GRE als Protokoll, das keine Regel nennt
+PACKETS = ([(6, port) for port in PORTS] + [(17, port) for port in PORTS]
+           + [(1, None), (47, None)])
+
+
+def addresses(policy):
+    """Erster und letzter Host jedes Präfixes der Regeldatei sowie HOSTS"""
+    result = set(HOSTS)
+    for rule in policy.rules:
+        for prefixes in (rule.src, rule.dst, rule.src_except, rule.dst_except):
+            for net, length in prefixes or ():
+                if length == 32:
+                    result.add(int_to_ip(net))
+                    continue
+                last = net | (~prefix_mask(length) & 0xffffffff)
+                result.update((int_to_ip(net + 1), int_to_ip(last - 1)))
+    return sorted(result)
+
+
+def test_enterprise_policy_matches_enterprise_firewall_rules():
+    pytest.importorskip('pox')
+    from pox.lib.addresses import IPAddr
+    from deepdive.enterprise_firewall_rules import enterprise_firewall_rules
+
+    policy = load_policy(ENTERPRISE_POLICY_FILE)
+    ips = [IPAddr(ip) for ip in addresses(policy)]
+    mismatches = []
+    for src, dst in itertools.product(ips, ips):
+        for proto, dport in PACKETS:
+            expected = enterprise_firewall_rules(src, dst, proto, dport)
+            if policy.is_blocked(src, dst, proto, dport) != expected:
+                mismatches.append((str(src), str(dst), proto, dport, expected))
+    assert mismatches == []
+
+
+def test_zone_index_finds_the_first_matching_rule():
+    policy = load_policy(ENTERPRISE_POLICY_FILE)
+    ips = [ip_to_int(ip) for ip in addresses(policy)]
+    for src, dst in itertools.product(ips, ips):
+        for proto, dport in PACKETS:
+            expected = next((rule for rule in policy.rules
+                             if rule.matches(src, dst, proto, dport)), None)
+            assert policy.lookup(src, dst, proto, dport) is expected